@@ -45,10 +45,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "research.timing.ServerTimingMiddleware",
+    "research.metrics.MetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "research.profiling.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
  #   "debug_toolbar.middleware.DebugToolbarMiddleware",
@@ -82,12 +85,56 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Transactions take the write lock at BEGIN and wait for it up to
+        # busy_timeout, instead of failing with "database is locked" when a
+        # read transaction later tries to write
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
+        # Persistent connections: the pragmas below are applied once per
+        # connection rather than once per request
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# Applied to every new SQLite connection (research.database). WAL lets
+# readers work while a writer commits; synchronous=NORMAL is durable across
+# application crashes in WAL mode; busy_timeout (ms) makes a writer wait for
+# the lock; mmap_size is in bytes and a negative cache_size in KiB.
+SQLITE_PRAGMAS = {
+    "busy_timeout": 5000,
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+}
+
+# Calculation results are written again with exponential backoff (starting
+# at SQLITE_LOCK_BACKOFF seconds) when the database stays locked longer than
+# busy_timeout.
+SQLITE_LOCK_RETRIES = 5
+SQLITE_LOCK_BACKOFF = 0.05
+
 AUTH_USER_MODEL = "users.User"
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# "results" holds rendered pages, fragments and chart payloads keyed by
+# experiment results version, so entries never expire by time.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "results": {
+        "BACKEND": "research.cache.StatsLocMemCache",
+        "LOCATION": "research-results",
+        "TIMEOUT": None,
+        "OPTIONS": {"MAX_ENTRIES": 2000},
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -128,6 +175,89 @@ STATICFILES_DIRS = [
 ]
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 
+# Disk cache for rendered response surface heatmaps
+HEATMAP_CACHE_DIR = os.path.join(BASE_DIR, "cache", "heatmaps")
+
+# Generation stamps shared by all server processes (research.cache): the
+# experiment list and material versions that key cached pages. Every
+# process also keeps the material catalog (names and polynomial
+# coefficients, research.catalog) in memory and reloads it when the
+# materials stamp changes.
+CACHE_VERSION_DIR = os.path.join(BASE_DIR, "cache", "versions")
+
+# Worker processes for full-surface evaluation (None means one per CPU core).
+# Surfaces smaller than SURFACE_PARALLEL_THRESHOLD points are evaluated in
+# the calling process, since starting pool tasks costs more than the
+# evaluation. Heatmaps are the only caller and are at most MAX_HEATMAP_SIDE²
+# = 4M points, so with the default threshold the pool is never used: no
+# crossover has been measured yet (on a single CPU the pool is slower at every
+# size). Set the threshold to the crossover reported by
+# "manage.py benchmark_surface" on the production host to enable it.
+SURFACE_WORKERS = None
+SURFACE_PARALLEL_THRESHOLD = 10_000_000
+
+# On-demand request profiling (research.profiling.ProfilingMiddleware).
+# Staff profile a single request with the "X-Profile: 1" header or
+# ?_profile=1; PROFILING_SAMPLE_RATE is the share of all requests profiled
+# at random, of which only those slower than PROFILING_SLOW_MS are kept.
+# With PROFILING_ENABLED = False the middleware is dropped at startup.
+PROFILING_ENABLED = True
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_SLOW_MS = 500
+PROFILING_INTERVAL = 0.001
+
+# Warm up routes, templates and calculation caches when the WSGI application
+# is loaded (see research.warmup and "manage.py warmup"); off unless the
+# environment sets WARMUP_ON_START=1, since it queries the database at
+# import time. Steps that hit a database error are logged and skipped. With
+# "gunicorn --preload" this happens once in the master before workers fork.
+WARMUP_ON_START = os.environ.get("WARMUP_ON_START", "0") == "1"
+
+# Code version stored with every calculation run (CalculationRun); when
+# unset, the short hash of the current git commit is used.
+CODE_VERSION = os.environ.get("CODE_VERSION")
+
+# Prometheus metrics at /metrics. Every server process writes its counters
+# to its own file in METRICS_DIR at most every METRICS_FLUSH_INTERVAL
+# seconds, and the endpoint adds them up. Counters of finished processes
+# are folded into one archive file. The endpoint is open to staff users and
+# to scrapers sending "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_DIR = os.path.join(BASE_DIR, "cache", "metrics")
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+# Per-phase timings (research.timing.ServerTimingMiddleware) are sent in the
+# Server-Timing header of every response; requests slower than
+# SLOW_REQUEST_MS are also written to the rotating slow request log.
+SLOW_REQUEST_MS = 1000
+LOG_DIR = os.path.join(BASE_DIR, "logs")
+os.makedirs(LOG_DIR, exist_ok=True)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json_line": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "slow_requests": {
+            "class": "logging.handlers.RotatingFileHandler",
+            "filename": os.path.join(LOG_DIR, "slow_requests.log"),
+            "maxBytes": 5 * 1024 * 1024,
+            "backupCount": 5,
+            "encoding": "utf-8",
+            "formatter": "json_line",
+        },
+    },
+    "loggers": {
+        "research.slow_requests": {
+            "handlers": ["slow_requests"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.0/ref/settings/#default-auto-field
 
@@ -1,6 +1,224 @@
 from django.contrib import admin
-from research.models import MathModel, Experiment
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+from research.cache import cache_stats
+from research.catalog import material_catalog
+from research.forms import PerformanceFilterForm
+from research.performance import (
+    CACHE_TIMEOUT,
+    GROUPINGS,
+    PERCENTILES,
+    engine_trend,
+    performance_summary,
+)
+from research.profiling import parse_collapsed, render_flamegraph
+from research.models import (
+    CalculationRun,
+    MathModel,
+    Experiment,
+    PolynomialTerm,
+    RequestProfile,
+    ResidualAnalysis,
+    Sweep,
+)
 
 
-admin.site.register(MathModel)
-admin.site.register(Experiment)
+class PorosityMinFilter(admin.SimpleListFilter):
+    title = "минимальная пористость"
+    parameter_name = "porosity_min_below"
+    thresholds = (0.05, 0.5, 1, 5)
+
+    def lookups(self, request, model_admin):
+        return [(str(value), f"меньше {value}") for value in self.thresholds]
+
+    def queryset(self, request, queryset):
+        if self.value() not in {str(value) for value in self.thresholds}:
+            return queryset
+        return queryset.filter(porosity_min__lt=float(self.value()))
+
+
+class MaterialListFilter(admin.RelatedFieldListFilter):
+    """Фильтр по материалу с вариантами из справочника материалов процесса."""
+
+    def field_choices(self, field, request, model_admin):
+        return material_catalog().choices()
+
+
+class PolynomialTermInline(admin.TabularInline):
+    model = PolynomialTerm
+    extra = 0
+
+
+class MathModelAdmin(admin.ModelAdmin):
+    inlines = (PolynomialTermInline,)
+    search_fields = ("name",)
+
+
+class ExperimentAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "material",
+        "created_at",
+        "porosity_min",
+        "porosity_max",
+        "porosity_mean",
+        "porosity_at_avg",
+        "results_version",
+    )
+    list_select_related = ("material",)
+    list_filter = (("material", MaterialListFilter), PorosityMinFilter)
+    autocomplete_fields = ("material",)
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = extra_context or {}
+        extra_context["cache_stats"] = cache_stats()
+        return super().changelist_view(request, extra_context=extra_context)
+
+    def get_urls(self):
+        return [
+            path(
+                "performance/",
+                self.admin_site.admin_view(self.performance_view),
+                name="research_experiment_performance",
+            )
+        ] + super().get_urls()
+
+    def performance_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        form = PerformanceFilterForm(request.GET or None)
+        grouping, days = "material", None
+        if form.is_valid():
+            grouping = form.cleaned_data["grouping"]
+            days = form.cleaned_data["days"]
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Производительность расчетов",
+            "form": form,
+            "group_label": GROUPINGS[grouping][0],
+            "grouping": grouping,
+            "percentiles": PERCENTILES,
+            "summary": performance_summary(grouping, days),
+            # История запусков группируется по периодам; при группировке по
+            # материалам - по дням
+            "engine_trend": engine_trend(
+                "day" if grouping == "material" else grouping, days
+            ),
+            "cache_timeout": CACHE_TIMEOUT,
+        }
+        return TemplateResponse(
+            request, "admin/research/experiment/performance.html", context
+        )
+
+
+admin.site.register(MathModel, MathModelAdmin)
+admin.site.register(Experiment, ExperimentAdmin)
+admin.site.register(Sweep)
+admin.site.register(ResidualAnalysis)
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "method",
+        "path",
+        "status_code",
+        "duration",
+        "samples",
+        "trigger",
+        "user",
+    )
+    list_filter = ("trigger", "method", "status_code")
+    list_select_related = ("user",)
+    search_fields = ("path",)
+    ordering = ("-duration",)
+    fields = (
+        "created_at",
+        "method",
+        "path",
+        "status_code",
+        "duration",
+        "samples",
+        "trigger",
+        "user",
+        "stacks_file",
+        "flamegraph",
+    )
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Флеймграф")
+    def flamegraph(self, obj):
+        if not obj.samples:
+            return "Запрос выполнился быстрее интервала выборки"
+        return mark_safe(
+            '<div style="overflow-x: auto;">'
+            + render_flamegraph(parse_collapsed(obj.stacks))
+            + "</div>"
+        )
+
+    @admin.display(description="Стеки")
+    def stacks_file(self, obj):
+        url = reverse("admin:research_requestprofile_stacks", args=[obj.pk])
+        return format_html('<a href="{}">Скачать в формате collapsed</a>', url)
+
+    def get_urls(self):
+        return [
+            path(
+                "<int:pk>/stacks/",
+                self.admin_site.admin_view(self.stacks_view),
+                name="research_requestprofile_stacks",
+            )
+        ] + super().get_urls()
+
+    def stacks_view(self, request, pk):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(
+            profile.stacks, content_type="text/plain; charset=utf-8"
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="profile_{profile.pk}.collapsed"'
+        )
+        return response
+
+
+admin.site.register(RequestProfile, RequestProfileAdmin)
+
+
+class CalculationRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "created_at",
+        "experiment",
+        "engine",
+        "backend",
+        "code_version",
+        "grid_points",
+        "batch_size",
+        "calculation_time",
+        "peak_memory",
+    )
+    list_filter = ("engine", "backend", "code_version")
+    list_select_related = ("experiment",)
+    readonly_fields = [field.name for field in CalculationRun._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(CalculationRun, CalculationRunAdmin)
@@ -0,0 +1,101 @@
+import json
+import time
+from itertools import islice
+
+import numpy as np
+
+CHUNK_SIZE = 65536
+MAX_POINTS = 10_000_000
+
+
+class BatchError(ValueError):
+    pass
+
+
+def parse_points(items):
+    """
+    Пары (t, τ) в массив формы (n, 2). Точка задается списком [t, tau]
+    или объектом {"t": ..., "tau": ...}.
+    """
+    if not isinstance(items, list):
+        raise BatchError("Точки должны передаваться списком")
+    if not items:
+        return np.empty((0, 2))
+    if isinstance(items[0], dict):
+        try:
+            items = [(item["t"], item["tau"]) for item in items]
+        except (KeyError, TypeError):
+            raise BatchError("Каждая точка должна содержать поля t и tau")
+    try:
+        points = np.array(items, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise BatchError("Точки должны быть парами чисел [t, tau]")
+    if points.ndim != 2 or points.shape[1] != 2:
+        raise BatchError("Точки должны быть парами чисел [t, tau]")
+    return points
+
+
+def read_ndjson_chunks(lines, chunk_size=CHUNK_SIZE):
+    """Читает NDJSON-поток порциями по chunk_size точек."""
+    lines = (line for line in lines if line.strip())
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            return
+        try:
+            items = json.loads(b"[" + b",".join(chunk) + b"]")
+        except ValueError:
+            raise BatchError("Некорректная строка NDJSON")
+        yield parse_points(items)
+
+
+def evaluate_chunk(evaluator, points, derivatives=False):
+    """
+    Столбцы результата: t, tau и для каждого отклика вычислителя y и при
+    необходимости dy/dt, dy/dτ.
+    """
+    t, tau = points[:, 0], points[:, 1]
+    values = evaluator.values(t, tau)
+    columns = [t, tau]
+    if derivatives:
+        for response_columns in zip(values, *evaluator.gradient(t, tau)):
+            columns.extend(response_columns)
+    else:
+        columns.extend(values)
+    return np.column_stack(columns)
+
+
+def format_ndjson(rows):
+    # json.dumps всей порции и разбиение на строки быстрее построчной
+    # сериализации; внутри чисел последовательность "],[" встретиться не может
+    content = json.dumps(rows.tolist(), separators=(",", ":"))[1:-1]
+    return content.replace("],[", "]\n[") + "\n"
+
+
+def stream_ndjson(evaluator, chunks, derivatives=False):
+    """
+    Генератор ответа: строки [t, tau, y(, dy/dt, dy/dτ), ...] по откликам
+    вычислителя и итоговая строка со сводкой по производительности.
+    """
+    started = time.perf_counter()
+    count = 0
+    try:
+        for points in chunks:
+            count += len(points)
+            if count > MAX_POINTS:
+                raise BatchError(f"Превышено максимальное число точек: {MAX_POINTS}")
+            if len(points):
+                yield format_ndjson(evaluate_chunk(evaluator, points, derivatives))
+    except BatchError as error:
+        yield json.dumps({"error": str(error)}, ensure_ascii=False) + "\n"
+        return
+    yield json.dumps({"summary": throughput(count, started)}) + "\n"
+
+
+def throughput(count, started):
+    seconds = time.perf_counter() - started
+    return {
+        "points": count,
+        "seconds": round(seconds, 6),
+        "points_per_second": round(count / seconds) if seconds else None,
+    }
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection, transaction
+
+RESULTS_CACHE = "results"
+
+# Статистика обращений к кэшу результатов в текущем процессе по видам
+# записей (префикс ключа до двоеточия или имя фрагмента шаблона)
+hits = Counter()
+misses = Counter()
+
+_missing = object()
+
+
+def key_kind(key):
+    if key.startswith("template.cache."):
+        return key.split(".")[2]
+    return key.split(":", 1)[0]
+
+
+class StatsLocMemCache(LocMemCache):
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version)
+        if value is _missing:
+            misses[key_kind(key)] += 1
+            return default
+        hits[key_kind(key)] += 1
+        return value
+
+
+def results_cache():
+    return caches[RESULTS_CACHE]
+
+
+def cached(key, builder, timeout=DEFAULT_TIMEOUT):
+    cache = results_cache()
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, timeout)
+    return value
+
+
+def version_path(name):
+    return os.path.join(settings.CACHE_VERSION_DIR, f"{name}.version")
+
+
+def get_version(name):
+    """
+    Метка поколения данных, которые не привязаны к одному эксперименту
+    (список экспериментов, справочник материалов). Хранится в файле
+    CACHE_VERSION_DIR, общем для всех процессов сервера.
+    """
+    try:
+        with open(version_path(name), encoding="ascii") as file:
+            return file.read()
+    except FileNotFoundError:
+        return "0"
+
+
+def write_version(name):
+    os.makedirs(settings.CACHE_VERSION_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=settings.CACHE_VERSION_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="ascii") as tmp_file:
+        tmp_file.write(uuid.uuid4().hex)
+    os.replace(tmp_path, version_path(name))
+
+
+def bump_version(name):
+    """
+    Меняет метку сразу и еще раз после фиксации транзакции: страница,
+    построенная другим процессом до фиксации по старым данным, попадет
+    в кэш под промежуточной меткой и больше не будет выдана.
+    """
+    write_version(name)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: write_version(name))
+
+
+def cache_stats():
+    stats = []
+    for kind in sorted(set(hits) | set(misses)):
+        total = hits[kind] + misses[kind]
+        stats.append(
+            {
+                "kind": kind,
+                "hits": hits[kind],
+                "misses": misses[kind],
+                "hit_rate": round(hits[kind] / total * 100, 1) if total else 0,
+            }
+        )
+    return stats
@@ -0,0 +1,141 @@
+import numpy as np
+
+from research.cache import bump_version, get_version
+from research.evaluation import PRIMARY_RESPONSE, Evaluator
+from research.models import MathModel, PolynomialTerm
+
+
+class MaterialCatalog:
+    """
+    Справочник материалов: идентификаторы, названия и коэффициенты
+    полиномов всех откликов, упакованные в один массив формы
+    (число откликов всех материалов, p, q). Строки материала идут подряд,
+    основной отклик - первым; матрицы меньшей степени дополнены нулями.
+    """
+
+    def __init__(self, materials, terms, stamp=None):
+        self.stamp = stamp
+        self.ids = np.array([material_id for material_id, _ in materials], np.int64)
+        self.names = [name for _, name in materials]
+        self.index = {int(material_id): i for i, material_id in enumerate(self.ids)}
+        # Члены материалов, добавленных между двумя запросами загрузки,
+        # не учитываются до следующей смены метки
+        terms = [term for term in terms if term[0] in self.index]
+
+        responses = [{} for _ in materials]
+        for material_id, response, _, _, _ in terms:
+            responses[self.index[material_id]].setdefault(response, None)
+        self.responses = [
+            sorted(names, key=lambda response: response != PRIMARY_RESPONSE)
+            for names in responses
+        ]
+        self.offsets = np.zeros(len(materials) + 1, np.int64)
+        self.offsets[1:] = np.cumsum([max(len(names), 1) for names in self.responses])
+
+        positions = np.array([self.index[term[0]] for term in terms], np.int64)
+        rows = self.offsets[positions] + np.array(
+            [
+                self.responses[i].index(term[1])
+                for i, term in zip(positions.tolist(), terms)
+            ],
+            np.int64,
+        )
+        t_powers = np.array([term[2] for term in terms], np.int64)
+        tau_powers = np.array([term[3] for term in terms], np.int64)
+
+        # Размер матриц каждого материала - по наибольшим степеням его членов
+        self.shapes = np.ones((len(materials), 2), np.int64)
+        np.maximum.at(self.shapes[:, 0], positions, t_powers + 1)
+        np.maximum.at(self.shapes[:, 1], positions, tau_powers + 1)
+        p, q = self.shapes.max(axis=0, initial=1)
+        self.coefficients = np.zeros((self.offsets[-1], p, q), np.float64)
+        np.add.at(
+            self.coefficients,
+            (rows, t_powers, tau_powers),
+            np.array([term[4] for term in terms], np.float64),
+        )
+        self.coefficients.flags.writeable = False
+
+    @classmethod
+    def load(cls, stamp=None):
+        materials = list(MathModel.objects.order_by("pk").values_list("pk", "name"))
+        terms = list(
+            PolynomialTerm.objects.order_by("material", "pk").values_list(
+                "material_id", "response", "t_power", "tau_power", "coefficient"
+            )
+        )
+        return cls(materials, terms, stamp)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, material_id):
+        return material_id in self.index
+
+    def position(self, material_id):
+        try:
+            return self.index[material_id]
+        except KeyError:
+            raise MathModel.DoesNotExist(f"Материал {material_id} не найден")
+
+    def choices(self):
+        """Варианты выбора (id, название) в порядке идентификаторов."""
+        return list(zip(self.ids.tolist(), self.names))
+
+    def name(self, material_id):
+        return self.names[self.position(material_id)]
+
+    def has_response(self, material_id, response=PRIMARY_RESPONSE):
+        return response in self.responses[self.position(material_id)]
+
+    def matrices(self, material_id, responses=None):
+        """
+        Матрицы коэффициентов откликов материала формы (число откликов, p, q)
+        - по умолчанию всех, иначе в порядке responses; отсутствующему у
+        материала отклику соответствует нулевая матрица.
+        """
+        i = self.position(material_id)
+        p, q = self.shapes[i]
+        rows = self.coefficients[self.offsets[i] : self.offsets[i + 1], :p, :q]
+        if not responses:
+            return rows
+        matrices = np.zeros((len(responses), p, q), np.float64)
+        for j, response in enumerate(responses):
+            if response in self.responses[i]:
+                matrices[j] = rows[self.responses[i].index(response)]
+        return matrices
+
+    def matrix(self, material_id, response=PRIMARY_RESPONSE):
+        return self.matrices(material_id, [response])[0]
+
+    def evaluator(self, material_id, responses=None):
+        i = self.position(material_id)
+        responses = list(responses or self.responses[i])
+        return Evaluator(self.matrices(material_id, responses), responses)
+
+
+_catalog = None
+
+
+def material_catalog():
+    """
+    Справочник материалов текущего процесса; загружается заново, если
+    метка версии материалов изменилась.
+    """
+    global _catalog
+    # Метка читается до загрузки: изменения, зафиксированные после нее,
+    # сменят метку и вызовут повторную загрузку
+    stamp = get_version("materials")
+    if _catalog is None or _catalog.stamp != stamp:
+        _catalog = MaterialCatalog.load(stamp)
+    return _catalog
+
+
+def invalidate_material_catalog():
+    """
+    Сбрасывает справочник текущего процесса и меняет метку версии
+    материалов для остальных процессов.
+    """
+    global _catalog
+    _catalog = None
+    bump_version("materials")
@@ -0,0 +1,159 @@
+import json
+import struct
+
+import numpy as np
+
+from research.cache import cached
+from research.timing import phase
+
+# Графики страницы эксперимента: раздел results и поля серий в порядке
+# (минимум, максимум, среднее)
+CHART_SERIES = {
+    "constant_temp": ("result_t_const", ("tmin_const", "tmax_const", "tavg_const")),
+    "constant_time": (
+        "result_tau_const",
+        ("taumin_const", "taumax_const", "tauavg_const"),
+    ),
+}
+
+CHART_FORMATS = {
+    "f32": "<f4",
+    "f64": "<f8",
+}
+
+# Число точек на графике по умолчанию и допустимые границы параметра points
+DEFAULT_CHART_POINTS = 1000
+MIN_CHART_POINTS = 3
+MAX_CHART_POINTS = 20000
+
+
+@phase("json")
+def extract_series(results, derivatives=None, quantity=None):
+    """
+    Серии графиков из results. Если задана quantity, вместо значений
+    берутся соответствующие частные производные.
+    """
+    series = {}
+    for chart, (section, fields) in CHART_SERIES.items():
+        rows = (results or {}).get(section) or {}
+        count = len(rows)
+        x = np.fromiter((float(key) for key in rows), dtype=np.float64, count=count)
+        if quantity:
+            values = list(np.array(derivatives[chart][quantity], dtype=np.float64))
+        else:
+            values = [
+                np.fromiter(
+                    (row[field] for row in rows.values()),
+                    dtype=np.float64,
+                    count=count,
+                )
+                for field in fields
+            ]
+        series[chart] = (x, values)
+    return series
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Индексы точек, отобранных алгоритмом Largest-Triangle-Three-Buckets.
+    Первая и последняя точки сохраняются всегда.
+    """
+    count = len(x)
+    if threshold >= count or threshold < MIN_CHART_POINTS:
+        return np.arange(count)
+
+    # Внутренние точки делятся на threshold - 2 корзины, последняя
+    # "следующая" корзина состоит из одной последней точки
+    edges = np.linspace(1, count - 1, threshold - 1).astype(np.int64)
+    edges = np.append(edges, count)
+    sizes = np.diff(edges)
+    avg_x = np.add.reduceat(x, edges[:-1]) / sizes
+    avg_y = np.add.reduceat(y, edges[:-1]) / sizes
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = count - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        ax, ay = x[selected], y[selected]
+        cx, cy = avg_x[bucket + 1], avg_y[bucket + 1]
+        areas = np.abs(
+            (ax - cx) * (y[start:stop] - ay) - (ax - x[start:stop]) * (cy - ay)
+        )
+        selected = start + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+    return indices
+
+
+def downsample_series(series, points):
+    """
+    Прореживает графики до points точек. Серии одного графика делят общую
+    ось x, поэтому берется объединение точек, отобранных для каждой серии.
+    """
+    downsampled = {}
+    for chart, (x, values) in series.items():
+        budget = max(points // len(values), MIN_CHART_POINTS)
+        indices = np.unique(
+            np.concatenate([lttb_indices(x, y, budget) for y in values])
+        )
+        downsampled[chart] = (x[indices], [y[indices] for y in values])
+    return downsampled
+
+
+def stored_series(experiment):
+    """
+    Серии графиков эксперимента в виде массивов из кэша результатов;
+    results разбирается только при первом обращении к версии результатов.
+    """
+    key = f"series:{experiment.pk}:{experiment.results_version}"
+    return cached(key, lambda: extract_series(experiment.results))
+
+
+def chart_payload(experiment, data_format, points=None, quantity=None):
+    def build():
+        if quantity:
+            series = extract_series(
+                experiment.results, experiment.derivatives, quantity
+            )
+        else:
+            series = stored_series(experiment)
+        if points:
+            series = downsample_series(series, points)
+        if data_format == "json":
+            return series_to_json(series)
+        return pack_series(series, CHART_FORMATS[data_format])
+
+    key = (
+        f"chart-data:{experiment.pk}:{experiment.results_version}:"
+        f"{data_format}:{points or 'full'}:{quantity or 'values'}"
+    )
+    return cached(key, build)
+
+
+def pack_series(series, dtype):
+    """
+    Бинарное представление: заголовок из uint32 длин серий каждого графика
+    (в порядке CHART_SERIES), затем для каждого графика массивы x, min, max,
+    avg в little-endian.
+    """
+    header = struct.pack(
+        f"<{len(CHART_SERIES)}I", *(len(series[chart][0]) for chart in CHART_SERIES)
+    )
+    arrays = []
+    for chart in CHART_SERIES:
+        x, values = series[chart]
+        arrays.append(np.asarray(x, dtype=dtype).tobytes())
+        arrays.extend(np.asarray(y, dtype=dtype).tobytes() for y in values)
+    return header + b"".join(arrays)
+
+
+def series_to_json(series):
+    payload = {
+        chart: {
+            "labels": x.tolist(),
+            "data": [y.tolist() for y in values],
+        }
+        for chart, (x, values) in series.items()
+    }
+    return json.dumps(payload, separators=(",", ":"))
@@ -0,0 +1,87 @@
+import numpy as np
+
+from research.charts import CHART_SERIES, downsample_series, stored_series
+
+
+def sorted_series(x, values):
+    order = np.argsort(x, kind="stable")
+    return x[order], [y[order] for y in values]
+
+
+def align(x_a, values_a, x_b, values_b):
+    """
+    Общая ось двух серий: слияние точек обеих сеток на пересечении их
+    диапазонов. В точках, которых нет в одной из сеток, значения этой
+    серии интерполируются линейно.
+    """
+    x_a, values_a = sorted_series(x_a, values_a)
+    x_b, values_b = sorted_series(x_b, values_b)
+    if not len(x_a) or not len(x_b):
+        return np.empty(0), [], []
+    low, high = max(x_a[0], x_b[0]), min(x_a[-1], x_b[-1])
+    x = np.union1d(x_a[(x_a >= low) & (x_a <= high)], x_b[(x_b >= low) & (x_b <= high)])
+    return (
+        x,
+        [np.interp(x, x_a, y) for y in values_a],
+        [np.interp(x, x_b, y) for y in values_b],
+    )
+
+
+def relative_change(a, b):
+    """Изменение b относительно a в процентах; при a = 0 - nan."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(a != 0, (b - a) / np.abs(a) * 100, np.nan)
+
+
+def compare_experiments(experiment_a, experiment_b, points=None):
+    """
+    Поточечное сравнение кривых двух экспериментов по сохраненным
+    массивам серий. Для каждого графика: общая ось x, значения обоих
+    экспериментов, разность (B - A), относительное изменение и сводка.
+    """
+    series_a = stored_series(experiment_a)
+    series_b = stored_series(experiment_b)
+    comparison = {}
+    for chart in CHART_SERIES:
+        x, a, b = align(*series_a[chart], *series_b[chart])
+        diff = np.array([y_b - y_a for y_a, y_b in zip(a, b)])
+        relative = np.array([relative_change(y_a, y_b) for y_a, y_b in zip(a, b)])
+        summary = {"points": len(x)}
+        if len(x):
+            summary["max_abs_diff"] = float(np.abs(diff).max())
+            summary["mean_abs_diff"] = float(np.abs(diff).mean())
+            if not np.isnan(relative).all():
+                summary["max_abs_relative"] = float(np.nanmax(np.abs(relative)))
+        if points and len(x) > points:
+            # Точки отбираются по кривым обоих экспериментов; разность и
+            # относительное изменение поточечные, их достаточно пересчитать
+            x, values = downsample_series({chart: (x, a + b)}, points)[chart]
+            a, b = values[:3], values[3:]
+            diff = [y_b - y_a for y_a, y_b in zip(a, b)]
+            relative = [relative_change(y_a, y_b) for y_a, y_b in zip(a, b)]
+        comparison[chart] = {
+            "x": x,
+            "a": a,
+            "b": b,
+            "diff": list(diff),
+            "relative": list(relative),
+            "summary": summary,
+        }
+    return comparison
+
+
+def comparison_to_json(comparison):
+    def values(arrays):
+        # nan в JSON недопустим, на графиках такие точки пропускаются
+        return [np.where(np.isnan(y), None, np.round(y, 6)).tolist() for y in arrays]
+
+    return {
+        chart: {
+            "x": data["x"].tolist(),
+            "a": values(data["a"]),
+            "b": values(data["b"]),
+            "diff": values(data["diff"]),
+            "relative": values(data["relative"]),
+        }
+        for chart, data in comparison.items()
+    }
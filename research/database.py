@@ -0,0 +1,48 @@
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+from research.metrics import DB_LOCK_RETRIES
+
+# Сообщения SQLite о занятой другим соединением базе
+LOCK_MESSAGES = ("database is locked", "database table is locked", "database is busy")
+
+
+def configure_connection(connection):
+    """Настройки SQLITE_PRAGMAS для нового соединения SQLite."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def is_lock_error(error):
+    return isinstance(error, OperationalError) and any(
+        message in str(error) for message in LOCK_MESSAGES
+    )
+
+
+def retry_on_lock(write, operation):
+    """
+    Выполняет write() в транзакции; если база занята другим процессом
+    дольше busy_timeout, повторяет до SQLITE_LOCK_RETRIES раз с
+    экспоненциально растущей паузой со случайной составляющей.
+
+    Внутри уже открытой транзакции повтор невозможен - ошибка передается
+    вызывающему коду, который повторяет транзакцию целиком.
+    """
+    if connection.in_atomic_block:
+        return write()
+    for attempt in range(settings.SQLITE_LOCK_RETRIES + 1):
+        try:
+            with transaction.atomic():
+                return write()
+        except OperationalError as error:
+            if not is_lock_error(error) or attempt == settings.SQLITE_LOCK_RETRIES:
+                raise
+        DB_LOCK_RETRIES.inc(operation=operation)
+        delay = settings.SQLITE_LOCK_BACKOFF * 2**attempt
+        time.sleep(delay * random.uniform(0.5, 1.5))
@@ -0,0 +1,430 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Отклик, по которому строятся эксперименты (кривые, сводка, тепловая карта)
+PRIMARY_RESPONSE = "porosity"
+
+# Оценка числа математических операций расчета: на каждую вычисленную
+# точку кривых и постоянная часть
+OPERATIONS_PER_POINT = 79
+OPERATIONS_OVERHEAD = 2
+
+# Предельный объем массивов равномерных сеток в кэше процесса (осей и
+# построенных для них базисов), байт
+GRID_CACHE_BYTES = 64 * 2**20
+
+
+def coefficient_matrix(material, response=PRIMARY_RESPONSE):
+    """
+    Коэффициенты полинома отклика в виде матрицы A, для которой
+    y(t, τ) = [1, t, t², ...] · A · [1, τ, τ², ...]ᵀ; элемент A[i, j] -
+    коэффициент при tⁱ·τʲ. Члены берутся из material.terms.all(), поэтому
+    для набора материалов их стоит загрузить через prefetch_related.
+    """
+    terms = [term for term in material.terms.all() if term.response == response]
+    shape = (
+        max((term.t_power for term in terms), default=0) + 1,
+        max((term.tau_power for term in terms), default=0) + 1,
+    )
+    matrix = np.zeros(shape, dtype=np.float64)
+    for term in terms:
+        matrix[term.t_power, term.tau_power] += term.coefficient
+    return matrix
+
+
+def stack_matrices(matrices):
+    """
+    Стопка матриц коэффициентов формы (m, p, q); матрицы меньшей степени
+    дополняются нулями.
+    """
+    p = max(matrix.shape[0] for matrix in matrices)
+    q = max(matrix.shape[1] for matrix in matrices)
+    stack = np.zeros((len(matrices), p, q), dtype=np.float64)
+    for i, matrix in enumerate(matrices):
+        stack[i, : matrix.shape[0], : matrix.shape[1]] = matrix
+    return stack
+
+
+def powers(values, columns=3):
+    """Базис [1, x, x², ...] из columns степеней."""
+    return np.vander(np.asarray(values, dtype=np.float64), columns, increasing=True)
+
+
+def derivative_powers(values, order=1, columns=3):
+    """Производная базиса [1, x, x², ...] порядка order."""
+    values = np.asarray(values, dtype=np.float64)
+    exponents = np.arange(columns)
+    factors = np.ones(columns)
+    for i in range(order):
+        factors *= exponents - i
+    return factors * values[:, np.newaxis] ** np.maximum(exponents - order, 0)
+
+
+# Частные производные поверхности отклика: порядок производной по t и по τ
+DERIVATIVES = {
+    "dt": (1, 0),
+    "dtau": (0, 1),
+    "dt2": (2, 0),
+    "dtau2": (0, 2),
+    "dt_dtau": (1, 1),
+}
+
+DERIVATIVE_LABELS = {
+    "dt": "∂y/∂t",
+    "dtau": "∂y/∂τ",
+    "dt2": "∂²y/∂t²",
+    "dtau2": "∂²y/∂τ²",
+    "dt_dtau": "∂²y/∂t∂τ",
+}
+
+
+class Evaluator:
+    """
+    Вычисление полиномов нескольких откликов и их частных производных в
+    парах точек. Степени t и τ считаются один раз для всех откликов.
+    """
+
+    def __init__(self, matrices, responses=(PRIMARY_RESPONSE,)):
+        self.matrices = matrices
+        self.responses = list(responses)
+
+    def contract(self, t_basis, tau_basis):
+        return np.einsum("np,rpq,nq->rn", t_basis, self.matrices, tau_basis)
+
+    def values(self, t, tau):
+        """Значения формы (число откликов, len(t))."""
+        _, p, q = self.matrices.shape
+        return self.contract(powers(t, p), powers(tau, q))
+
+    def gradient(self, t, tau):
+        _, p, q = self.matrices.shape
+        t_basis, tau_basis = powers(t, p), powers(tau, q)
+        dt = self.contract(derivative_powers(t, 1, p), tau_basis)
+        dtau = self.contract(t_basis, derivative_powers(tau, 1, q))
+        return dt, dtau
+
+
+def material_evaluator(material_id, responses=None):
+    """Вычислитель для откликов материала (по умолчанию всех) из справочника."""
+    from research.catalog import material_catalog
+
+    return material_catalog().evaluator(material_id, responses)
+
+
+def axis(start, stop, step):
+    """Равномерная сетка от start до stop включительно с шагом step."""
+    count = int(np.floor(round((stop - start) / step, 9))) + 1
+    return start + np.arange(count, dtype=np.float64) * step
+
+
+def refine_axis(start, stop, min_step, tolerance, curves, initial_points=9):
+    """
+    Адаптивная сетка на [start, stop]: начиная с initial_points равномерных
+    точек, интервал делится пополам, если в его середине значение хотя бы
+    одной из кривых отклоняется от линейной интерполяции больше чем на
+    tolerance, а половина интервала не меньше min_step. Все интервалы одного
+    уровня проверяются за одно вычисление curves.
+
+    curves(x) возвращает массив формы (число кривых, len(x)).
+    Результат - ось и число точек, в которых вычислялись кривые.
+    """
+    uniform = axis(start, stop, min_step)
+    if len(uniform) <= initial_points:
+        return uniform, len(uniform)
+
+    x = np.linspace(start, stop, initial_points)
+    y = curves(x)
+    evaluated = len(x)
+    active = np.ones(len(x) - 1, dtype=bool)
+    while active.any():
+        intervals = np.nonzero(active)[0]
+        left, right = x[intervals], x[intervals + 1]
+        middle = (left + right) / 2
+        y_middle = curves(middle)
+        evaluated += len(middle)
+        linear = (y[:, intervals] + y[:, intervals + 1]) / 2
+        deviation = np.abs(y_middle - linear).max(axis=0)
+        split = (deviation > tolerance) & ((right - left) / 2 >= min_step)
+        if not split.any():
+            break
+        new_x = middle[split]
+        x = np.concatenate([x, new_x])
+        y = np.concatenate([y, y_middle[:, split]], axis=1)
+        order = np.argsort(x, kind="stable")
+        x, y = x[order], y[:, order]
+        # На следующем уровне проверяются обе половины разделенных интервалов
+        is_new = np.isin(x, new_x)
+        active = is_new[:-1] | is_new[1:]
+    return x, evaluated
+
+
+def round_significant(values, digits=6):
+    """
+    Округление до digits значащих цифр. Деление (умножение) целого числа
+    на точную степень десяти дает ближайшее к десятичной записи число, так
+    что в JSON значение записывается не длиннее digits цифр.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    nonzero = np.isfinite(values) & (values != 0)
+    magnitude = np.floor(
+        np.log10(np.abs(values, where=nonzero, out=np.ones_like(values)))
+    )
+    exponent = (digits - 1 - magnitude).astype(np.int64)
+    scale = 10.0 ** np.abs(exponent)
+    with np.errstate(invalid="ignore", over="ignore"):
+        rounded = np.where(
+            exponent >= 0,
+            np.round(values * scale) / scale,
+            np.round(values / scale) * scale,
+        )
+    return np.where(nonzero, rounded, values)
+
+
+def summarize(values, t, tau):
+    """
+    Сводные показатели по рассчитанным точкам: values, t и tau - массивы
+    одинаковой формы.
+    """
+    values = np.ravel(values)
+    index = int(np.argmin(values))
+    return {
+        "porosity_min": float(values[index]),
+        "porosity_max": float(values.max()),
+        "porosity_mean": float(values.mean()),
+        "porosity_min_t": float(np.ravel(t)[index]),
+        "porosity_min_tau": float(np.ravel(tau)[index]),
+    }
+
+
+class Grid:
+    """
+    Сетка эксперимента: кривые при постоянной температуре (t_min, t_max,
+    t_avg) по оси τ и при постоянном времени (τ_min, τ_max, τ_avg) по оси t.
+    Матрицы степеней строятся один раз и используются для всех материалов
+    с этой сеткой.
+    """
+
+    def __init__(self, t_min, t_max, delta_t, tau_min, tau_max, delta_tau):
+        self.key = (t_min, t_max, delta_t, tau_min, tau_max, delta_tau)
+        self.t_avg = (t_min + t_max) / 2
+        self.tau_avg = (tau_min + tau_max) / 2
+        self.t_levels = np.array([t_min, t_max, self.t_avg])
+        self.tau_levels = np.array([tau_min, tau_max, self.tau_avg])
+        self.t_axis = axis(t_min, t_max, delta_t)
+        self.tau_axis = axis(tau_min, tau_max, delta_tau)
+        self.evaluated_points = len(self.t_axis) + len(self.tau_axis)
+        self.size = len(self.t_axis) * len(self.tau_axis)
+        self._designs = {}
+        # Кэш, в котором хранится сетка и учитывается объем ее базисов
+        self._cache = None
+
+    @classmethod
+    def for_experiment(cls, experiment):
+        key = (
+            experiment.t_min,
+            experiment.t_max,
+            experiment.delta_t,
+            experiment.tau_min,
+            experiment.tau_max,
+            experiment.delta_tau,
+        )
+        if experiment.sampling != "adaptive":
+            return uniform_grid(*key)
+        grid = cls(*key)
+        from research.catalog import material_catalog
+
+        grid.refine(
+            material_catalog().matrix(experiment.material_id), experiment.tolerance
+        )
+        grid.key += (experiment.material_id, experiment.tolerance)
+        return grid
+
+    def refine(self, matrix, tolerance):
+        """
+        Заменяет равномерные оси адаптивными для одного материала; шаги
+        delta_t и delta_tau становятся минимальным шагом.
+        """
+        t_min, t_max, delta_t, tau_min, tau_max, delta_tau = self.key
+        p, q = matrix.shape
+        t_levels = powers(self.t_levels, p)
+        tau_levels = powers(self.tau_levels, q)
+        self.tau_axis, tau_evaluated = refine_axis(
+            tau_min,
+            tau_max,
+            delta_tau,
+            tolerance,
+            lambda tau: t_levels @ matrix @ powers(tau, q).T,
+        )
+        self.t_axis, t_evaluated = refine_axis(
+            t_min,
+            t_max,
+            delta_t,
+            tolerance,
+            lambda t: (powers(t, p) @ matrix @ tau_levels.T).T,
+        )
+        self.evaluated_points = tau_evaluated + t_evaluated
+        self._designs = {}
+
+    def prepare(self, p, q):
+        """Базисы для значений и всех производных из DERIVATIVES."""
+        self.design(p, q)
+        for orders in DERIVATIVES.values():
+            self.design(p, q, *orders)
+
+    def design(self, p, q, t_order=0, tau_order=0):
+        """
+        Базисы уровней и осей для полиномов степени p - 1 по t и q - 1 по τ
+        (производные порядков t_order и tau_order); строятся один раз для
+        всех материалов с этой сеткой.
+        """
+        key = (p, q, t_order, tau_order)
+        if key not in self._designs:
+            design = {
+                "t_levels": derivative_powers(self.t_levels, t_order, p),
+                "tau_levels": derivative_powers(self.tau_levels, tau_order, q),
+                "t_axis": derivative_powers(self.t_axis, t_order, p),
+                "tau_axis": derivative_powers(self.tau_axis, tau_order, q),
+                "t_avg": derivative_powers([self.t_avg], t_order, p)[0],
+                "tau_avg": derivative_powers([self.tau_avg], tau_order, q)[0],
+            }
+            cache = self._cache
+            if cache is None:
+                self._designs[key] = design
+            else:
+                cache.add_design(self, key, design)
+        return self._designs[key]
+
+    @property
+    def nbytes(self):
+        """Объем осей и построенных базисов сетки, байт."""
+        return (
+            self.t_axis.nbytes
+            + self.tau_axis.nbytes
+            + sum(design_nbytes(design) for design in self._designs.values())
+        )
+
+    def curves(self, matrices, design):
+        t_const = np.einsum(
+            "ai,mij,bj->mab",
+            design["t_levels"],
+            matrices,
+            design["tau_axis"],
+            optimize=True,
+        )
+        tau_const = np.einsum(
+            "ai,mij,bj->mab",
+            design["t_axis"],
+            matrices,
+            design["tau_levels"],
+            optimize=True,
+        )
+        return t_const, tau_const
+
+    def evaluate(self, matrices):
+        """
+        Расчет для стопки матриц коэффициентов формы (m, p, q). Возвращает
+        t_const (m, 3, len(tau_axis)), tau_const (m, len(t_axis), 3) и
+        значения в точке (t_avg, τ_avg) формы (m,).
+        """
+        design = self.design(*matrices.shape[1:])
+        t_const, tau_const = self.curves(matrices, design)
+        center = np.einsum("i,mij,j->m", design["t_avg"], matrices, design["tau_avg"])
+        return np.round(t_const, 4), np.round(tau_const, 4), np.round(center, 4)
+
+    def derivatives(self, matrices):
+        """
+        Частные производные из DERIVATIVES на тех же кривых, что и evaluate:
+        для каждой производной пара массивов форм (m, 3, len(tau_axis)) и
+        (m, len(t_axis), 3).
+        """
+        return {
+            name: self.curves(matrices, self.design(*matrices.shape[1:], *orders))
+            for name, orders in DERIVATIVES.items()
+        }
+
+    def summarize(self, t_const, tau_const):
+        """Сводные показатели по кривым одного материала."""
+        return summarize(
+            np.concatenate([t_const.ravel(), tau_const.ravel()]),
+            np.concatenate(
+                [
+                    np.repeat(self.t_levels, len(self.tau_axis)),
+                    np.repeat(self.t_axis, 3),
+                ]
+            ),
+            np.concatenate(
+                [np.tile(self.tau_axis, 3), np.tile(self.tau_levels, len(self.t_axis))]
+            ),
+        )
+
+    @property
+    def number_of_math_operations(self):
+        return OPERATIONS_OVERHEAD + OPERATIONS_PER_POINT * self.evaluated_points
+
+
+def design_nbytes(design):
+    return sum(array.nbytes for array in design.values())
+
+
+class GridCache:
+    """
+    Равномерные сетки процесса с вытеснением давно не использованных,
+    когда объем их осей и базисов превышает max_bytes. Базисы строятся
+    после выдачи сетки, поэтому сетка сообщает кэшу о каждом новом базисе.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.grids = OrderedDict()
+        self.nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.grids)
+
+    def get(self, key):
+        with self._lock:
+            grid = self.grids.get(key)
+            if grid is None:
+                grid = self.grids[key] = Grid(*key)
+                grid._cache = self
+                self.nbytes += grid.nbytes
+            self.grids.move_to_end(key)
+            self.trim()
+        return grid
+
+    def add_design(self, grid, key, design):
+        with self._lock:
+            if key in grid._designs:
+                return
+            grid._designs[key] = design
+            if grid._cache is self:
+                self.nbytes += design_nbytes(design)
+                self.trim()
+
+    def trim(self):
+        # Последняя выданная сетка остается, даже если одна превышает предел
+        while self.nbytes > self.max_bytes and len(self.grids) > 1:
+            _, grid = self.grids.popitem(last=False)
+            grid._cache = None
+            self.nbytes -= grid.nbytes
+
+    def clear(self):
+        with self._lock:
+            for grid in self.grids.values():
+                grid._cache = None
+            self.grids.clear()
+            self.nbytes = 0
+
+
+_grids = GridCache(GRID_CACHE_BYTES)
+
+
+def uniform_grid(t_min, t_max, delta_t, tau_min, tau_max, delta_tau):
+    """
+    Равномерная сетка из кэша процесса: вместе с сеткой переиспользуются
+    построенные для нее базисы. Такие сетки после создания не изменяются.
+    """
+    return _grids.get((t_min, t_max, delta_t, tau_min, tau_max, delta_tau))
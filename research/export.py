@@ -0,0 +1,93 @@
+import json
+import zlib
+
+import numpy as np
+
+from research.batch import CHUNK_SIZE, format_ndjson
+from research.charts import extract_series
+from research.evaluation import PRIMARY_RESPONSE, Grid, material_evaluator
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def format_csv(rows):
+    # Тот же прием, что и в format_ndjson: одна сериализация всей порции
+    content = json.dumps(rows.tolist(), separators=(",", ":"))[2:-2]
+    return content.replace("],[", "\n") + "\n"
+
+
+def curve_rows(experiment, chunk_size=CHUNK_SIZE):
+    """
+    Точки сохраненных кривых эксперимента: столбцы и генератор порций
+    строк (t, τ, y) не длиннее chunk_size.
+    """
+    series = extract_series(experiment.results)
+    levels = {
+        "constant_temp": (experiment.t_min, experiment.t_max, experiment.t_avg),
+        "constant_time": (experiment.tau_min, experiment.tau_max, experiment.tau_avg),
+    }
+
+    def chunks():
+        for chart, (x, curves) in series.items():
+            for level, y in zip(levels[chart], curves):
+                constant = np.full_like(x, level)
+                t, tau = (constant, x) if chart == "constant_temp" else (x, constant)
+                for start in range(0, len(x), chunk_size):
+                    stop = start + chunk_size
+                    yield np.column_stack(
+                        [t[start:stop], tau[start:stop], y[start:stop]]
+                    )
+
+    return ["t", "tau", PRIMARY_RESPONSE], chunks()
+
+
+def surface_rows(experiment, chunk_size=CHUNK_SIZE):
+    """
+    Полная поверхность t × τ на сетке эксперимента по всем откликам
+    материала. Точки вычисляются по мере чтения порциями по chunk_size,
+    поэтому расход памяти не зависит от размера сетки.
+    """
+    grid = Grid.for_experiment(experiment)
+    evaluator = material_evaluator(experiment.material_id)
+    t_axis, tau_axis = grid.t_axis, grid.tau_axis
+    total = len(t_axis) * len(tau_axis)
+
+    def chunks():
+        for start in range(0, total, chunk_size):
+            index = np.arange(start, min(start + chunk_size, total))
+            t = t_axis[index // len(tau_axis)]
+            tau = tau_axis[index % len(tau_axis)]
+            yield np.column_stack([t, tau, *evaluator.values(t, tau)])
+
+    return ["t", "tau", *evaluator.responses], chunks()
+
+
+def export_lines(columns, chunks, export_format):
+    """
+    Текст выгрузки по порциям: для CSV строка заголовка, для NDJSON первая
+    строка {"columns": [...]}, затем строки значений.
+    """
+    if export_format == "csv":
+        yield ",".join(columns) + "\n"
+        formatter = format_csv
+    else:
+        yield json.dumps({"columns": columns}) + "\n"
+        formatter = format_ndjson
+    for rows in chunks:
+        if len(rows):
+            yield formatter(rows)
+
+
+def gzip_stream(parts):
+    """
+    Сжатие потока в формат gzip. После каждой порции выполняется flush,
+    чтобы клиент получал данные сразу, а не после заполнения буфера zlib.
+    """
+    # Уровень 1: при более сильном сжатии узким местом потока становится zlib
+    compressor = zlib.compressobj(1, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for part in parts:
+        yield compressor.compress(part.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
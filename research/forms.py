@@ -1,11 +1,51 @@
+import itertools
 import math
 from django.contrib.auth.forms import AuthenticationForm
 from users.models import User
 from django import forms
-from .models import Experiment, MathModel
+from django.forms.models import ModelChoiceIterator
+from .catalog import material_catalog
+from .models import Experiment, MathModel, PolynomialTerm
 from django.core.exceptions import ValidationError
 
 
+def grid_errors(t_min, t_max, delta_t, tau_min, tau_max, delta_tau):
+    errors = {}
+
+    if t_min is not None and t_max is not None and t_min > t_max:
+        errors["t_min"] = (
+            "Нижний порог температуры спекания должен быть меньше верхнего."
+        )
+
+    if tau_min is not None and tau_max is not None and tau_min > tau_max:
+        errors["tau_min"] = (
+            "Нижний порог времени изометрической выдержки должен быть меньше верхнего."
+        )
+
+    if delta_t is not None and delta_t <= 0:
+        errors["delta_t"] = (
+            "Шаг варьирования температуры спекания должен быть больше нуля."
+        )
+
+    if delta_tau is not None and delta_tau <= 0:
+        errors["delta_tau"] = (
+            "Шаг варьирования времени изометрической выдержки должен быть больше нуля."
+        )
+
+    if t_min is not None and t_max is not None and delta_t is not None:
+        if (t_max - t_min) / delta_t > 1000:
+            errors["delta_t"] = (
+                "Слишком маленький шаг температуры. Увеличьте шаг или уменьшите диапазон."
+            )
+
+    if tau_min is not None and tau_max is not None and delta_tau is not None:
+        if (tau_max - tau_min) / delta_tau > 1000:
+            errors["delta_tau"] = (
+                "Слишком маленький шаг времени. Увеличьте шаг или уменьшите диапазон."
+            )
+    return errors
+
+
 class AuthForm(AuthenticationForm):
 
     def __init__(self, *args, **kwargs):
@@ -35,10 +75,52 @@ class AuthForm(AuthenticationForm):
         return self.cleaned_data
 
 
+class MaterialChoiceIterator(ModelChoiceIterator):
+    """Варианты выбора материала из справочника процесса, без запроса к базе."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        yield from material_catalog().choices()
+
+    def __len__(self):
+        return len(material_catalog()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or len(material_catalog()) > 0
+
+
+class MaterialChoiceField(forms.ModelChoiceField):
+    iterator = MaterialChoiceIterator
+
+    def __init__(self, **kwargs):
+        super().__init__(queryset=MathModel.objects.all(), **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            material_id = int(value)
+            name = material_catalog().name(material_id)
+        except (TypeError, ValueError, MathModel.DoesNotExist):
+            raise ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return MathModel.from_db(None, ["id", "name"], [material_id, name])
+
+
+class MaterialMultipleChoiceField(forms.ModelMultipleChoiceField):
+    iterator = MaterialChoiceIterator
+
+    def __init__(self, **kwargs):
+        super().__init__(queryset=MathModel.objects.all(), **kwargs)
+
+
 class ExperimentForm(forms.ModelForm):
 
-    material = forms.ModelChoiceField(
-        queryset=MathModel.objects.all(),
+    material = MaterialChoiceField(
         label="Материал",
         widget=forms.Select(attrs={"class": "form-control"}),
     )
@@ -79,6 +161,20 @@ class ExperimentForm(forms.ModelForm):
         initial=2,
     )
 
+    sampling = forms.ChoiceField(
+        label="Способ построения сетки",
+        choices=Experiment._meta.get_field("sampling").choices,
+        widget=forms.Select(attrs={"class": "form-control"}),
+        initial="uniform",
+        help_text="При адаптивном уточнении шаги варьирования задают минимальный шаг сетки",
+    )
+
+    tolerance = forms.FloatField(
+        label="Допустимое отклонение от линейной интерполяции",
+        widget=forms.NumberInput(attrs={"class": "form-control", "step": "any"}),
+        initial=0.01,
+    )
+
     class Meta:
         model = Experiment
         fields = [
@@ -89,6 +185,8 @@ class ExperimentForm(forms.ModelForm):
             "tau_min",
             "tau_max",
             "delta_tau",
+            "sampling",
+            "tolerance",
         ]
 
     def clean(self):
@@ -101,40 +199,266 @@ class ExperimentForm(forms.ModelForm):
         tau_max = cleaned_data.get("tau_max")
         delta_tau = cleaned_data.get("delta_tau")
 
-        errors = {}
+        errors = grid_errors(t_min, t_max, delta_t, tau_min, tau_max, delta_tau)
+        if errors:
+            raise ValidationError(errors)
 
-        if t_min is not None and t_max is not None and t_min > t_max:
-            errors["t_min"] = (
-                "Нижний порог температуры спекания должен быть меньше верхнего."
-            )
+        return cleaned_data
 
-        if tau_min is not None and tau_max is not None and tau_min > tau_max:
-            errors["tau_min"] = (
-                "Нижний порог времени изометрической выдержки должен быть меньше верхнего."
-            )
 
-        if delta_t is not None and delta_t <= 0:
-            errors["delta_t"] = (
-                "Шаг варьирования температуры спекания должен быть больше нуля."
-            )
+class ExperimentFilterForm(forms.Form):
+    # Поле формы и соответствующий ему фильтр по сводным показателям
+    LOOKUPS = {
+        "material": "material",
+        "porosity_min_below": "porosity_min__lt",
+        "porosity_max_above": "porosity_max__gt",
+        "porosity_at_avg_below": "porosity_at_avg__lt",
+        "porosity_at_avg_above": "porosity_at_avg__gt",
+    }
 
-        if delta_tau is not None and delta_tau <= 0:
-            errors["delta_tau"] = (
-                "Шаг варьирования времени изометрической выдержки должен быть больше нуля."
-            )
+    material = MaterialChoiceField(
+        label="Материал",
+        required=False,
+        widget=forms.Select(attrs={"class": "form-control"}),
+    )
 
-        if t_min is not None and t_max is not None and delta_t is not None:
-            if (t_max - t_min) / delta_t > 1000:
-                errors["delta_t"] = (
-                    "Слишком маленький шаг температуры. Увеличьте шаг или уменьшите диапазон."
-                )
+    porosity_min_below = forms.FloatField(
+        label="Минимальная пористость меньше",
+        required=False,
+        widget=forms.NumberInput(attrs={"class": "form-control", "step": "any"}),
+    )
 
-        if tau_min is not None and tau_max is not None and delta_tau is not None:
-            if (tau_max - tau_min) / delta_tau > 1000:
-                errors["delta_tau"] = (
-                    "Слишком маленький шаг времени. Увеличьте шаг или уменьшите диапазон."
-                )
-        if errors:
-            raise ValidationError(errors)
+    porosity_max_above = forms.FloatField(
+        label="Максимальная пористость больше",
+        required=False,
+        widget=forms.NumberInput(attrs={"class": "form-control", "step": "any"}),
+    )
+
+    porosity_at_avg_below = forms.FloatField(
+        label="Пористость при средних t и τ меньше",
+        required=False,
+        widget=forms.NumberInput(attrs={"class": "form-control", "step": "any"}),
+    )
+
+    porosity_at_avg_above = forms.FloatField(
+        label="Пористость при средних t и τ больше",
+        required=False,
+        widget=forms.NumberInput(attrs={"class": "form-control", "step": "any"}),
+    )
+
+    def filter(self, queryset):
+        filters = {
+            lookup: self.cleaned_data[field]
+            for field, lookup in self.LOOKUPS.items()
+            if self.cleaned_data.get(field) is not None
+        }
+        return queryset.filter(**filters)
+
+
+MAX_SWEEP_EXPERIMENTS = 1000
 
+
+class ValuesField(forms.CharField):
+    """
+    Список значений параметра: числа через запятую ("1300, 1350") или
+    диапазон "начало:конец:шаг" включительно.
+    """
+
+    widget = forms.TextInput(attrs={"class": "form-control"})
+    default_help_text = "Значения через запятую или диапазон начало:конец:шаг"
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("help_text", self.default_help_text)
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        value = super().to_python(value)
+        if not value:
+            return []
+        try:
+            if ":" in value:
+                start, stop, step = (float(part) for part in value.split(":"))
+                if step <= 0:
+                    raise ValidationError("Шаг диапазона должен быть больше нуля.")
+                count = math.floor(round((stop - start) / step, 9)) + 1
+                if count > MAX_SWEEP_EXPERIMENTS:
+                    raise ValidationError("Слишком много значений в диапазоне.")
+                return [round(start + i * step, 9) for i in range(max(count, 0))]
+            return [float(part) for part in value.split(",") if part.strip()]
+        except ValueError:
+            raise ValidationError("Введите числа через запятую или диапазон.")
+
+
+class SweepForm(forms.Form):
+    GRID_FIELDS = ("t_min", "t_max", "delta_t", "tau_min", "tau_max", "delta_tau")
+
+    materials = MaterialMultipleChoiceField(
+        label="Материалы",
+        widget=forms.SelectMultiple(attrs={"class": "form-control"}),
+    )
+
+    t_min = ValuesField(
+        label="Нижние пороги температуры спекания (°C)",
+        initial="1300",
+    )
+
+    t_max = ValuesField(
+        label="Верхние пороги температуры спекания (°C)",
+        initial="1450, 1550",
+    )
+
+    delta_t = ValuesField(
+        label="Шаги варьирования температуры спекания (°C)",
+        initial="10",
+    )
+
+    tau_min = ValuesField(
+        label="Нижние пороги времени изометрической выдержки (мин)",
+        initial="30",
+    )
+
+    tau_max = ValuesField(
+        label="Верхние пороги времени изометрической выдержки (мин)",
+        initial="60:90:30",
+    )
+
+    delta_tau = ValuesField(
+        label="Шаги варьирования времени изометрической выдержки (мин)",
+        initial="2",
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+
+        combinations = list(
+            itertools.product(*(cleaned_data[field] for field in self.GRID_FIELDS))
+        )
+        total = len(combinations) * len(cleaned_data["materials"])
+        if total > MAX_SWEEP_EXPERIMENTS:
+            raise ValidationError(
+                f"Серия содержит {total} экспериментов, допускается не более "
+                f"{MAX_SWEEP_EXPERIMENTS}."
+            )
+        Experiment.check_materials(
+            [material.pk for material in cleaned_data["materials"]]
+        )
+        # Эксперименты серии создаются через bulk_create без full_clean,
+        # поэтому валидаторы полей модели проверяются здесь
+        exclude = [
+            field.name
+            for field in Experiment._meta.fields
+            if field.name not in self.GRID_FIELDS
+        ]
+        for combination in combinations:
+            messages = list(grid_errors(*combination).values())
+            try:
+                Experiment(**dict(zip(self.GRID_FIELDS, combination))).clean_fields(
+                    exclude=exclude
+                )
+            except ValidationError as error:
+                messages.extend(error.messages)
+            if messages:
+                grid = ", ".join(
+                    f"{field}={value:g}"
+                    for field, value in zip(self.GRID_FIELDS, combination)
+                )
+                raise ValidationError([f"{grid}: {message}" for message in messages])
+        cleaned_data["grids"] = [
+            dict(zip(self.GRID_FIELDS, combination)) for combination in combinations
+        ]
         return cleaned_data
+
+
+class ResidualUploadForm(forms.Form):
+    file = forms.FileField(
+        label="Файл измерений (CSV или XLSX: t, τ, измеренное значение)",
+        widget=forms.ClearableFileInput(
+            attrs={"class": "form-control", "accept": ".csv,.txt,.xlsx"}
+        ),
+    )
+
+    response = forms.ChoiceField(
+        label="Отклик",
+        choices=PolynomialTerm.RESPONSE_CHOICES,
+        initial="porosity",
+        widget=forms.Select(attrs={"class": "form-control"}),
+    )
+
+    threshold = forms.FloatField(
+        label="Порог выброса, σ",
+        initial=3,
+        min_value=0.1,
+        widget=forms.NumberInput(attrs={"class": "form-control", "step": "any"}),
+    )
+
+
+# Сравниваются только рассчитанные эксперименты; сами результаты
+# берутся из кэша серий, поэтому в выборке не загружаются
+COMPARABLE_EXPERIMENTS = (
+    Experiment.objects.filter(results_version__gt=0)
+    .select_related("material")
+    .defer("results", "derivatives")
+    .order_by("-created_at")
+)
+
+
+class ExperimentChoiceField(forms.ModelChoiceField):
+    """
+    Эксперимент по номеру. Список всех рассчитанных экспериментов растет
+    без ограничений, поэтому номер вводится числом и проверяется одним
+    запросом к выборке, а не выводится вариантами выбора.
+    """
+
+    widget = forms.NumberInput
+    default_error_messages = {
+        "invalid_choice": "Рассчитанный эксперимент №%(value)s не найден.",
+    }
+
+
+class ExperimentCompareForm(forms.Form):
+    a = ExperimentChoiceField(
+        queryset=COMPARABLE_EXPERIMENTS,
+        label="Эксперимент A",
+        widget=forms.NumberInput(attrs={"class": "form-control", "min": 1}),
+    )
+
+    b = ExperimentChoiceField(
+        queryset=COMPARABLE_EXPERIMENTS,
+        label="Эксперимент B",
+        widget=forms.NumberInput(attrs={"class": "form-control", "min": 1}),
+    )
+
+
+class PerformanceFilterForm(forms.Form):
+    PERIODS = (
+        ("", "За все время"),
+        ("1", "За сутки"),
+        ("7", "За неделю"),
+        ("30", "За 30 дней"),
+        ("365", "За год"),
+    )
+
+    grouping = forms.ChoiceField(
+        label="Группировка",
+        choices=[
+            ("material", "По материалам"),
+            ("day", "По дням"),
+            ("week", "По неделям"),
+            ("month", "По месяцам"),
+        ],
+        initial="material",
+        required=False,
+    )
+
+    days = forms.TypedChoiceField(
+        label="Период",
+        choices=PERIODS,
+        coerce=int,
+        empty_value=None,
+        required=False,
+    )
+
+    def clean_grouping(self):
+        return self.cleaned_data["grouping"] or "material"
@@ -0,0 +1,147 @@
+import glob
+import hashlib
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+from research.catalog import material_catalog
+from research.parallel import evaluate_surface
+
+DEFAULT_HEATMAP_SIZE = (480, 320)
+
+# Допустимые стороны изображения: запрошенная сторона округляется вверх до
+# ближайшей из них, поэтому в дисковом кэше у эксперимента не больше
+# len(HEATMAP_SIDES)² изображений
+HEATMAP_SIDES = (160, 320, 480, 640, 960, 1280, 1600, 2000)
+MAX_HEATMAP_SIDE = HEATMAP_SIDES[-1]
+
+# Опорные цвета палитры (от меньшей пористости к большей), между ними
+# таблица заполняется линейной интерполяцией
+COLORMAP_ANCHORS = np.array(
+    [
+        (68, 1, 84),
+        (59, 82, 139),
+        (33, 145, 140),
+        (94, 201, 98),
+        (253, 231, 37),
+    ],
+    dtype=np.float64,
+)
+
+
+def build_colormap(size=256):
+    positions = np.linspace(0, 1, len(COLORMAP_ANCHORS))
+    levels = np.linspace(0, 1, size)
+    return np.stack(
+        [
+            np.interp(levels, positions, COLORMAP_ANCHORS[:, channel])
+            for channel in range(3)
+        ],
+        axis=1,
+    ).astype(np.uint8)
+
+
+COLORMAP = build_colormap()
+
+# Цвет точек, где полином не дает числа (NaN, ±inf)
+MISSING_COLOR = (255, 255, 255)
+
+
+def colorize(values):
+    finite = np.isfinite(values)
+    if not finite.any():
+        return np.full((*values.shape, 3), MISSING_COLOR, dtype=np.uint8)
+    low, high = values[finite].min(), values[finite].max()
+    scale = (len(COLORMAP) - 1) / (high - low) if high > low else 0
+    scaled = np.where(finite, (values - low) * scale, 0)
+    indices = np.clip(scaled.astype(np.int64), 0, len(COLORMAP) - 1)
+    pixels = COLORMAP[indices]
+    pixels[~finite] = MISSING_COLOR
+    return pixels
+
+
+def png_chunk(chunk_type, data):
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+    )
+
+
+def encode_png(pixels):
+    """Кодирует RGB-изображение формы (height, width, 3) в PNG без фильтров."""
+    height, width, _ = pixels.shape
+    rows = np.zeros((height, width * 3 + 1), dtype=np.uint8)
+    rows[:, 1:] = pixels.reshape(height, width * 3)
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + png_chunk(b"IHDR", header)
+        + png_chunk(b"IDAT", zlib.compress(rows.tobytes(), 6))
+        + png_chunk(b"IEND", b"")
+    )
+
+
+def render_heatmap(experiment, width, height, matrix):
+    # По горизонтали температура, по вертикали время (τ_max сверху)
+    t = np.linspace(experiment.t_min, experiment.t_max, width)
+    tau = np.linspace(experiment.tau_max, experiment.tau_min, height)
+    with evaluate_surface(matrix, t, tau) as surface:
+        return encode_png(colorize(surface.T))
+
+
+def heatmap_cache_key(experiment, matrix):
+    """Хэш данных, от которых зависит изображение, кроме его размеров."""
+    parts = [
+        experiment.pk,
+        experiment.results_version,
+        experiment.t_min,
+        experiment.t_max,
+        experiment.tau_min,
+        experiment.tau_max,
+        matrix.tolist(),
+    ]
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def remove_superseded(cache_dir, experiment, digest):
+    """Удаляет изображения эксперимента, построенные по прежним данным."""
+    for path in glob.glob(os.path.join(cache_dir, f"{experiment.pk}-*.png")):
+        if not os.path.basename(path).startswith(f"{experiment.pk}-{digest}-"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def snap_side(side):
+    """Наименьшая допустимая сторона не меньше side (side <= MAX_HEATMAP_SIDE)."""
+    return next(allowed for allowed in HEATMAP_SIDES if allowed >= side)
+
+
+def heatmap_path(experiment, width, height):
+    """
+    Путь к PNG в дисковом кэше; изображение строится при первом обращении.
+    Размеры округляются вверх до HEATMAP_SIDES.
+    """
+    width, height = snap_side(width), snap_side(height)
+    matrix = material_catalog().matrix(experiment.material_id)
+    digest = heatmap_cache_key(experiment, matrix)
+    cache_dir = settings.HEATMAP_CACHE_DIR
+    path = os.path.join(cache_dir, f"{experiment.pk}-{digest}-{width}x{height}.png")
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        content = render_heatmap(experiment, width, height, matrix)
+        # Запись через временный файл, чтобы параллельные запросы не читали
+        # недописанное изображение
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(content)
+        os.replace(tmp_path, path)
+        remove_superseded(cache_dir, experiment, digest)
+    return path
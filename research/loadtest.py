@@ -0,0 +1,212 @@
+import http.client
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+import numpy as np
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.test.testcases import QuietWSGIRequestHandler
+from django.urls import reverse
+
+from research.query_budget import FIXTURE_EMAIL, FIXTURE_PASSWORD
+
+# Доли видов запросов в смеси по умолчанию
+DEFAULT_MIX = {
+    "login": 1,
+    "list": 6,
+    "detail": 6,
+    "create": 2,
+    "recalculate": 2,
+    "excel": 1,
+}
+
+PERCENTILES = (50, 90, 95, 99)
+REQUEST_TIMEOUT = 60
+
+
+def parse_mix(value):
+    """Смесь запросов из строки вида "list=6,detail=6,create=1"."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(
+                f"Неизвестный запрос {name}, допустимые: {', '.join(DEFAULT_MIX)}"
+            )
+        mix[name] = float(weight)
+        if mix[name] < 0:
+            raise ValueError(f"Отрицательная доля запроса {name}")
+    if not sum(mix.values()):
+        raise ValueError("Смесь запросов пуста")
+    return mix
+
+
+class Session:
+    """HTTP-клиент одного пользователя: cookie сессии и токен CSRF."""
+
+    def __init__(self, address):
+        self.address = address
+        self.cookies = {}
+
+    def request(self, method, path, data=None):
+        headers = {}
+        if self.cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if method == "POST":
+            body = urlencode(data or {})
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            headers["X-CSRFToken"] = self.cookies.get("csrftoken", "")
+        connection = http.client.HTTPConnection(*self.address, timeout=REQUEST_TIMEOUT)
+        try:
+            connection.request(method, path, body, headers)
+            response = connection.getresponse()
+            content = response.read()
+        finally:
+            connection.close()
+        for header in response.headers.get_all("Set-Cookie") or ():
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return response.status, content
+
+
+def login(address):
+    """Новая сессия: страница входа (cookie CSRF) и отправка формы."""
+    session = Session(address)
+    session.request("GET", reverse("research:login"))
+    started = time.perf_counter()
+    status, _ = session.request(
+        "POST",
+        reverse("research:login"),
+        {"username": FIXTURE_EMAIL, "password": FIXTURE_PASSWORD},
+    )
+    if status != 302:
+        raise RuntimeError(f"Вход не выполнен, код ответа {status}")
+    return session, status, time.perf_counter() - started
+
+
+def scenario(name, fixtures):
+    """Метод, адрес и данные запроса вида name со случайными параметрами."""
+    experiment = random.choice(fixtures["experiments"])
+    if name == "list":
+        page = random.randint(1, fixtures["pages"])
+        return "GET", f"{reverse('research:experiment_list')}?page={page}", None
+    if name == "detail":
+        return "GET", reverse("research:experiment_results", args=[experiment]), None
+    if name == "create":
+        data = {
+            "material": random.choice(fixtures["materials"]),
+            "t_min": 1300,
+            "t_max": random.choice((1450, 1500, 1550)),
+            "delta_t": 10,
+            "tau_min": 30,
+            "tau_max": random.choice((60, 90)),
+            "delta_tau": 2,
+            "sampling": "uniform",
+            "tolerance": 0.01,
+        }
+        return "POST", reverse("research:experiment_create"), data
+    if name == "recalculate":
+        return "POST", reverse("research:experiment_recalculate", args=[experiment]), {}
+    if name == "excel":
+        return (
+            "GET",
+            reverse("research:experiment_export_excel", args=[experiment]),
+            None,
+        )
+    raise ValueError(name)
+
+
+@contextmanager
+def serve(host="127.0.0.1", port=0):
+    """
+    Приложение WSGI в потоке текущего процесса на локальном порту (0 -
+    любой свободный); каждый запрос обрабатывается в своем потоке.
+    """
+    server = ThreadedWSGIServer((host, port), QuietWSGIRequestHandler)
+    server.set_app(WSGIHandler())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address[:2]
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def run(address, fixtures, mix, users, duration):
+    """
+    users потоков-пользователей в течение duration секунд выполняют
+    запросы смеси mix. Возвращает {запрос: [(задержка в с, ошибка), ...]};
+    ошибка - код ответа от 400 и выше или имя исключения, иначе None.
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    samples = {name: [] for name in names}
+    lock = threading.Lock()
+    barrier = threading.Barrier(users)
+
+    def user(session):
+        records = []
+        barrier.wait()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                if name == "login":
+                    session, status, latency = login(address)
+                else:
+                    method, path, data = scenario(name, fixtures)
+                    status, _ = session.request(method, path, data)
+                    latency = time.perf_counter() - started
+                failure = str(status) if status >= 400 else None
+            except (OSError, http.client.HTTPException, RuntimeError) as error:
+                latency = time.perf_counter() - started
+                failure = type(error).__name__
+            records.append((name, latency, failure))
+        with lock:
+            for name, latency, failure in records:
+                samples[name].append((latency, failure))
+
+    # Пользователи входят до начала замера
+    sessions = [login(address)[0] for _ in range(users)]
+    threads = [threading.Thread(target=user, args=(session,)) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def summarize(samples, duration):
+    """Сводка по видам запросов и итог: число, ошибки, запросов/с, задержки (мс)."""
+
+    def row(records):
+        latencies = np.array([latency for latency, _ in records]) * 1000
+        failures = Counter(failure for _, failure in records if failure)
+        errors = sum(failures.values())
+        summary = {
+            "requests": len(records),
+            "errors": errors,
+            "failures": dict(failures),
+            "error_rate": round(errors / len(records) * 100, 2) if records else 0,
+            "rps": round(len(records) / duration, 2),
+        }
+        for p in PERCENTILES:
+            summary[f"p{p}"] = (
+                round(float(np.percentile(latencies, p)), 1) if records else None
+            )
+        summary["max"] = round(float(latencies.max()), 1) if records else None
+        return summary
+
+    endpoints = {name: row(records) for name, records in samples.items()}
+    total = row([record for records in samples.values() for record in records])
+    return endpoints, total
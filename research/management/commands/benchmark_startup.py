@@ -0,0 +1,114 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Запуск рабочего процесса: приложение WSGI и таблица маршрутов, которая
+# иначе загружается при первом запросе
+BOOT_CODE = (
+    "import os\n"
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')\n"
+    "import config.wsgi\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+# Библиотеки, которые загружаются только при первом использовании
+LAZY_MODULES = ("openpyxl", "psutil")
+
+
+def parse_importtime(output):
+    """
+    Строки вывода -X importtime: (модуль, собственное время, суммарное
+    время в мкс, уровень вложенности).
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|", 2)
+        level = (len(name) - len(name.lstrip())) // 2
+        modules.append((name.strip(), int(own), int(cumulative), level))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер времени запуска рабочего процесса сервера и разбор времени "
+        "импорта модулей (-X importtime); завершается с ошибкой при "
+        "превышении бюджета или загрузке отложенных библиотек"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--budget",
+            type=float,
+            default=1500,
+            help="Допустимая медиана времени запуска, мс",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=15,
+            help="Число пакетов с наибольшим временем импорта",
+        )
+        parser.add_argument(
+            "--no-warmup",
+            action="store_true",
+            help="Запуск без подготовки кэшей (WARMUP_ON_START=0)",
+        )
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "WARMUP_ON_START": "0" if options["no_warmup"] else "1"}
+        timings = [self.boot(env) for _ in range(options["repeat"])]
+        median = statistics.median(timings)
+
+        result = self.run([sys.executable, "-X", "importtime", "-c", BOOT_CODE], env)
+        modules = parse_importtime(result.stderr)
+        packages = Counter()
+        for name, own, _, _ in modules:
+            packages[name.split(".")[0]] += own
+        self.stdout.write(
+            f"Время импорта по пакетам (всего {len(modules)} модулей, "
+            f"{sum(packages.values()) / 1000:.1f} мс):"
+        )
+        for name, own in packages.most_common(options["top"]):
+            self.stdout.write(f"  {own / 1000:8.1f} мс  {name}")
+        imported = {module[0] for module in modules}
+        loaded_lazy = [
+            name
+            for name in LAZY_MODULES
+            if name in imported or any(m.startswith(f"{name}.") for m in imported)
+        ]
+
+        self.stdout.write(
+            f"Запуск процесса: медиана {median:.1f} мс, лучшее {min(timings):.1f} мс, "
+            f"бюджет {options['budget']:.0f} мс"
+        )
+        if loaded_lazy:
+            raise CommandError(
+                f"При запуске загружаются отложенные библиотеки: {', '.join(loaded_lazy)}"
+            )
+        if median > options["budget"]:
+            raise CommandError(
+                f"Время запуска {median:.1f} мс превышает бюджет {options['budget']:.0f} мс"
+            )
+
+    def boot(self, env):
+        started = time.perf_counter()
+        self.run([sys.executable, "-c", BOOT_CODE], env)
+        return (time.perf_counter() - started) * 1000
+
+    def run(self, command, env):
+        result = subprocess.run(
+            command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        if result.returncode:
+            raise CommandError(f"Процесс завершился с ошибкой:\n{result.stderr}")
+        return result
@@ -0,0 +1,122 @@
+import math
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from research.evaluation import coefficient_matrix
+from research.models import MathModel
+from research.parallel import default_workers, evaluate_surface
+
+
+class Command(BaseCommand):
+    help = (
+        "Замер времени расчета полной поверхности отклика в зависимости "
+        "от числа процессов и поиск размера сетки, начиная с которого пул "
+        "процессов быстрее расчета в текущем процессе "
+        "(SURFACE_PARALLEL_THRESHOLD)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--points",
+            type=int,
+            default=10_000_000,
+            help="Число точек сетки t × τ",
+        )
+        parser.add_argument(
+            "--workers",
+            default=None,
+            help="Список чисел процессов через запятую, например 1,2,4",
+        )
+        parser.add_argument(
+            "--material",
+            type=int,
+            default=None,
+            help="Материал, коэффициенты которого используются в расчете",
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        if options["material"]:
+            try:
+                material = MathModel.objects.get(pk=options["material"])
+            except MathModel.DoesNotExist:
+                raise CommandError(f"Материал {options['material']} не найден")
+            matrix = coefficient_matrix(material)
+        else:
+            matrix = np.random.default_rng(0).normal(scale=1e-3, size=(3, 3))
+
+        if options["workers"]:
+            try:
+                counts = [int(value) for value in options["workers"].split(",")]
+            except ValueError:
+                raise CommandError("--workers: ожидается список целых чисел")
+        else:
+            cores = default_workers()
+            counts = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+
+        side = math.ceil(math.sqrt(options["points"]))
+        t = np.linspace(1000, 2000, side)
+        tau = np.linspace(0, 200, side)
+        self.stdout.write(
+            f"Сетка {side} × {side} ({side * side} точек), ядер: {default_workers()}"
+        )
+
+        # Базовая линия - расчет в текущем процессе без пула; остальные
+        # замеры используют пул при любом размере сетки
+        baseline, checksum = self.measure(matrix, t, tau, 1, options["repeat"])
+        for workers in counts:
+            best, total = self.measure(matrix, t, tau, workers, options["repeat"])
+            if not np.isclose(total, checksum):
+                raise CommandError(f"Результат для {workers} процессов не совпадает")
+            speedup = baseline / best
+            self.stdout.write(
+                f"процессов: {workers:>3}  время: {best:8.3f} с  "
+                f"точек/с: {side * side / best:14,.0f}  ускорение: {speedup:5.2f}  "
+                f"эффективность: {speedup / workers:5.2f}"
+            )
+        self.crossover(matrix, side, max(counts), options["repeat"])
+
+    def crossover(self, matrix, max_side, workers, repeat):
+        """
+        Время в текущем процессе и в пуле для сеток растущего размера;
+        наименьший размер, с которого пул быстрее, - рекомендуемый порог.
+        """
+        if workers == 1:
+            return
+        self.stdout.write(f"Порог распараллеливания, процессов: {workers}")
+        threshold = None
+        side = min(100, max_side)
+        while True:
+            t = np.linspace(1000, 2000, side)
+            tau = np.linspace(0, 200, side)
+            local, _ = self.measure(matrix, t, tau, 1, repeat)
+            pool, _ = self.measure(matrix, t, tau, workers, repeat)
+            self.stdout.write(
+                f"точек: {side * side:>12,}  в процессе: {local:8.4f} с  "
+                f"в пуле: {pool:8.4f} с"
+            )
+            if pool < local and threshold is None:
+                threshold = side * side
+            if side == max_side:
+                break
+            side = min(side * 2, max_side)
+        if threshold is None:
+            self.stdout.write(
+                "Пул не быстрее расчета в текущем процессе ни для одного размера"
+            )
+        else:
+            self.stdout.write(f"Рекомендуемый SURFACE_PARALLEL_THRESHOLD: {threshold}")
+
+    def measure(self, matrix, t, tau, workers, repeat):
+        """Лучшее время из repeat запусков и контрольная сумма поверхности."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            with evaluate_surface(
+                matrix, t, tau, workers=workers, threshold=0
+            ) as surface:
+                total = float(surface.sum())
+            timings.append(time.perf_counter() - started)
+        return min(timings), total
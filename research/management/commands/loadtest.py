@@ -0,0 +1,205 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from research.loadtest import DEFAULT_MIX, PERCENTILES, parse_mix, run, serve, summarize
+from research.models import Experiment, MathModel
+from research.query_budget import build_fixtures
+from research.views import ExperimentListView
+from research.warmup import warmup
+
+
+def mix_argument(value):
+    try:
+        return parse_mix(value)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочное тестирование по HTTP: приложение запускается в текущем "
+        "процессе на локальном порту с временной базой данных, потоки-"
+        "пользователи выполняют смесь запросов (вход, список, результаты, "
+        "создание, пересчет, экспорт Excel). Выводит запросы/с, задержки и "
+        "долю ошибок по видам запросов"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=8, help="Число одновременных пользователей"
+        )
+        parser.add_argument(
+            "--duration", type=float, default=30, help="Длительность, с"
+        )
+        parser.add_argument(
+            "--mix",
+            type=mix_argument,
+            default=DEFAULT_MIX,
+            help=(
+                "Доли запросов, по умолчанию "
+                + ",".join(f"{name}={weight}" for name, weight in DEFAULT_MIX.items())
+            ),
+        )
+        parser.add_argument("--materials", type=int, default=50)
+        parser.add_argument("--experiments", type=int, default=500)
+        parser.add_argument(
+            "--port", type=int, default=0, help="Порт сервера (0 - любой свободный)"
+        )
+        parser.add_argument("--report", default=None, help="Файл отчета .json")
+        parser.add_argument(
+            "--baseline",
+            default=None,
+            help="Отчет предыдущего запуска (.json) для сравнения",
+        )
+        parser.add_argument(
+            "--max-error-rate",
+            type=float,
+            default=1.0,
+            help="Допустимая доля ошибок, %%",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            try:
+                with open(options["baseline"], encoding="utf-8") as file:
+                    baseline = json.load(file)
+            except (OSError, ValueError) as error:
+                raise CommandError(f"--baseline: {error}")
+
+        connection = connections["default"]
+        directory = tempfile.mkdtemp()
+        saved_name = connection.settings_dict["TEST"].get("NAME")
+        if connection.vendor == "sqlite":
+            # Файловая база вместо базы в памяти: запросы обрабатываются в
+            # разных потоках со своими соединениями
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                directory, "loadtest.sqlite3"
+            )
+        try:
+            with override_settings(
+                DEBUG=False,
+                ALLOWED_HOSTS=["127.0.0.1", "localhost"],
+                HEATMAP_CACHE_DIR=os.path.join(directory, "heatmaps"),
+                METRICS_DIR=os.path.join(directory, "metrics"),
+                CACHE_VERSION_DIR=os.path.join(directory, "versions"),
+                PROFILING_SAMPLE_RATE=0,
+                SLOW_REQUEST_MS=float("inf"),
+            ):
+                old_config = setup_databases(
+                    verbosity=0, interactive=False, aliases={"default"}
+                )
+                try:
+                    fixtures = self.seed(options["materials"], options["experiments"])
+                    samples = self.load(fixtures, options)
+                finally:
+                    teardown_databases(old_config, verbosity=0)
+        finally:
+            connection.settings_dict["TEST"]["NAME"] = saved_name
+            shutil.rmtree(directory, ignore_errors=True)
+
+        endpoints, total = summarize(samples, options["duration"])
+        self.print_table(endpoints, total)
+        config = {
+            "users": options["users"],
+            "duration": options["duration"],
+            "mix": options["mix"],
+            "materials": options["materials"],
+            "experiments": options["experiments"],
+        }
+        if baseline:
+            if any(baseline.get(key) != value for key, value in config.items()):
+                self.stdout.write(
+                    "Параметры предыдущего запуска отличаются, сравнение условное"
+                )
+            self.print_comparison(baseline, endpoints, total)
+        if options["report"]:
+            report = {**config, "endpoints": endpoints, "total": total}
+            with open(options["report"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+        if total["error_rate"] > options["max_error_rate"]:
+            raise CommandError(
+                f"Доля ошибок {total['error_rate']}% превышает "
+                f"{options['max_error_rate']}%"
+            )
+
+    def seed(self, materials, experiments):
+        build_fixtures(materials, experiments, sweep_size=min(100, experiments))
+        for cache in caches.all():
+            cache.clear()
+        ids = list(Experiment.objects.values_list("pk", flat=True))
+        return {
+            "experiments": ids,
+            "materials": list(MathModel.objects.values_list("pk", flat=True)),
+            "pages": math.ceil(len(ids) / ExperimentListView.paginate_by),
+        }
+
+    def load(self, fixtures, options):
+        if settings.WARMUP_ON_START:
+            warmup()
+        with serve(port=options["port"]) as address:
+            self.stdout.write(
+                f"Сервер http://{address[0]}:{address[1]}/, пользователей: "
+                f"{options['users']}, длительность {options['duration']:g} с"
+            )
+            return run(
+                address,
+                fixtures,
+                options["mix"],
+                options["users"],
+                options["duration"],
+            )
+
+    def print_table(self, endpoints, total):
+        header = (
+            f"{'запрос':<12} {'всего':>7} {'ошибок':>7} {'ошибок %':>9} "
+            f"{'запр/с':>8}"
+            + "".join(f" {f'p{p}, мс':>9}" for p in PERCENTILES)
+            + f" {'max, мс':>9}"
+        )
+        self.stdout.write(header)
+        for name, row in [*endpoints.items(), ("итого", total)]:
+            if not row["requests"]:
+                self.stdout.write(f"{name:<12} {0:>7}")
+                continue
+            self.stdout.write(
+                f"{name:<12} {row['requests']:>7} {row['errors']:>7} "
+                f"{row['error_rate']:>9.2f} {row['rps']:>8.2f}"
+                + "".join(f" {row[f'p{p}']:>9.1f}" for p in PERCENTILES)
+                + f" {row['max']:>9.1f}"
+            )
+        for name, row in endpoints.items():
+            if row["failures"]:
+                failures = ", ".join(
+                    f"{failure}: {count}" for failure, count in row["failures"].items()
+                )
+                self.stdout.write(f"Ошибки {name}: {failures}")
+
+    def print_comparison(self, baseline, endpoints, total):
+        """Запросы/с и p95 относительно предыдущего отчета."""
+        self.stdout.write("Сравнение с предыдущим отчетом (было → стало):")
+        rows = [*endpoints.items(), ("итого", total)]
+        for name, row in rows:
+            before = (
+                baseline["total"]
+                if name == "итого"
+                else baseline["endpoints"].get(name)
+            )
+            if not before or not before["requests"] or not row["requests"]:
+                continue
+            change = (row["rps"] / before["rps"] - 1) * 100 if before["rps"] else 0
+            self.stdout.write(
+                f"{name:<12} запр/с {before['rps']:>8.2f} → {row['rps']:>8.2f} "
+                f"({change:+.1f}%)   p95 {before['p95']:>8.1f} → {row['p95']:>8.1f} мс"
+            )
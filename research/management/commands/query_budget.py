@@ -0,0 +1,109 @@
+import csv
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from research.query_budget import (
+    build_fixtures,
+    check_routes,
+    isolated_settings,
+    run,
+)
+
+REPORT_FIELDS = (
+    "route",
+    "url",
+    "status",
+    "expected_status",
+    "queries",
+    "budget",
+    "sql_ms",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверка числа SQL-запросов каждого маршрута research и списков "
+        "администрирования на тестовой базе с данными рабочего объема; "
+        "завершается с ошибкой при превышении объявленного бюджета или "
+        "неожиданном коде ответа. Те же бюджеты проверяет manage.py test "
+        "(research.tests.QueryBudgetTests)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--materials", type=int, default=50)
+        parser.add_argument("--experiments", type=int, default=500)
+        parser.add_argument("--sweep-size", type=int, default=100)
+        parser.add_argument(
+            "--report",
+            default=None,
+            help="Файл отчета: .json или .csv",
+        )
+
+    def handle(self, *args, **options):
+        missing = check_routes()
+        if missing:
+            raise CommandError(f"Не объявлен бюджет запросов: {', '.join(missing)}")
+        if options["report"] and not options["report"].endswith((".json", ".csv")):
+            raise CommandError("--report: ожидается файл .json или .csv")
+
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity=0, interactive=False, aliases={"default"}
+        )
+        try:
+            with tempfile.TemporaryDirectory() as directory, override_settings(
+                **isolated_settings(directory)
+            ):
+                fixtures = build_fixtures(
+                    options["materials"], options["experiments"], options["sweep_size"]
+                )
+                report = run(fixtures)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        for row in report:
+            markers = []
+            if row["queries"] > row["budget"]:
+                markers.append("ПРЕВЫШЕН")
+            if row["status"] != row["expected_status"]:
+                markers.append(f"ожидался код {row['expected_status']}")
+            marker = ", ".join(markers)
+            self.stdout.write(
+                f"{row['route']:<50} {row['status']:>4} "
+                f"{row['queries']:>4}/{row['budget']:<4} {row['sql_ms']:>9.2f} мс  {marker}"
+            )
+        if options["report"]:
+            self.write_report(options["report"], report)
+
+        errors = []
+        exceeded = [row["route"] for row in report if row["queries"] > row["budget"]]
+        if exceeded:
+            errors.append(f"Превышен бюджет запросов: {', '.join(exceeded)}")
+        unexpected = [
+            f"{row['route']} ({row['status']})"
+            for row in report
+            if row["status"] != row["expected_status"]
+        ]
+        if unexpected:
+            errors.append(f"Неожиданный код ответа: {', '.join(unexpected)}")
+        if errors:
+            raise CommandError("; ".join(errors))
+
+    def write_report(self, path, report):
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            if path.endswith(".json"):
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            else:
+                writer = csv.DictWriter(file, REPORT_FIELDS)
+                writer.writeheader()
+                writer.writerows(report)
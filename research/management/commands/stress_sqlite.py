@@ -0,0 +1,225 @@
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+import traceback
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Avg, Count
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+from research import metrics
+from research.catalog import invalidate_material_catalog
+from research.database import is_lock_error
+from research.models import CalculationRun, Experiment, MathModel, PolynomialTerm
+from research.query_budget import COEFFICIENTS
+
+REPORT_PERCENTILES = (50, 95, 99)
+
+
+def read(experiment_ids):
+    """Запросы страниц чтения: список, результаты эксперимента, сводка."""
+    choice = random.random()
+    if choice < 0.4:
+        queryset = Experiment.objects.select_related("material").defer("results")
+        list(queryset.order_by("-created_at")[:10])
+        queryset.count()
+    elif choice < 0.8:
+        Experiment.objects.only("results").get(pk=random.choice(experiment_ids))
+    else:
+        list(
+            CalculationRun.objects.values("engine").annotate(
+                runs=Count("id"), time=Avg("calculation_time")
+            )
+        )
+
+
+def write(experiment_ids):
+    """Пересчет эксперимента; каждый пятый раз - новый эксперимент."""
+    if random.random() < 0.2:
+        experiment = Experiment.objects.get(pk=random.choice(experiment_ids))
+        experiment.pk = None
+        experiment.results_version = 0
+        experiment.save()
+    else:
+        experiment = Experiment.objects.get(pk=random.choice(experiment_ids))
+    experiment.calculate()
+
+
+def worker(role, experiment_ids, duration, barrier, results):
+    latencies, lock_errors, errors = [], 0, []
+    operation = write if role == "writer" else read
+    try:
+        barrier.wait()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                operation(experiment_ids)
+            except Exception as error:
+                if not is_lock_error(error):
+                    raise
+                lock_errors += 1
+                continue
+            latencies.append((time.perf_counter() - started) * 1000)
+    except Exception:
+        errors.append(traceback.format_exc())
+    finally:
+        connections.close_all()
+        metrics.flush(force=True)
+        results.put((role, latencies, lock_errors, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочная проверка SQLite: процессы-читатели и процессы-писатели "
+        "(пересчет экспериментов) работают одновременно с временной базой; "
+        "завершается с ошибкой при ошибках блокировки базы"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument(
+            "--duration", type=float, default=10, help="Длительность, с"
+        )
+        parser.add_argument("--materials", type=int, default=20)
+        parser.add_argument("--experiments", type=int, default=200)
+        parser.add_argument(
+            "--bare",
+            action="store_true",
+            help=(
+                "Без настроек SQLITE_PRAGMAS, режима транзакций и повторов "
+                "записи - для сравнения"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        connection = connections["default"]
+        if connection.vendor != "sqlite":
+            raise CommandError("Проверка предназначена для базы SQLite")
+
+        directory = tempfile.mkdtemp()
+        settings_dict = connection.settings_dict
+        saved = settings_dict["TEST"].get("NAME"), settings_dict["OPTIONS"]
+        settings_dict["TEST"]["NAME"] = os.path.join(directory, "stress.sqlite3")
+        if options["bare"]:
+            settings_dict["OPTIONS"] = {}
+        overrides = {
+            "METRICS_DIR": os.path.join(directory, "metrics"),
+            "CACHE_VERSION_DIR": os.path.join(directory, "versions"),
+        }
+        if options["bare"]:
+            overrides.update(SQLITE_PRAGMAS={}, SQLITE_LOCK_RETRIES=0)
+        try:
+            with override_settings(**overrides):
+                old_config = setup_databases(
+                    verbosity=0, interactive=False, aliases={"default"}
+                )
+                try:
+                    experiment_ids = self.seed(
+                        options["materials"], options["experiments"]
+                    )
+                    results = self.run(experiment_ids, options)
+                    retries = sum(
+                        value
+                        for _, value in metrics.collect()[
+                            metrics.DB_LOCK_RETRIES.name
+                        ].items()
+                    )
+                finally:
+                    teardown_databases(old_config, verbosity=0)
+        finally:
+            settings_dict["TEST"]["NAME"], settings_dict["OPTIONS"] = saved
+            shutil.rmtree(directory, ignore_errors=True)
+
+        self.report(results, options["duration"], retries)
+        errors = [error for result in results for error in result[3]]
+        if errors:
+            raise CommandError("Ошибки в рабочих процессах:\n" + "\n".join(errors))
+        lock_errors = sum(result[2] for result in results)
+        if lock_errors:
+            raise CommandError(f"Ошибок блокировки базы данных: {lock_errors}")
+
+    def seed(self, materials, experiments):
+        rng = np.random.default_rng(0)
+        created = MathModel.objects.bulk_create(
+            [MathModel(name=f"Материал {i + 1}") for i in range(materials)]
+        )
+        PolynomialTerm.objects.bulk_create(
+            [
+                PolynomialTerm(
+                    material=material,
+                    t_power=t_power,
+                    tau_power=tau_power,
+                    coefficient=coefficient * rng.uniform(0.9, 1.1),
+                )
+                for material in created
+                for (t_power, tau_power), coefficient in COEFFICIENTS.items()
+            ]
+        )
+        invalidate_material_catalog()
+        rows = Experiment.objects.bulk_create(
+            [
+                Experiment(
+                    material=created[i % materials],
+                    t_min=1300,
+                    t_max=1500,
+                    delta_t=10,
+                    tau_min=0,
+                    tau_max=60 + i % 5 * 10,
+                    delta_tau=2,
+                )
+                for i in range(experiments)
+            ]
+        )
+        Experiment.calculate_many(rows)
+        return [row.pk for row in rows]
+
+    def run(self, experiment_ids, options):
+        # Рабочие процессы наследуют настройки и справочник материалов, но
+        # не соединения с базой данных
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        roles = ["writer"] * options["writers"] + ["reader"] * options["readers"]
+        barrier = context.Barrier(len(roles))
+        queue = context.Queue()
+        processes = [
+            context.Process(
+                target=worker,
+                args=(role, experiment_ids, options["duration"], barrier, queue),
+            )
+            for role in roles
+        ]
+        for process in processes:
+            process.start()
+        results = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+        return results
+
+    def report(self, results, duration, retries):
+        self.stdout.write(
+            f"{'':<10} {'операций':>9} {'оп/с':>8} "
+            + " ".join(f"{f'p{p}, мс':>9}" for p in REPORT_PERCENTILES)
+            + f" {'max, мс':>9} {'блокировки':>11}"
+        )
+        for role, title in (("writer", "Запись"), ("reader", "Чтение")):
+            latencies = [
+                value for result in results if result[0] == role for value in result[1]
+            ]
+            lock_errors = sum(result[2] for result in results if result[0] == role)
+            if not latencies:
+                self.stdout.write(f"{title:<10} {0:>9} {'':>8}  {lock_errors:>11}")
+                continue
+            values = np.percentile(latencies, REPORT_PERCENTILES)
+            self.stdout.write(
+                f"{title:<10} {len(latencies):>9} {len(latencies) / duration:>8.1f} "
+                + " ".join(f"{value:>9.1f}" for value in values)
+                + f" {max(latencies):>9.1f} {lock_errors:>11}"
+            )
+        self.stdout.write(f"Повторов записи после блокировки: {retries:g}")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from research.warmup import warmup
+
+
+class Command(BaseCommand):
+    help = (
+        "Подготовка процесса к запросам: маршруты, шаблоны, вычислители "
+        "материалов и сетки последних экспериментов. Кэши живут в процессе, "
+        "поэтому команда показывает, что и за какое время загружается; "
+        "рабочие процессы сервера выполняют то же при WARMUP_ON_START=1"
+    )
+
+    def handle(self, *args, **options):
+        total = 0
+        for name, count, seconds in warmup():
+            total += seconds
+            count = "ошибка" if count is None else count
+            self.stdout.write(f"{name:<25} {count:>6}  {seconds * 1000:9.1f} мс")
+        self.stdout.write(f"{'Всего':<25} {'':>6}  {total * 1000:9.1f} мс")
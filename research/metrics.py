@@ -0,0 +1,380 @@
+import atexit
+import glob
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from research import cache
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9)
+
+REGISTRY = {}
+
+# Файл со счетчиками и гистограммами завершившихся процессов и файл
+# блокировки, под которой collect() переносит в него их значения
+ARCHIVE_FILE = "archive.json"
+LOCK_FILE = "collect.lock"
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_values = {}
+_dirty = False
+_flushed_at = 0.0
+_process = None
+
+
+def process_id():
+    """
+    Имя файла метрик текущего процесса. После fork (рабочие процессы
+    сервера) дочерний процесс получает новое имя и начинает счет с нуля,
+    чтобы не учитывать значения родителя повторно.
+    """
+    global _process, _dirty
+    pid = os.getpid()
+    if _process is None or _process[0] != pid:
+        if _process is not None:
+            _values.clear()
+            cache.hits.clear()
+            cache.misses.clear()
+        _process = (pid, f"{pid}-{uuid.uuid4().hex[:8]}")
+        _dirty = True
+    return _process[1]
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+    def key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: ожидаются метки {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def update(self, labels, change):
+        global _dirty
+        key = self.key(labels)
+        with _lock:
+            process_id()
+            samples = _values.setdefault(self.name, {})
+            samples[key] = change(samples.get(key))
+            _dirty = True
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        self.update(labels, lambda value: (value or 0) + amount)
+
+
+class Gauge(Metric):
+    """Значения процессов складываются; учитываются только живые процессы."""
+
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        self.update(labels, lambda value: (value or 0) + amount)
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_in_progress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value, **labels):
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+
+        def change(sample):
+            # Счетчики корзин без накопления, затем сумма наблюдений
+            sample = sample or [0] * len(self.buckets) + [0.0]
+            sample[index] += 1
+            sample[-1] += value
+            return sample
+
+        self.update(labels, change)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+CALCULATION_SECONDS = Histogram(
+    "research_calculation_seconds",
+    "Время расчета эксперимента или группы пакетного расчета",
+    ["mode"],
+)
+CALCULATION_GRID_POINTS = Histogram(
+    "research_calculation_grid_points",
+    "Число узлов сетки t × τ рассчитанного эксперимента",
+    ["mode"],
+    buckets=SIZE_BUCKETS,
+)
+CALCULATIONS_IN_PROGRESS = Gauge(
+    "research_calculations_in_progress", "Выполняемые сейчас расчеты", ["mode"]
+)
+EXPORT_SECONDS = Histogram(
+    "research_export_seconds",
+    "Время выгрузки результатов (для потоковых - до передачи последней порции)",
+    ["format"],
+)
+EXPORT_BYTES = Histogram(
+    "research_export_bytes",
+    "Размер выгрузки результатов",
+    ["format"],
+    buckets=BYTES_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "research_request_seconds",
+    "Время обработки запроса по представлениям",
+    ["view", "method"],
+)
+SURFACE_TILES_PENDING = Gauge(
+    "research_surface_tiles_pending",
+    "Плитки поверхности в очереди пула процессов",
+)
+CACHE_REQUESTS = Counter(
+    "research_cache_requests_total",
+    "Обращения к кэшу результатов по видам записей",
+    ["kind", "result"],
+)
+DB_LOCK_RETRIES = Counter(
+    "research_db_lock_retries_total",
+    "Повторы записи из-за блокировки базы данных SQLite",
+    ["operation"],
+)
+
+
+def serialize(pid, values):
+    return {
+        "pid": pid,
+        "metrics": {
+            name: [[list(key), value] for key, value in samples.items()]
+            for name, samples in values.items()
+        },
+    }
+
+
+def snapshot():
+    """Значения метрик текущего процесса, включая статистику кэша."""
+    with _lock:
+        identity = process_id()
+        values = {name: dict(samples) for name, samples in _values.items()}
+    values[CACHE_REQUESTS.name] = {
+        **{(kind, "hit"): count for kind, count in cache.hits.items()},
+        **{(kind, "miss"): count for kind, count in cache.misses.items()},
+    }
+    return identity, serialize(os.getpid(), values)
+
+
+def write_json(path, data):
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def flush(force=False):
+    """
+    Запись значений процесса в его файл в METRICS_DIR не чаще чем раз в
+    METRICS_FLUSH_INTERVAL секунд (при force - сразу). Каждый процесс
+    пишет только свой файл (через временный файл и os.replace), поэтому
+    блокировки между процессами не нужны.
+    """
+    global _dirty, _flushed_at
+    if not force and (
+        not _dirty or time.monotonic() - _flushed_at < settings.METRICS_FLUSH_INTERVAL
+    ):
+        return
+    # Потоки процесса пишут один и тот же файл по очереди, чтобы старый
+    # снимок не заменил новый; если файл уже пишет другой поток, обычный
+    # сброс пропускается, а не ждет его
+    if not _flush_lock.acquire(blocking=force):
+        return
+    try:
+        _dirty = False
+        _flushed_at = time.monotonic()
+        identity, data = snapshot()
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        write_json(os.path.join(settings.METRICS_DIR, f"{identity}.json"), data)
+    finally:
+        _flush_lock.release()
+
+
+atexit.register(flush, force=True)
+
+
+def read_json(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def add_samples(merged, data, gauges=True):
+    """Прибавляет значения файла метрик data к merged: {метрика: {метки: значение}}."""
+    for name, samples in data["metrics"].items():
+        metric = REGISTRY.get(name)
+        if metric is None or (metric.kind == "gauge" and not gauges):
+            continue
+        for key, value in samples:
+            key = tuple(key)
+            total = merged.setdefault(name, {}).get(key)
+            if metric.kind == "histogram":
+                merged[name][key] = [
+                    a + b for a, b in zip(total or [0] * len(value), value)
+                ]
+            else:
+                merged[name][key] = (total or 0) + value
+
+
+def collect():
+    """
+    Сложение значений из файлов всех процессов. Счетчики и гистограммы
+    завершившихся процессов переносятся в ARCHIVE_FILE, а их файлы
+    удаляются; значения Gauge таких процессов не учитываются.
+    """
+    import fcntl
+
+    import psutil
+
+    flush(force=True)
+    directory = settings.METRICS_DIR
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    merged = {name: {} for name in REGISTRY}
+    # Блокировка между процессами: файл завершившегося процесса переносится
+    # в архив ровно один раз
+    with open(os.path.join(directory, LOCK_FILE), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = {}
+        add_samples(archive, read_json(archive_path) or {"metrics": {}})
+        finished = []
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            if path == archive_path:
+                continue
+            data = read_json(path)
+            if data is None:
+                continue
+            if psutil.pid_exists(data["pid"]):
+                add_samples(merged, data)
+            else:
+                add_samples(archive, data, gauges=False)
+                finished.append(path)
+        if finished:
+            write_json(archive_path, serialize(None, archive))
+            for path in finished:
+                os.remove(path)
+    add_samples(merged, serialize(None, archive))
+    return merged
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (
+        (name, value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Метрики всех процессов в текстовом формате Prometheus."""
+    lines = []
+    for name, samples in collect().items():
+        metric = REGISTRY[name]
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(samples.items()):
+            pairs = list(zip(metric.labelnames, key))
+            if metric.kind != "histogram":
+                lines.append(f"{name}{format_labels(pairs)} {format_value(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets, value):
+                cumulative += count
+                labels = format_labels(pairs + [("le", format_value(bound))])
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(pairs)} {format_value(value[-1])}")
+            lines.append(f"{name}_count{format_labels(pairs)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def count_bytes(parts, export_format, started):
+    """
+    Передает части потоковой выгрузки без изменений и по ее окончании
+    записывает время и размер.
+    """
+    # Строки CSV и NDJSON состоят из символов ASCII: длина строки равна
+    # числу байт
+    size = 0
+    try:
+        for part in parts:
+            size += len(part)
+            yield part
+    finally:
+        EXPORT_SECONDS.observe(time.perf_counter() - started, format=export_format)
+        EXPORT_BYTES.observe(size, format=export_format)
+        flush()
+
+
+class MetricsMiddleware:
+    """
+    Время обработки запросов по именам представлений. После запроса
+    значения процесса записываются в файл метрик, если с прошлой записи
+    прошло METRICS_FLUSH_INTERVAL секунд.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        if match is not None:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                view=match.view_name,
+                method=request.method,
+            )
+        flush()
+        return response
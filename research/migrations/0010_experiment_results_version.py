@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0009_rename_math_model_experiment_material'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experiment',
+            name='results_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Версия результатов'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:12
+
+from django.db import migrations
+
+
+def mark_calculated_experiments(apps, schema_editor):
+    Experiment = apps.get_model("research", "Experiment")
+    Experiment.objects.filter(
+        results_version=0, results__has_key="result_t_const"
+    ).update(results_version=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0010_experiment_results_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_calculated_experiments, migrations.RunPython.noop),
+    ]
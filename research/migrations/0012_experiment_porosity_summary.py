@@ -0,0 +1,103 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:36
+
+from django.db import migrations, models
+
+
+def fill_porosity_summary(apps, schema_editor):
+    Experiment = apps.get_model("research", "Experiment")
+    sections = {
+        "result_t_const": ("tmin_const", "tmax_const", "tavg_const"),
+        "result_tau_const": ("taumin_const", "taumax_const", "tauavg_const"),
+    }
+    batch = []
+    experiments = Experiment.objects.filter(
+        results__has_key="result_t_const"
+    ).select_related("material")
+    for experiment in experiments.iterator(chunk_size=500):
+        t_levels = (experiment.t_min, experiment.t_max, experiment.t_avg)
+        tau_levels = (experiment.tau_min, experiment.tau_max, experiment.tau_avg)
+        points = []
+        for key, row in experiment.results["result_t_const"].items():
+            for t, field in zip(t_levels, sections["result_t_const"]):
+                points.append((row[field], t, float(key)))
+        for key, row in experiment.results.get("result_tau_const", {}).items():
+            for tau, field in zip(tau_levels, sections["result_tau_const"]):
+                points.append((row[field], float(key), tau))
+        if not points:
+            continue
+        values = [value for value, _, _ in points]
+        porosity_min, t_min, tau_min = min(points)
+        experiment.porosity_min = porosity_min
+        experiment.porosity_max = max(values)
+        experiment.porosity_mean = round(sum(values) / len(values), 4)
+        experiment.porosity_min_t = t_min
+        experiment.porosity_min_tau = tau_min
+        material = experiment.material
+        if material is not None:
+            t, tau = experiment.t_avg, experiment.tau_avg
+            experiment.porosity_at_avg = round(
+                material.a_0
+                + material.a_1 * t
+                + material.a_2 * tau
+                + material.a_3 * t * tau
+                + material.a_4 * t**2
+                + material.a_5 * tau**2
+                + material.a_6 * t**2 * tau
+                + material.a_7 * t * tau**2
+                + material.a_8 * t**2 * tau**2,
+                4,
+            )
+        batch.append(experiment)
+    Experiment.objects.bulk_update(
+        batch,
+        [
+            "porosity_min",
+            "porosity_max",
+            "porosity_mean",
+            "porosity_min_t",
+            "porosity_min_tau",
+            "porosity_at_avg",
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0011_experiment_results_version_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experiment',
+            name='porosity_at_avg',
+            field=models.FloatField(blank=True, db_index=True, null=True, verbose_name='Остаточная пористость при средних t и τ'),
+        ),
+        migrations.AddField(
+            model_name='experiment',
+            name='porosity_max',
+            field=models.FloatField(blank=True, db_index=True, null=True, verbose_name='Максимальная остаточная пористость'),
+        ),
+        migrations.AddField(
+            model_name='experiment',
+            name='porosity_mean',
+            field=models.FloatField(blank=True, db_index=True, null=True, verbose_name='Средняя остаточная пористость'),
+        ),
+        migrations.AddField(
+            model_name='experiment',
+            name='porosity_min',
+            field=models.FloatField(blank=True, db_index=True, null=True, verbose_name='Минимальная остаточная пористость'),
+        ),
+        migrations.AddField(
+            model_name='experiment',
+            name='porosity_min_t',
+            field=models.FloatField(blank=True, null=True, verbose_name='Температура минимальной пористости в С'),
+        ),
+        migrations.AddField(
+            model_name='experiment',
+            name='porosity_min_tau',
+            field=models.FloatField(blank=True, null=True, verbose_name='Время минимальной пористости в минутах'),
+        ),
+        migrations.RunPython(fill_porosity_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0012_experiment_porosity_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата проведения')),
+                ('calculation_time', models.FloatField(default=0, verbose_name='Время расчета')),
+            ],
+            options={
+                'verbose_name': 'Серия экспериментов',
+                'verbose_name_plural': 'Серии экспериментов',
+            },
+        ),
+        migrations.AddField(
+            model_name='experiment',
+            name='sweep',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='experiments', to='research.sweep', verbose_name='Серия экспериментов'),
+        ),
+    ]
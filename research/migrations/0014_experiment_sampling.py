@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:41
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0013_sweep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experiment',
+            name='sampling',
+            field=models.CharField(choices=[('uniform', 'Равномерная сетка'), ('adaptive', 'Адаптивное уточнение')], default='uniform', max_length=16, verbose_name='Способ построения сетки'),
+        ),
+        migrations.AddField(
+            model_name='experiment',
+            name='tolerance',
+            field=models.FloatField(default=0.01, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Допустимое отклонение от линейной интерполяции'),
+        ),
+    ]
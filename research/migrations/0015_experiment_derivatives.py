@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0014_experiment_sampling'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='experiment',
+            name='derivatives',
+            field=models.JSONField(blank=True, null=True, verbose_name='Частные производные поверхности отклика'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0015_experiment_derivatives'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolynomialTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('response', models.CharField(choices=[('porosity', 'Остаточная пористость'), ('density', 'Плотность'), ('shrinkage', 'Усадка')], default='porosity', max_length=32, verbose_name='Отклик')),
+                ('t_power', models.PositiveSmallIntegerField(verbose_name='Степень t')),
+                ('tau_power', models.PositiveSmallIntegerField(verbose_name='Степень τ')),
+                ('coefficient', models.FloatField(verbose_name='Коэффициент')),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='research.mathmodel', verbose_name='Материал')),
+            ],
+            options={
+                'verbose_name': 'Член полинома',
+                'verbose_name_plural': 'Члены полинома',
+                'ordering': ('material', 'response', 't_power', 'tau_power'),
+                'constraints': [models.UniqueConstraint(fields=('material', 'response', 't_power', 'tau_power'), name='unique_polynomial_term')],
+            },
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:48
+
+from django.db import migrations
+
+# Коэффициенты a0..a8 прежнего полинома второй степени и соответствующие
+# им степени (t, τ)
+LEGACY_POWERS = {
+    "a_0": (0, 0),
+    "a_1": (1, 0),
+    "a_2": (0, 1),
+    "a_3": (1, 1),
+    "a_4": (2, 0),
+    "a_5": (0, 2),
+    "a_6": (2, 1),
+    "a_7": (1, 2),
+    "a_8": (2, 2),
+}
+
+
+def coefficients_to_terms(apps, schema_editor):
+    MathModel = apps.get_model("research", "MathModel")
+    PolynomialTerm = apps.get_model("research", "PolynomialTerm")
+    PolynomialTerm.objects.bulk_create(
+        PolynomialTerm(
+            material=material,
+            response="porosity",
+            t_power=t_power,
+            tau_power=tau_power,
+            coefficient=getattr(material, field),
+        )
+        for material in MathModel.objects.all()
+        for field, (t_power, tau_power) in LEGACY_POWERS.items()
+    )
+
+
+def terms_to_coefficients(apps, schema_editor):
+    MathModel = apps.get_model("research", "MathModel")
+    PolynomialTerm = apps.get_model("research", "PolynomialTerm")
+    fields = {powers: field for field, powers in LEGACY_POWERS.items()}
+    for material in MathModel.objects.all():
+        for field in LEGACY_POWERS:
+            setattr(material, field, 0)
+        for term in PolynomialTerm.objects.filter(
+            material=material, response="porosity"
+        ):
+            field = fields.get((term.t_power, term.tau_power))
+            if field:
+                setattr(material, field, term.coefficient)
+        material.save(update_fields=list(LEGACY_POWERS))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0016_polynomialterm'),
+    ]
+
+    operations = [
+        migrations.RunPython(coefficients_to_terms, terms_to_coefficients),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0017_polynomialterm_data'),
+    ]
+
+    # Значение по умолчанию нужно только для отката: при возврате поля
+    # заполняются нулями, а затем коэффициентами из 0017
+    operations = [
+        migrations.AlterField(
+            model_name='mathmodel',
+            name='a_0',
+            field=models.FloatField(default=0, verbose_name='Значение коэффициента a0'),
+        ),
+        migrations.AlterField(
+            model_name='mathmodel',
+            name='a_1',
+            field=models.FloatField(default=0, verbose_name='Значение коэффициента a1'),
+        ),
+        migrations.AlterField(
+            model_name='mathmodel',
+            name='a_2',
+            field=models.FloatField(default=0, verbose_name='Значение коэффициента a2'),
+        ),
+        migrations.AlterField(
+            model_name='mathmodel',
+            name='a_3',
+            field=models.FloatField(default=0, verbose_name='Значение коэффициента a3'),
+        ),
+        migrations.AlterField(
+            model_name='mathmodel',
+            name='a_4',
+            field=models.FloatField(default=0, verbose_name='Значение коэффициента a4'),
+        ),
+        migrations.AlterField(
+            model_name='mathmodel',
+            name='a_5',
+            field=models.FloatField(default=0, verbose_name='Значение коэффициента a5'),
+        ),
+        migrations.AlterField(
+            model_name='mathmodel',
+            name='a_6',
+            field=models.FloatField(default=0, verbose_name='Значение коэффициента a6'),
+        ),
+        migrations.AlterField(
+            model_name='mathmodel',
+            name='a_7',
+            field=models.FloatField(default=0, verbose_name='Значение коэффициента a7'),
+        ),
+        migrations.AlterField(
+            model_name='mathmodel',
+            name='a_8',
+            field=models.FloatField(default=0, verbose_name='Значение коэффициента a8'),
+        ),
+        migrations.RemoveField(
+            model_name='mathmodel',
+            name='a_0',
+        ),
+        migrations.RemoveField(
+            model_name='mathmodel',
+            name='a_1',
+        ),
+        migrations.RemoveField(
+            model_name='mathmodel',
+            name='a_2',
+        ),
+        migrations.RemoveField(
+            model_name='mathmodel',
+            name='a_3',
+        ),
+        migrations.RemoveField(
+            model_name='mathmodel',
+            name='a_4',
+        ),
+        migrations.RemoveField(
+            model_name='mathmodel',
+            name='a_5',
+        ),
+        migrations.RemoveField(
+            model_name='mathmodel',
+            name='a_6',
+        ),
+        migrations.RemoveField(
+            model_name='mathmodel',
+            name='a_7',
+        ),
+        migrations.RemoveField(
+            model_name='mathmodel',
+            name='a_8',
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:53
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0018_remove_mathmodel_coefficients'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResidualAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата анализа')),
+                ('file_name', models.CharField(max_length=255, verbose_name='Файл измерений')),
+                ('response', models.CharField(choices=[('porosity', 'Остаточная пористость'), ('density', 'Плотность'), ('shrinkage', 'Усадка')], default='porosity', max_length=32, verbose_name='Отклик')),
+                ('threshold', models.FloatField(validators=[django.core.validators.MinValueValidator(0)], verbose_name='Порог выброса, σ')),
+                ('measurements', models.PositiveIntegerField(verbose_name='Число измерений')),
+                ('rmse', models.FloatField(verbose_name='RMSE')),
+                ('mae', models.FloatField(verbose_name='MAE')),
+                ('bias', models.FloatField(verbose_name='Среднее отклонение')),
+                ('max_abs_residual', models.FloatField(verbose_name='Максимальный модуль остатка')),
+                ('outliers', models.PositiveIntegerField(verbose_name='Число выбросов')),
+                ('plot', models.JSONField(default=dict, verbose_name='Точки графика остатков')),
+                ('processing_time', models.FloatField(verbose_name='Время обработки')),
+                ('experiment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='residual_analyses', to='research.experiment', verbose_name='Эксперимент')),
+            ],
+            options={
+                'verbose_name': 'Анализ остатков',
+                'verbose_name_plural': 'Анализы остатков',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
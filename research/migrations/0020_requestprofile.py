@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 15:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0019_residualanalysis'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата запроса')),
+                ('path', models.CharField(max_length=500, verbose_name='Адрес')),
+                ('method', models.CharField(max_length=10, verbose_name='Метод')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Код ответа')),
+                ('duration', models.FloatField(db_index=True, verbose_name='Длительность, мс')),
+                ('trigger', models.CharField(choices=[('header', 'По запросу сотрудника'), ('sample', 'Случайная выборка')], max_length=10, verbose_name='Причина профилирования')),
+                ('samples', models.PositiveIntegerField(verbose_name='Число выборок стека')),
+                ('stacks', models.TextField(verbose_name='Стеки (collapsed)')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Профиль запроса',
+                'verbose_name_plural': 'Профили запросов',
+                'ordering': ('-created_at',),
+            },
+        ),
+    ]
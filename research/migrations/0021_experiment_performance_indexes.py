@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0020_requestprofile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='experiment',
+            index=models.Index(fields=['material', 'calculation_time'], name='experiment_material_time'),
+        ),
+        migrations.AddIndex(
+            model_name='experiment',
+            index=models.Index(fields=['created_at'], name='experiment_created_at'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 16:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('research', '0021_experiment_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalculationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата расчета')),
+                ('engine', models.CharField(choices=[('single', 'Одиночный расчет'), ('batch', 'Пакетный расчет')], max_length=10, verbose_name='Способ расчета')),
+                ('backend', models.CharField(max_length=50, verbose_name='Вычислительная библиотека')),
+                ('code_version', models.CharField(max_length=40, verbose_name='Версия кода')),
+                ('grid_points', models.PositiveIntegerField(verbose_name='Узлов сетки t × τ')),
+                ('evaluated_points', models.PositiveIntegerField(verbose_name='Вычислено точек')),
+                ('batch_size', models.PositiveIntegerField(default=1, verbose_name='Экспериментов в группе')),
+                ('calculation_time', models.FloatField(verbose_name='Время расчета, мс')),
+                ('phases', models.JSONField(default=dict, verbose_name='Время этапов, мс (для пакетного расчета - всей группы)')),
+                ('peak_memory', models.FloatField(verbose_name='Пиковая память процесса, КБ')),
+                ('experiment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='research.experiment', verbose_name='Эксперимент')),
+            ],
+            options={
+                'verbose_name': 'Запуск расчета',
+                'verbose_name_plural': 'Запуски расчетов',
+                'ordering': ('-created_at',),
+                'indexes': [models.Index(fields=['experiment', 'created_at'], name='run_experiment_created_at'), models.Index(fields=['engine', 'created_at'], name='run_engine_created_at')],
+            },
+        ),
+    ]
@@ -1,23 +1,31 @@
+from django.conf import settings
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
-from datetime import datetime
-import psutil
-import os
+
+from research.database import retry_on_lock
+from research.evaluation import (
+    PRIMARY_RESPONSE,
+    Grid,
+    round_significant,
+    stack_matrices,
+)
+from research.metrics import (
+    CALCULATION_GRID_POINTS,
+    CALCULATION_SECONDS,
+    CALCULATIONS_IN_PROGRESS,
+)
+from research.runs import BACKEND, RunRecorder, code_version
+from research.timing import phase
+
+# Степени 1 не записываются, остальные - надстрочными цифрами
+SUPERSCRIPTS = {1: "", 2: "²", 3: "³", 4: "⁴", 5: "⁵", 6: "⁶", 7: "⁷", 8: "⁸", 9: "⁹"}
 
 
 class MathModel(models.Model):
     name = models.CharField(
         verbose_name="Название объекта исследования", max_length=255
     )
-    a_0 = models.FloatField(verbose_name="Значение коэффициента a0")
-    a_1 = models.FloatField(verbose_name="Значение коэффициента a1")
-    a_2 = models.FloatField(verbose_name="Значение коэффициента a2")
-    a_3 = models.FloatField(verbose_name="Значение коэффициента a3")
-    a_4 = models.FloatField(verbose_name="Значение коэффициента a4")
-    a_5 = models.FloatField(verbose_name="Значение коэффициента a5")
-    a_6 = models.FloatField(verbose_name="Значение коэффициента a6")
-    a_7 = models.FloatField(verbose_name="Значение коэффициента a7")
-    a_8 = models.FloatField(verbose_name="Значение коэффициента a8")
 
     class Meta:
         verbose_name = "Материал"
@@ -26,6 +34,82 @@ class MathModel(models.Model):
     def __str__(self):
         return self.name
 
+    def formula(self, response=PRIMARY_RESPONSE):
+        """Запись полинома отклика с числовыми коэффициентами."""
+        terms = [
+            term
+            for term in self.terms.all()
+            if term.response == response and term.coefficient
+        ]
+        if not terms:
+            return "y = 0"
+        parts = [f"{term.coefficient:g}" + term.monomial_suffix for term in terms]
+        return "y = " + " + ".join(parts).replace("+ -", "- ")
+
+
+class PolynomialTerm(models.Model):
+    RESPONSE_CHOICES = [
+        ("porosity", "Остаточная пористость"),
+        ("density", "Плотность"),
+        ("shrinkage", "Усадка"),
+    ]
+
+    material = models.ForeignKey(
+        MathModel,
+        verbose_name="Материал",
+        on_delete=models.CASCADE,
+        related_name="terms",
+    )
+    response = models.CharField(
+        verbose_name="Отклик",
+        max_length=32,
+        choices=RESPONSE_CHOICES,
+        default=PRIMARY_RESPONSE,
+    )
+    t_power = models.PositiveSmallIntegerField(verbose_name="Степень t")
+    tau_power = models.PositiveSmallIntegerField(verbose_name="Степень τ")
+    coefficient = models.FloatField(verbose_name="Коэффициент")
+
+    class Meta:
+        verbose_name = "Член полинома"
+        verbose_name_plural = "Члены полинома"
+        ordering = ("material", "response", "t_power", "tau_power")
+        constraints = [
+            models.UniqueConstraint(
+                fields=("material", "response", "t_power", "tau_power"),
+                name="unique_polynomial_term",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.coefficient:g}{self.monomial_suffix}"
+
+    @property
+    def monomial(self):
+        """Одночлен члена, например t²·τ."""
+        factors = [
+            name + SUPERSCRIPTS.get(power, f"^{power}")
+            for name, power in (("t", self.t_power), ("τ", self.tau_power))
+            if power
+        ]
+        return "·".join(factors) or "1"
+
+    @property
+    def monomial_suffix(self):
+        return "" if self.monomial == "1" else "·" + self.monomial
+
+
+class Sweep(models.Model):
+    created_at = models.DateTimeField(verbose_name="Дата проведения", auto_now_add=True)
+    calculation_time = models.FloatField(default=0, verbose_name="Время расчета")
+
+    class Meta:
+        verbose_name = "Серия экспериментов"
+        verbose_name_plural = "Серии экспериментов"
+
+    def __str__(self):
+        return f"Серия экспериментов No{self.id}"
+
 
 class Experiment(models.Model):
     material = models.ForeignKey(
@@ -34,6 +118,14 @@ class Experiment(models.Model):
         on_delete=models.SET_NULL,
         null=True,
     )
+    sweep = models.ForeignKey(
+        Sweep,
+        verbose_name="Серия экспериментов",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="experiments",
+    )
     created_at = models.DateTimeField(verbose_name="Дата проведения", auto_now_add=True)
     t_min = models.FloatField(
         verbose_name="Нижний порог температуры спекания в С",
@@ -65,9 +157,26 @@ class Experiment(models.Model):
         verbose_name="Шаг варьирования времени изометрической выдержки в минутах",
         validators=[MinValueValidator(0)],
     )
+    sampling = models.CharField(
+        verbose_name="Способ построения сетки",
+        max_length=16,
+        choices=[
+            ("uniform", "Равномерная сетка"),
+            ("adaptive", "Адаптивное уточнение"),
+        ],
+        default="uniform",
+    )
+    tolerance = models.FloatField(
+        verbose_name="Допустимое отклонение от линейной интерполяции",
+        default=0.01,
+        validators=[MinValueValidator(0)],
+    )
     results = models.JSONField(
         verbose_name="Результаты эксперимента", null=True, blank=True, default=list
     )
+    derivatives = models.JSONField(
+        verbose_name="Частные производные поверхности отклика", null=True, blank=True
+    )
     calculation_time = models.FloatField(default=0, verbose_name="Время расчета")
     number_of_math_operations = models.IntegerField(
         default=0, verbose_name="Количество математических операций"
@@ -75,103 +184,379 @@ class Experiment(models.Model):
     memory_used = models.FloatField(
         default=0, verbose_name="Затрачено оперативной памяти"
     )
+    results_version = models.PositiveIntegerField(
+        default=0, verbose_name="Версия результатов"
+    )
+    porosity_min = models.FloatField(
+        verbose_name="Минимальная остаточная пористость",
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+    porosity_max = models.FloatField(
+        verbose_name="Максимальная остаточная пористость",
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+    porosity_mean = models.FloatField(
+        verbose_name="Средняя остаточная пористость",
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+    porosity_min_t = models.FloatField(
+        verbose_name="Температура минимальной пористости в С", null=True, blank=True
+    )
+    porosity_min_tau = models.FloatField(
+        verbose_name="Время минимальной пористости в минутах", null=True, blank=True
+    )
+    porosity_at_avg = models.FloatField(
+        verbose_name="Остаточная пористость при средних t и τ",
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+
+    # Поля, которые заполняет расчет
+    RESULT_FIELDS = [
+        "t_avg",
+        "tau_avg",
+        "results",
+        "derivatives",
+        "calculation_time",
+        "number_of_math_operations",
+        "memory_used",
+        "results_version",
+        "porosity_min",
+        "porosity_max",
+        "porosity_mean",
+        "porosity_min_t",
+        "porosity_min_tau",
+        "porosity_at_avg",
+    ]
 
     class Meta:
         verbose_name = "Эксперимент"
         verbose_name_plural = "Эксперименты"
+        indexes = [
+            # Процентили времени расчета по материалам (оконные функции)
+            models.Index(
+                fields=["material", "calculation_time"],
+                name="experiment_material_time",
+            ),
+            models.Index(fields=["created_at"], name="experiment_created_at"),
+        ]
 
     def __str__(self):
         return f"Эксперимент No{self.id}"
 
+    @property
+    def has_results(self):
+        return self.results_version > 0
+
     def clean(self):
+        if self.material_id is not None:
+            try:
+                self.check_materials([self.material_id])
+            except ValidationError as error:
+                raise ValidationError({"material": error.messages})
         return super().clean()
 
+    @staticmethod
+    def check_materials(material_ids):
+        """
+        ValidationError, если у материала нет членов полинома основного
+        отклика: расчет по нему дал бы нулевые результаты.
+        """
+        from research.catalog import material_catalog
+
+        catalog = material_catalog()
+        missing = [
+            material_id
+            for material_id in dict.fromkeys(material_ids)
+            if material_id in catalog and not catalog.has_response(material_id)
+        ]
+        if missing:
+            label = dict(PolynomialTerm.RESPONSE_CHOICES)[PRIMARY_RESPONSE]
+            raise ValidationError(
+                [
+                    f"У материала «{catalog.name(material_id)}» нет членов "
+                    f"полинома отклика «{label}»"
+                    for material_id in missing
+                ]
+            )
+
     def save(self, *args, **kwargs):
         self.full_clean()
         return super().save(*args, **kwargs)
 
+    @phase("calculate")
+    @CALCULATIONS_IN_PROGRESS.track_in_progress(mode="single")
     def calculate(self):
-        process = psutil.Process(os.getpid())
-        memory_before = process.memory_info().rss / 1024
-        start_time = datetime.now()
-        a_0 = self.material.a_0
-        a_1 = self.material.a_1
-        a_2 = self.material.a_2
-        a_3 = self.material.a_3
-        a_4 = self.material.a_4
-        a_5 = self.material.a_5
-        a_6 = self.material.a_6
-        a_7 = self.material.a_7
-        a_8 = self.material.a_8
-
-        number_of_math_operations = 0
-
-        def polynom_calculate(t, tau):
-            return (
-                a_0
-                + a_1 * t
-                + a_2 * tau
-                + a_3 * t * tau
-                + a_4 * t**2
-                + a_5 * tau**2
-                + a_6 * t**2 * tau
-                + a_7 * t * tau**2
-                + a_8 * t**2 * tau**2
+        from research.catalog import material_catalog
+
+        self.check_materials([self.material_id])
+        recorder = RunRecorder()
+        with recorder.phase("grid"):
+            grid = Grid.for_experiment(self)
+            matrices = material_catalog().matrices(self.material_id, [PRIMARY_RESPONSE])
+        with recorder.phase("evaluate"):
+            t_const, tau_const, center = grid.evaluate(matrices)
+        with recorder.phase("derivatives"):
+            derivatives = grid.derivatives(matrices)
+        with recorder.phase("results"):
+            self.apply_results(
+                grid,
+                t_const[0],
+                tau_const[0],
+                center[0],
+                {name: (dt[0], dtau[0]) for name, (dt, dtau) in derivatives.items()},
             )
+        self.memory_used = round(recorder.rss() - recorder.memory_before, 4)
+        self.calculation_time = round(recorder.total, 2)
+        CALCULATION_SECONDS.observe(recorder.total / 1000, mode="single")
+        CALCULATION_GRID_POINTS.observe(grid.size, mode="single")
 
-        result_t_const = {}
-        self.t_avg = (self.t_min + self.t_max) / 2
+        # Результаты и запись истории сохраняются одной транзакцией
+        def write():
+            with recorder.phase("save"):
+                self.save()
+            CalculationRun.objects.create(
+                **CalculationRun.fields(self, grid, recorder, engine="single")
+            )
 
-        number_of_math_operations += 1
+        retry_on_lock(write, "calculate")
 
-        tau = self.tau_min
-        while tau <= self.tau_max:
-            result_t_const[tau] = {
-                "tmin_const": None,
-                "tmax_const": None,
-                "tavg_const": None,
-            }
-            result_t_const[tau]["tmin_const"] = round(
-                polynom_calculate(self.t_min, tau), 4
-            )
-            result_t_const[tau]["tmax_const"] = round(
-                polynom_calculate(self.t_max, tau), 4
-            )
-            result_t_const[tau]["tavg_const"] = round(
-                polynom_calculate(self.t_avg, tau), 4
-            )
-            tau += self.delta_tau
-            number_of_math_operations += 79
-        result_tau_const = {}
-
-        self.tau_avg = (self.tau_min + self.tau_max) / 2
-        number_of_math_operations += 1
-        t = self.t_min
-        while t <= self.t_max:
-            result_tau_const[t] = {
-                "taumin_const": None,
-                "taumax_const": None,
-                "tauavg_const": None,
-            }
-            result_tau_const[t]["taumin_const"] = round(
-                polynom_calculate(t, self.tau_min), 4
-            )
-            result_tau_const[t]["taumax_const"] = round(
-                polynom_calculate(t, self.tau_max), 4
-            )
-            result_tau_const[t]["tauavg_const"] = round(
-                polynom_calculate(t, self.tau_avg), 4
+    @classmethod
+    @phase("calculate")
+    @CALCULATIONS_IN_PROGRESS.track_in_progress(mode="batch")
+    def calculate_many(cls, experiments):
+        """
+        Пакетный расчет: эксперименты группируются по сетке, и для каждой
+        группы все материалы считаются одним проходом по общим матрицам
+        степеней. Результаты сохраняются одним bulk_update.
+        """
+        from research.catalog import material_catalog
+
+        cls.check_materials([experiment.material_id for experiment in experiments])
+        catalog = material_catalog()
+        groups = {}
+        for experiment in experiments:
+            grid = Grid.for_experiment(experiment)
+            groups.setdefault(grid.key, (grid, []))[1].append(experiment)
+
+        runs = []
+        for grid, group in groups.values():
+            recorder = RunRecorder()
+            with recorder.phase("grid"):
+                matrices = stack_matrices(
+                    [catalog.matrix(experiment.material_id) for experiment in group]
+                )
+            with recorder.phase("evaluate"):
+                t_const, tau_const, center = grid.evaluate(matrices)
+            with recorder.phase("derivatives"):
+                derivatives = grid.derivatives(matrices)
+            with recorder.phase("results"):
+                for i, experiment in enumerate(group):
+                    experiment.apply_results(
+                        grid,
+                        t_const[i],
+                        tau_const[i],
+                        center[i],
+                        {
+                            name: (dt[i], dtau[i])
+                            for name, (dt, dtau) in derivatives.items()
+                        },
+                    )
+            memory_used = recorder.rss() - recorder.memory_before
+            CALCULATION_SECONDS.observe(recorder.total / 1000, mode="batch")
+            # Затраты группы делятся поровну между ее экспериментами
+            for experiment in group:
+                experiment.calculation_time = round(recorder.total / len(group), 4)
+                experiment.memory_used = round(memory_used / len(group), 4)
+                CALCULATION_GRID_POINTS.observe(grid.size, mode="batch")
+                runs.append(
+                    CalculationRun(
+                        **CalculationRun.fields(
+                            experiment, grid, recorder, engine="batch"
+                        ),
+                        batch_size=len(group),
+                    )
+                )
+
+        def write():
+            cls.objects.bulk_update(experiments, cls.RESULT_FIELDS, batch_size=500)
+            CalculationRun.objects.bulk_create(runs, batch_size=500)
+
+        retry_on_lock(write, "calculate_many")
+
+    def apply_results(self, grid, t_const, tau_const, center, derivatives):
+        self.t_avg = grid.t_avg
+        self.tau_avg = grid.tau_avg
+        result_t_const = {
+            tau: {"tmin_const": tmin, "tmax_const": tmax, "tavg_const": tavg}
+            for tau, tmin, tmax, tavg in zip(grid.tau_axis.tolist(), *t_const.tolist())
+        }
+        result_tau_const = {
+            t: {"taumin_const": taumin, "taumax_const": taumax, "tauavg_const": tauavg}
+            for t, (taumin, taumax, tauavg) in zip(
+                grid.t_axis.tolist(), tau_const.tolist()
             )
-            t += self.delta_t
-            number_of_math_operations += 79
+        }
         self.results = {
             "result_t_const": result_t_const,
             "result_tau_const": result_tau_const,
         }
-        memory_after = process.memory_info().rss / 1024
-        self.memory_used = round(memory_after - memory_before, 4)
-        end_time = datetime.now()
-        calctime = round((end_time.timestamp() - start_time.timestamp()) * 1000, 2)
-        self.calculation_time = calctime
-        self.number_of_math_operations = number_of_math_operations
-        self.save()
+        # Производные хранятся массивами по кривым в порядке min, max, avg.
+        # Вторые производные бывают порядка 1e-6, поэтому округляются до
+        # значащих цифр, а не до знаков после запятой
+        self.derivatives = {
+            "constant_temp": {
+                name: round_significant(dt).tolist()
+                for name, (dt, _) in derivatives.items()
+            },
+            "constant_time": {
+                name: round_significant(dtau.T).tolist()
+                for name, (_, dtau) in derivatives.items()
+            },
+        }
+        for field, value in grid.summarize(t_const, tau_const).items():
+            setattr(self, field, round(value, 4))
+        self.porosity_at_avg = float(center)
+        self.number_of_math_operations = grid.number_of_math_operations
+        self.results_version += 1
+
+
+class ResidualAnalysis(models.Model):
+    experiment = models.ForeignKey(
+        Experiment,
+        verbose_name="Эксперимент",
+        on_delete=models.CASCADE,
+        related_name="residual_analyses",
+    )
+    created_at = models.DateTimeField(verbose_name="Дата анализа", auto_now_add=True)
+    file_name = models.CharField(verbose_name="Файл измерений", max_length=255)
+    response = models.CharField(
+        verbose_name="Отклик",
+        max_length=32,
+        choices=PolynomialTerm.RESPONSE_CHOICES,
+        default=PRIMARY_RESPONSE,
+    )
+    threshold = models.FloatField(
+        verbose_name="Порог выброса, σ", validators=[MinValueValidator(0)]
+    )
+    measurements = models.PositiveIntegerField(verbose_name="Число измерений")
+    rmse = models.FloatField(verbose_name="RMSE")
+    mae = models.FloatField(verbose_name="MAE")
+    bias = models.FloatField(verbose_name="Среднее отклонение")
+    max_abs_residual = models.FloatField(verbose_name="Максимальный модуль остатка")
+    outliers = models.PositiveIntegerField(verbose_name="Число выбросов")
+    plot = models.JSONField(verbose_name="Точки графика остатков", default=dict)
+    processing_time = models.FloatField(verbose_name="Время обработки")
+
+    class Meta:
+        verbose_name = "Анализ остатков"
+        verbose_name_plural = "Анализы остатков"
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"Анализ остатков No{self.id} эксперимента No{self.experiment_id}"
+
+
+class RequestProfile(models.Model):
+    TRIGGER_CHOICES = [
+        ("header", "По запросу сотрудника"),
+        ("sample", "Случайная выборка"),
+    ]
+
+    created_at = models.DateTimeField(verbose_name="Дата запроса", auto_now_add=True)
+    path = models.CharField(verbose_name="Адрес", max_length=500)
+    method = models.CharField(verbose_name="Метод", max_length=10)
+    status_code = models.PositiveSmallIntegerField(verbose_name="Код ответа")
+    duration = models.FloatField(verbose_name="Длительность, мс", db_index=True)
+    trigger = models.CharField(
+        verbose_name="Причина профилирования", max_length=10, choices=TRIGGER_CHOICES
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name="Пользователь",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    samples = models.PositiveIntegerField(verbose_name="Число выборок стека")
+    stacks = models.TextField(verbose_name="Стеки (collapsed)")
+
+    class Meta:
+        verbose_name = "Профиль запроса"
+        verbose_name_plural = "Профили запросов"
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration} мс)"
+
+
+class CalculationRun(models.Model):
+    """
+    Запись о выполненном расчете эксперимента. Записи только добавляются:
+    пересчет эксперимента перезаписывает его calculation_time и memory_used,
+    а история запусков остается.
+    """
+
+    ENGINE_CHOICES = [
+        ("single", "Одиночный расчет"),
+        ("batch", "Пакетный расчет"),
+    ]
+
+    experiment = models.ForeignKey(
+        Experiment,
+        verbose_name="Эксперимент",
+        on_delete=models.CASCADE,
+        related_name="runs",
+    )
+    created_at = models.DateTimeField(verbose_name="Дата расчета", auto_now_add=True)
+    engine = models.CharField(
+        verbose_name="Способ расчета", max_length=10, choices=ENGINE_CHOICES
+    )
+    backend = models.CharField(verbose_name="Вычислительная библиотека", max_length=50)
+    code_version = models.CharField(verbose_name="Версия кода", max_length=40)
+    grid_points = models.PositiveIntegerField(verbose_name="Узлов сетки t × τ")
+    evaluated_points = models.PositiveIntegerField(verbose_name="Вычислено точек")
+    batch_size = models.PositiveIntegerField(
+        verbose_name="Экспериментов в группе", default=1
+    )
+    calculation_time = models.FloatField(verbose_name="Время расчета, мс")
+    phases = models.JSONField(
+        verbose_name="Время этапов, мс (для пакетного расчета - всей группы)",
+        default=dict,
+    )
+    peak_memory = models.FloatField(verbose_name="Пиковая память процесса, КБ")
+
+    class Meta:
+        verbose_name = "Запуск расчета"
+        verbose_name_plural = "Запуски расчетов"
+        ordering = ("-created_at",)
+        indexes = [
+            models.Index(
+                fields=["experiment", "created_at"], name="run_experiment_created_at"
+            ),
+            models.Index(fields=["engine", "created_at"], name="run_engine_created_at"),
+        ]
+
+    def __str__(self):
+        return f"Расчет эксперимента No{self.experiment_id} ({self.created_at:%d.%m.%Y %H:%M})"
+
+    @classmethod
+    def fields(cls, experiment, grid, recorder, engine):
+        return {
+            "experiment": experiment,
+            "engine": engine,
+            "backend": BACKEND,
+            "code_version": code_version(),
+            "grid_points": grid.size,
+            "evaluated_points": grid.evaluated_points,
+            "calculation_time": experiment.calculation_time,
+            "phases": recorder.phases,
+            "peak_memory": round(recorder.peak_memory, 1),
+        }
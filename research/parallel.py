@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+from django.conf import settings
+
+from research.evaluation import powers
+from research.metrics import SURFACE_TILES_PENDING
+
+# Число плиток на один процесс, чтобы процессы с разной скоростью
+# заканчивали работу примерно одновременно
+TILES_PER_WORKER = 4
+
+_executor = None
+_executor_workers = None
+
+
+def default_workers():
+    return settings.SURFACE_WORKERS or os.cpu_count() or 1
+
+
+def get_executor(workers):
+    """Пул процессов создается один раз и переиспользуется между запросами."""
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        if _executor is not None:
+            _executor.shutdown()
+        _executor = ProcessPoolExecutor(max_workers=workers)
+        _executor_workers = workers
+    return _executor
+
+
+def tiles(rows, count):
+    """Разбиение строк 0..rows на count смежных диапазонов (start, stop)."""
+    bounds = np.linspace(0, rows, min(count, rows) + 1).astype(int)
+    return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+
+def evaluate_tile(name, shape, matrix, t, tau, start, stop):
+    """
+    Расчет строк start..stop поверхности в процессе пула. Результат пишется
+    прямо в общий буфер name, обратно передается только число строк.
+    """
+    buffer = shared_memory.SharedMemory(name=name)
+    try:
+        surface = np.ndarray(shape, dtype=np.float64, buffer=buffer.buf)
+        p, q = matrix.shape
+        surface[start:stop] = powers(t[start:stop], p) @ matrix @ powers(tau, q).T
+        del surface
+    finally:
+        buffer.close()
+    return stop - start
+
+
+@contextmanager
+def evaluate_surface(matrix, t, tau, workers=None, threshold=None):
+    """
+    Значения полинома на сетке t × τ формы (len(t), len(tau)).
+
+    Сетки от threshold точек (по умолчанию SURFACE_PARALLEL_THRESHOLD)
+    делятся на плитки по строкам, плитки считаются в пуле процессов с
+    записью в разделяемую память; меньшие сетки считаются в текущем
+    процессе. Массив внутри блока with ссылается на буфер без копирования
+    и освобождается при выходе, поэтому нужные данные следует скопировать
+    или обработать внутри блока.
+    """
+    t = np.asarray(t, dtype=np.float64)
+    tau = np.asarray(tau, dtype=np.float64)
+    shape = (len(t), len(tau))
+    workers = workers or default_workers()
+    if threshold is None:
+        threshold = settings.SURFACE_PARALLEL_THRESHOLD
+    if workers == 1 or shape[0] * shape[1] < threshold:
+        yield powers(t, matrix.shape[0]) @ matrix @ powers(tau, matrix.shape[1]).T
+        return
+
+    buffer = shared_memory.SharedMemory(
+        create=True, size=max(shape[0] * shape[1], 1) * 8
+    )
+    try:
+        executor = get_executor(workers)
+        futures = [
+            executor.submit(evaluate_tile, buffer.name, shape, matrix, t, tau, *tile)
+            for tile in tiles(shape[0], workers * TILES_PER_WORKER)
+        ]
+        SURFACE_TILES_PENDING.inc(len(futures))
+        for future in futures:
+            future.add_done_callback(lambda future: SURFACE_TILES_PENDING.dec())
+        for future in futures:
+            future.result()
+        surface = np.ndarray(shape, dtype=np.float64, buffer=buffer.buf)
+        try:
+            yield surface
+        finally:
+            del surface
+    finally:
+        buffer.close()
+        buffer.unlink()
@@ -0,0 +1,201 @@
+import math
+from datetime import timedelta
+
+from django.db.models import Avg, Count, DateField, F, Max, Q, Sum, Window
+from django.db.models.functions import Ceil, RowNumber, Trunc
+from django.utils import timezone
+
+from research.cache import cached
+from research.evaluation import OPERATIONS_OVERHEAD, OPERATIONS_PER_POINT
+from research.models import CalculationRun, Experiment, MathModel
+
+PERCENTILES = (50, 90, 99)
+
+
+class PeriodStart(Trunc):
+    """
+    Дата начала дня, недели или месяца. В SQLite Trunc вызывает функцию
+    Python для каждой строки (а в запросе с оконными функциями - по
+    несколько раз), поэтому там используются встроенные функции даты;
+    границы периодов при этом считаются по UTC.
+    """
+
+    SQLITE_TEMPLATES = {
+        "day": "date(%s)",
+        "week": "date(%s, 'weekday 0', '-6 days')",
+        "month": "date(%s, 'start of month')",
+    }
+
+    def __init__(self, expression, kind):
+        super().__init__(expression, kind, output_field=DateField())
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        sql, params = compiler.compile(self.lhs)
+        return self.SQLITE_TEMPLATES[self.kind] % sql, params
+
+
+# Группировки сводки: заголовок столбца группы и выражение для нее
+GROUPINGS = {
+    "material": ("Материал", F("material_id")),
+    "day": ("День", PeriodStart("created_at", "day")),
+    "week": ("Неделя", PeriodStart("created_at", "week")),
+    "month": ("Месяц", PeriodStart("created_at", "month")),
+}
+
+# Сводка по миллионам строк дорогая: результат хранится в кэше, пока не
+# истечет этот срок (секунды), даже если появились новые эксперименты
+CACHE_TIMEOUT = 60
+
+# Число вычисленных точек восстанавливается из числа операций; деление на
+# вещественное число, чтобы SQLite не делил нацело
+POINTS = (F("number_of_math_operations") - OPERATIONS_OVERHEAD) / float(
+    OPERATIONS_PER_POINT
+)
+
+
+def calculated_experiments(days=None):
+    queryset = Experiment.objects.filter(
+        calculation_time__gt=0, number_of_math_operations__gt=OPERATIONS_OVERHEAD
+    )
+    if days:
+        queryset = queryset.filter(created_at__gte=timezone.now() - timedelta(days))
+    return queryset
+
+
+def percentiles(queryset, grouping):
+    """
+    Процентили времени расчета по группам методом ближайшего ранга:
+    строки нумеруются оконной функцией внутри группы, и из базы читаются
+    только строки с рангами ⌈p·n⌉ - не больше len(PERCENTILES) на группу.
+    """
+    _, expression = GROUPINGS[grouping]
+    rows = (
+        queryset.annotate(
+            group=expression,
+            rank=Window(
+                RowNumber(), partition_by=[expression], order_by="calculation_time"
+            ),
+            total=Window(Count("id"), partition_by=[expression]),
+        )
+        .filter(
+            Q(
+                *[Q(rank=Ceil(F("total") * (p / 100))) for p in PERCENTILES],
+                _connector=Q.OR,
+            )
+        )
+        .values_list("group", "rank", "total", "calculation_time")
+    )
+    result = {}
+    for group, rank, total, calculation_time in rows:
+        for p in PERCENTILES:
+            if rank == math.ceil(total * (p / 100)):
+                result.setdefault(group, {})[p] = calculation_time
+    return result
+
+
+def build_summary(grouping, days=None):
+    queryset = calculated_experiments(days)
+    _, expression = GROUPINGS[grouping]
+    rows = (
+        queryset.annotate(group=expression)
+        .values("group")
+        .annotate(
+            experiments=Count("id"),
+            avg_time=Avg("calculation_time"),
+            max_time=Max("calculation_time"),
+            total_time=Sum("calculation_time"),
+            total_points=Sum(POINTS),
+            total_memory=Sum("memory_used"),
+        )
+        .order_by("group")
+    )
+    ranks = percentiles(queryset, grouping)
+    names = {}
+    if grouping == "material":
+        names = dict(
+            MathModel.objects.filter(
+                pk__in=[row["group"] for row in rows if row["group"]]
+            ).values_list("pk", "name")
+        )
+
+    summary = []
+    for row in rows:
+        group = row["group"]
+        label = group
+        if grouping == "material":
+            label = names.get(group) or "Без материала"
+        seconds = row["total_time"] / 1000
+        points = row["total_points"] or 0
+        summary.append(
+            {
+                "group": label,
+                "experiments": row["experiments"],
+                "avg_time": row["avg_time"],
+                "max_time": row["max_time"],
+                "percentiles": [ranks.get(group, {}).get(p) for p in PERCENTILES],
+                "points_per_second": points / seconds if seconds else None,
+                # memory_used хранится в КБ
+                "bytes_per_point": (
+                    row["total_memory"] * 1024 / points if points else None
+                ),
+            }
+        )
+    return summary
+
+
+def performance_summary(grouping, days=None):
+    """
+    Сводка производительности расчетов по группам: число экспериментов,
+    время расчета (среднее, максимум, процентили, мс), вычисленные точки
+    в секунду и память на точку. Все агрегаты считает база данных.
+    """
+    return cached(
+        f"performance:{grouping}:{days or 'all'}",
+        lambda: build_summary(grouping, days),
+        timeout=CACHE_TIMEOUT,
+    )
+
+
+def build_engine_trend(period, days=None):
+    queryset = CalculationRun.objects.all()
+    if days:
+        queryset = queryset.filter(created_at__gte=timezone.now() - timedelta(days))
+    rows = (
+        queryset.annotate(period=PeriodStart("created_at", period))
+        .values("period", "engine", "backend", "code_version")
+        .annotate(
+            runs=Count("id"),
+            total_time=Sum("calculation_time"),
+            total_points=Sum("evaluated_points"),
+        )
+        .order_by("period")
+    )
+    series = {}
+    for row in rows:
+        engine = dict(CalculationRun.ENGINE_CHOICES)[row["engine"]]
+        label = f"{engine}, {row['backend']}, {row['code_version']}"
+        series.setdefault(label, []).append(
+            {
+                "period": row["period"].isoformat(),
+                "runs": row["runs"],
+                "time_per_1000_points": (
+                    row["total_time"] / row["total_points"] * 1000
+                    if row["total_points"]
+                    else None
+                ),
+            }
+        )
+    return [{"label": label, "points": points} for label, points in series.items()]
+
+
+def engine_trend(period, days=None):
+    """
+    Время расчета на 1000 вычисленных точек по периодам для каждого
+    сочетания способа расчета, вычислительной библиотеки и версии кода -
+    по истории запусков CalculationRun.
+    """
+    return cached(
+        f"engine-trend:{period}:{days or 'all'}",
+        lambda: build_engine_trend(period, days),
+        timeout=CACHE_TIMEOUT,
+    )
@@ -0,0 +1,184 @@
+import html
+import random
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_PARAMETER = "_profile"
+
+
+class StackSampler(threading.Thread):
+    """
+    Выборочный профилировщик одного потока: каждые interval секунд
+    снимает стек потока thread_id и считает одинаковые стеки. Кадры выше
+    root_code (сервер, обработчик WSGI) в стек не попадают.
+    """
+
+    def __init__(self, thread_id, interval, root_code=None):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root_code = root_code
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self.collapse(frame)] += 1
+
+    def collapse(self, frame):
+        names = []
+        while frame is not None and frame.f_code is not self.root_code:
+            code = frame.f_code
+            names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}")
+            frame = frame.f_back
+        return ";".join(reversed(names)) or "?"
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        return self.stacks
+
+
+def format_collapsed(stacks):
+    """Стеки в формате collapsed (flamegraph.pl, speedscope): «a;b;c N»."""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+
+
+def parse_collapsed(text):
+    stacks = Counter()
+    for line in text.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if stack and count.isdigit():
+            stacks[stack] += int(count)
+    return stacks
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование отдельных запросов. Сотрудник (is_staff) включает его
+    заголовком X-Profile: 1 или параметром ?_profile=1; кроме того,
+    PROFILING_SAMPLE_RATE задает долю всех запросов, которые профилируются
+    случайно (сохраняются только те, что медленнее PROFILING_SLOW_MS).
+
+    При PROFILING_ENABLED = False промежуточный слой исключается из цепочки
+    при запуске. Генерация тела потоковых ответов происходит после выхода
+    из слоя и в профиль не попадает.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.interval = settings.PROFILING_INTERVAL
+        self.slow_ms = settings.PROFILING_SLOW_MS
+
+    def __call__(self, request):
+        trigger = self.trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        sampler = StackSampler(
+            threading.get_ident(), self.interval, ProfilingMiddleware.__call__.__code__
+        )
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+        duration = (time.perf_counter() - started) * 1000
+        if trigger == "header" or duration >= self.slow_ms:
+            self.save(request, response, trigger, duration, stacks)
+        return response
+
+    def trigger(self, request):
+        if (
+            request.META.get(PROFILE_HEADER) == "1"
+            or request.GET.get(PROFILE_PARAMETER) == "1"
+        ) and request.user.is_staff:
+            return "header"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    def save(self, request, response, trigger, duration, stacks):
+        from research.models import RequestProfile
+
+        user = request.user if request.user.is_authenticated else None
+        RequestProfile.objects.create(
+            path=request.get_full_path()[:500],
+            method=request.method,
+            status_code=response.status_code,
+            duration=round(duration, 2),
+            trigger=trigger,
+            user=user,
+            samples=sum(stacks.values()),
+            stacks=format_collapsed(stacks),
+        )
+
+
+def stack_tree(stacks):
+    root = {"name": "all", "value": 0, "children": {}}
+    for stack, count in stacks.items():
+        root["value"] += count
+        node = root
+        for name in stack.split(";"):
+            node = node["children"].setdefault(
+                name, {"name": name, "value": 0, "children": {}}
+            )
+            node["value"] += count
+    return root
+
+
+def render_flamegraph(stacks, width=1200, row_height=17, char_width=6.5):
+    """
+    SVG-флеймграф по стекам в формате Counter({"a;b;c": N}): ширина кадра
+    пропорциональна числу выборок, корень снизу. Подробности кадра - во
+    всплывающей подсказке.
+    """
+    root = stack_tree(stacks)
+    total = root["value"] or 1
+    boxes = []
+
+    def layout(node, x, depth):
+        box_width = node["value"] / total * width
+        if box_width < 0.5:
+            return
+        boxes.append((x, depth, box_width, node))
+        for child in sorted(node["children"].values(), key=lambda item: item["name"]):
+            layout(child, x, depth + 1)
+            x += child["value"] / total * width
+
+    layout(root, 0, 0)
+    height = (max((depth for _, depth, _, _ in boxes), default=0) + 1) * row_height
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+    ]
+    for x, depth, box_width, node in boxes:
+        y = height - (depth + 1) * row_height
+        name = node["name"]
+        share = node["value"] / total * 100
+        hue = zlib.crc32(name.encode()) % 55
+        label = ""
+        fits = int((box_width - 6) / char_width)
+        if fits >= 3:
+            label = name if len(name) <= fits else name[: fits - 2] + ".."
+        parts.append(
+            f"<g><title>{html.escape(name)} ({node['value']} выб., {share:.1f}%)</title>"
+            f'<rect x="{x:.2f}" y="{y}" width="{box_width:.2f}" height="{row_height - 1}" '
+            f'fill="hsl({hue}, 85%, 62%)" rx="2"/>'
+            f'<text x="{x + 3:.2f}" y="{y + row_height - 5}">{html.escape(label)}</text></g>'
+        )
+    parts.append("</svg>")
+    return "".join(parts)
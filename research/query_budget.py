@@ -0,0 +1,324 @@
+import io
+import json
+import os
+import time
+
+import numpy as np
+from django.contrib import admin
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from research import urls as research_urls
+from research.catalog import invalidate_material_catalog, material_catalog
+from research.models import (
+    CalculationRun,
+    Experiment,
+    MathModel,
+    PolynomialTerm,
+    RequestProfile,
+    ResidualAnalysis,
+    Sweep,
+)
+from users.models import User
+
+# Бюджет запросов к базе данных для каждого маршрута research/urls.py:
+# метод, параметры адреса, данные запроса, допустимое число запросов и
+# ожидаемый код ответа (по умолчанию 200). Запросы выполняются с пустыми
+# кэшами, поэтому бюджет - худший случай; два запроса в нем - сессия и
+# пользователь. Справочник материалов, как и при запуске сервера
+# (research.warmup), загружается заранее. Маршрут без объявленного бюджета
+# считается ошибкой.
+ROUTES = {
+    "login": {"budget": 2, "status": 302},
+    "logout": {"budget": 4, "status": 302},
+    "index": {"budget": 2, "status": 302},
+    "experiment_create": {"budget": 2},
+    "experiment_results": {"kwargs": "experiment", "budget": 6},
+    "experiment_results_table": {
+        "kwargs": "experiment",
+        "extra": {"table": "constant_temp"},
+        "budget": 4,
+    },
+    "experiment_chart_data": {"kwargs": "experiment", "budget": 5},
+    "experiment_heatmap": {"kwargs": "experiment", "budget": 3},
+    "experiment_list": {"budget": 4},
+    "experiment_compare": {"query": "compare", "budget": 6},
+    "experiment_recalculate": {
+        "kwargs": "experiment",
+        "method": "post",
+        "budget": 8,
+        "status": 302,
+    },
+    "experiment_residuals": {
+        "kwargs": "experiment",
+        "method": "post",
+        "data": "measurements",
+        "budget": 5,
+        "status": 302,
+    },
+    "experiment_export_excel": {"kwargs": "experiment", "budget": 2},
+    "experiment_export": {
+        "kwargs": "experiment",
+        "extra": {"export_format": "csv"},
+        "budget": 3,
+    },
+    "material_evaluate": {
+        "kwargs": "material",
+        "method": "post",
+        "data": "points",
+        "budget": 2,
+    },
+    "metrics": {"budget": 2},
+    "sweep_create": {"budget": 2},
+    "sweep_detail": {"kwargs": "sweep", "budget": 6},
+}
+
+# Списки объектов в администрировании: бюджет по умолчанию и исключения
+ADMIN_CHANGELIST_BUDGET = 5
+ADMIN_BUDGETS = {
+    "admin:research_requestprofile_changelist": 7,
+    "admin:research_calculationrun_changelist": 7,
+}
+
+FIXTURE_EMAIL = "query-budget@example.com"
+FIXTURE_PASSWORD = "query-budget"
+
+COEFFICIENTS = {
+    (0, 0): 64.0,
+    (1, 0): -0.08,
+    (0, 1): -0.2,
+    (1, 1): 1.5e-4,
+    (2, 0): 2.5e-5,
+    (0, 2): 1e-3,
+}
+
+
+def check_routes():
+    """Имена маршрутов research без объявленного бюджета."""
+    names = {pattern.name for pattern in research_urls.urlpatterns}
+    return sorted(names - set(ROUTES))
+
+
+def build_fixtures(materials=50, experiments=500, sweep_size=100):
+    """
+    Данные размеров, близких к рабочим: материалы с полиномами, рассчитанные
+    эксперименты (часть из них - серия), история расчетов, анализы
+    остатков и профили запросов.
+    """
+    rng = np.random.default_rng(0)
+    user = User.objects.create_superuser(email=FIXTURE_EMAIL, password=FIXTURE_PASSWORD)
+    created = MathModel.objects.bulk_create(
+        [MathModel(name=f"Материал {i + 1}") for i in range(materials)]
+    )
+    PolynomialTerm.objects.bulk_create(
+        [
+            PolynomialTerm(
+                material=material,
+                t_power=t_power,
+                tau_power=tau_power,
+                coefficient=coefficient * rng.uniform(0.9, 1.1),
+            )
+            for material in created
+            for (t_power, tau_power), coefficient in COEFFICIENTS.items()
+        ]
+    )
+    # bulk_create не отправляет сигналы, сбрасывающие справочник материалов
+    invalidate_material_catalog()
+    sweep = Sweep.objects.create()
+    rows = Experiment.objects.bulk_create(
+        [
+            Experiment(
+                material=created[i % materials],
+                sweep=sweep if i < sweep_size else None,
+                t_min=1300,
+                t_max=1500,
+                delta_t=10,
+                tau_min=0,
+                tau_max=60 + i % 5 * 10,
+                delta_tau=2,
+            )
+            for i in range(experiments)
+        ]
+    )
+    Experiment.calculate_many(rows)
+    experiment = rows[-1]
+    ResidualAnalysis.objects.bulk_create(
+        [
+            ResidualAnalysis(
+                experiment=row,
+                file_name="measurements.csv",
+                threshold=3,
+                measurements=100,
+                rmse=0.1,
+                mae=0.1,
+                bias=0,
+                max_abs_residual=0.3,
+                outliers=0,
+                processing_time=1,
+            )
+            for row in rows[:50]
+        ]
+    )
+    RequestProfile.objects.bulk_create(
+        [
+            RequestProfile(
+                path="/list/",
+                method="GET",
+                status_code=200,
+                duration=600,
+                trigger="sample",
+                user=user,
+                samples=1,
+                stacks="a;b 1",
+            )
+            for _ in range(50)
+        ]
+    )
+    return {
+        "user": user,
+        "experiment": experiment,
+        "material": experiment.material,
+        "sweep": sweep,
+        "compare": {"a": rows[0].pk, "b": experiment.pk},
+        "runs": CalculationRun.objects.count(),
+    }
+
+
+def request_data(kind):
+    if kind == "measurements":
+        upload = io.BytesIO(b"t,tau,y\n1350,30,10\n1400,40,9\n1450,50,8\n")
+        upload.name = "measurements.csv"
+        return {"file": upload, "response": "porosity", "threshold": 3}
+    if kind == "points":
+        return json.dumps({"points": [[1350, 30], [1400, 40]]})
+    return None
+
+
+def isolated_settings(directory):
+    """
+    Настройки проверки: файлы тепловых карт, версий кэша и метрик во
+    временном каталоге directory, без профилирования запросов.
+    """
+    return {
+        "HEATMAP_CACHE_DIR": directory,
+        "CACHE_VERSION_DIR": os.path.join(directory, "versions"),
+        "METRICS_DIR": directory,
+        "PROFILING_SAMPLE_RATE": 0,
+        "SLOW_REQUEST_MS": float("inf"),
+    }
+
+
+def route_requests(fixtures):
+    """
+    Запросы ко всем маршрутам research и спискам объектов
+    администрирования: имя маршрута, метод, адрес, данные, тип содержимого,
+    бюджет и ожидаемый код ответа.
+    """
+    for name, route in ROUTES.items():
+        kwargs = {}
+        if "kwargs" in route:
+            kwargs["pk"] = fixtures[route["kwargs"]].pk
+        kwargs.update(route.get("extra", {}))
+        url = reverse(f"research:{name}", kwargs=kwargs)
+        if "query" in route:
+            url += "?" + "&".join(
+                f"{k}={v}" for k, v in fixtures[route["query"]].items()
+            )
+        yield {
+            "route": f"research:{name}",
+            "method": route.get("method", "get"),
+            "url": url,
+            "data": request_data(route.get("data")),
+            "content_type": (
+                "application/json" if route.get("data") == "points" else None
+            ),
+            "budget": route["budget"],
+            "status": route.get("status", 200),
+        }
+    for model in admin.site._registry:
+        opts = model._meta
+        name = f"admin:{opts.app_label}_{opts.model_name}_changelist"
+        yield {
+            "route": name,
+            "method": "get",
+            "url": reverse(name),
+            "data": None,
+            "content_type": None,
+            "budget": ADMIN_BUDGETS.get(name, ADMIN_CHANGELIST_BUDGET),
+            "status": 200,
+        }
+
+
+def perform(client, request):
+    """
+    Выполняет запрос route_requests() с пустыми кэшами; потоковый ответ
+    читается целиком, чтобы учесть запросы при его передаче.
+    """
+    for cache in caches.all():
+        cache.clear()
+    kwargs = {"data": request["data"]} if request["data"] is not None else {}
+    if request["content_type"]:
+        kwargs["content_type"] = request["content_type"]
+    response = getattr(client, request["method"])(request["url"], **kwargs)
+    if response.streaming:
+        b"".join(
+            part if isinstance(part, bytes) else part.encode()
+            for part in response.streaming_content
+        )
+    return response
+
+
+class SqlTimer:
+    """
+    Обертка выполнения запросов (connection.execute_wrapper), суммирующая
+    их время по time.perf_counter: время в connection.queries округлено до
+    миллисекунд.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+def measure(client, request):
+    """Код ответа, число запросов и суммарное время SQL (мс) при обработке запроса."""
+    timer = SqlTimer()
+    with CaptureQueriesContext(connection) as queries, connection.execute_wrapper(
+        timer
+    ):
+        response = perform(client, request)
+    return response.status_code, len(queries), timer.seconds * 1000
+
+
+def run(fixtures):
+    """
+    Запросы ко всем маршрутам research и спискам объектов администрирования
+    от имени суперпользователя. Возвращает строки отчета.
+    """
+    material_catalog()
+    client = Client()
+    report = []
+    for request in route_requests(fixtures):
+        client.force_login(fixtures["user"])
+        status, count, sql_time = measure(client, request)
+        report.append(
+            {
+                "route": request["route"],
+                "url": request["url"],
+                "status": status,
+                "expected_status": request["status"],
+                "queries": count,
+                "sql_ms": round(sql_time, 2),
+                "budget": request["budget"],
+            }
+        )
+    return report
@@ -0,0 +1,193 @@
+import io
+import math
+import os
+import time
+from itertools import chain, islice
+
+import numpy as np
+
+from research.batch import CHUNK_SIZE
+
+MAX_MEASUREMENTS = 5_000_000
+
+# Точек на графике остатков: равномерная выборка и отдельно выбросы
+PLOT_POINTS = 2000
+MAX_PLOTTED_OUTLIERS = 500
+
+# Допустимые заголовки столбцов t и τ (в нижнем регистре); измеренное
+# значение - первый из остальных столбцов
+COLUMN_ALIASES = {
+    "t": {"t", "температура", "temperature"},
+    "tau": {"tau", "τ", "время", "time"},
+}
+
+
+class MeasurementError(ValueError):
+    pass
+
+
+def is_number(value):
+    try:
+        float(str(value).replace(",", "."))
+    except ValueError:
+        return False
+    return True
+
+
+def column_indices(header):
+    """
+    Индексы столбцов t, τ и измеренного значения. Если первая строка
+    состоит из чисел, заголовка нет и используются первые три столбца.
+    Возвращает индексы и признак наличия заголовка.
+    """
+    if len(header) < 3:
+        raise MeasurementError("В файле должно быть не меньше трех столбцов: t, τ, y")
+    if all(value is not None and is_number(value) for value in header[:3]):
+        return (0, 1, 2), False
+    names = [str(value or "").strip().lower() for value in header]
+    indices = []
+    for aliases in COLUMN_ALIASES.values():
+        matches = [i for i, name in enumerate(names) if name in aliases]
+        if not matches:
+            return (0, 1, 2), True
+        indices.append(matches[0])
+    rest = [i for i in range(len(names)) if i not in indices]
+    return (*indices, rest[0]), True
+
+
+def csv_chunks(file, chunk_size=CHUNK_SIZE):
+    """
+    Массивы (n, 3) из CSV порциями по chunk_size строк. Разделитель -
+    запятая или точка с запятой (тогда допускается десятичная запятая).
+    Файл должен быть в кодировке UTF-8.
+    """
+    text = io.TextIOWrapper(file, encoding="utf-8-sig")
+    try:
+        first = text.readline()
+        delimiter = ";" if first.count(";") > first.count(",") else ","
+        indices, has_header = column_indices(first.strip().split(delimiter))
+        lines = text if has_header else chain([first], text)
+        while True:
+            chunk = list(islice(lines, chunk_size))
+            if not chunk:
+                return
+            if delimiter == ";":
+                chunk = [line.replace(",", ".") for line in chunk]
+            try:
+                yield np.loadtxt(
+                    chunk,
+                    delimiter=delimiter,
+                    usecols=indices,
+                    ndmin=2,
+                    dtype=np.float64,
+                )
+            except ValueError:
+                raise MeasurementError("Некорректная строка в CSV: ожидаются числа")
+    except UnicodeDecodeError:
+        raise MeasurementError("Файл CSV должен быть в кодировке UTF-8")
+
+
+def xlsx_chunks(file, chunk_size=CHUNK_SIZE):
+    """
+    Массивы (n, 3) из первого листа XLSX. Книга читается в режиме
+    read_only, строки листа не загружаются в память целиком.
+    """
+    import openpyxl
+
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise MeasurementError("Не удалось прочитать файл XLSX")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        first = next(rows, None)
+        if first is None:
+            return
+        indices, has_header = column_indices(first)
+        if not has_header:
+            rows = chain([first], rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            try:
+                yield np.array(
+                    [[row[i] for i in indices] for row in chunk], dtype=np.float64
+                )
+            except (TypeError, ValueError, IndexError):
+                raise MeasurementError("Некорректная строка в XLSX: ожидаются числа")
+    finally:
+        workbook.close()
+
+
+def measurement_chunks(upload, chunk_size=CHUNK_SIZE):
+    extension = os.path.splitext(upload.name)[1].lower()
+    if extension in (".csv", ".txt"):
+        return csv_chunks(upload.file, chunk_size)
+    if extension == ".xlsx":
+        return xlsx_chunks(upload.file, chunk_size)
+    raise MeasurementError("Поддерживаются файлы CSV и XLSX")
+
+
+def analyze(evaluator, chunks, threshold=3.0):
+    """
+    Остатки измерений относительно первого отклика evaluator: сводные
+    показатели и выборка точек для графика остатков.
+
+    Суммы для RMSE, MAE и смещения накапливаются по порциям. Выбросами
+    считаются остатки, отклоняющиеся от среднего больше чем на threshold·σ;
+    σ известна только после чтения всего файла, поэтому прогноз и остатки
+    порций хранятся во float32 (8 байт на измерение).
+    """
+    started = time.perf_counter()
+    count = 0
+    total = total_squares = total_abs = max_abs = 0.0
+    predicted_parts, residual_parts = [], []
+    for data in chunks:
+        data = data[~np.isnan(data).any(axis=1)]
+        count += len(data)
+        if count > MAX_MEASUREMENTS:
+            raise MeasurementError(
+                f"Превышено максимальное число измерений: {MAX_MEASUREMENTS}"
+            )
+        if not len(data):
+            continue
+        predicted = evaluator.values(data[:, 0], data[:, 1])[0]
+        residual = data[:, 2] - predicted
+        total += residual.sum()
+        total_squares += np.dot(residual, residual)
+        total_abs += np.abs(residual).sum()
+        max_abs = max(max_abs, float(np.abs(residual).max()))
+        predicted_parts.append(predicted.astype(np.float32))
+        residual_parts.append(residual.astype(np.float32))
+    if not count:
+        raise MeasurementError("В файле нет измерений")
+
+    bias = total / count
+    sigma = math.sqrt(max(total_squares / count - bias**2, 0))
+    predicted = np.concatenate(predicted_parts)
+    residual = np.concatenate(residual_parts)
+    outlier = np.abs(residual - bias) > threshold * sigma
+    return {
+        "measurements": count,
+        "rmse": math.sqrt(total_squares / count),
+        "mae": total_abs / count,
+        "bias": bias,
+        "max_abs_residual": max_abs,
+        "outliers": int(outlier.sum()),
+        "plot": plot_sample(predicted, residual, outlier),
+        "processing_time": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+def plot_sample(predicted, residual, outlier):
+    """Равномерная выборка точек и первые MAX_PLOTTED_OUTLIERS выбросов."""
+    uniform = np.linspace(0, len(residual) - 1, min(PLOT_POINTS, len(residual)))
+    index = np.union1d(
+        uniform.astype(np.int64), np.flatnonzero(outlier)[:MAX_PLOTTED_OUTLIERS]
+    )
+    return {
+        "predicted": np.round(predicted[index].astype(np.float64), 6).tolist(),
+        "residual": np.round(residual[index].astype(np.float64), 6).tolist(),
+        "outlier": outlier[index].tolist(),
+    }
@@ -0,0 +1,65 @@
+import os
+import subprocess
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+
+# Вычислительная библиотека, которой выполняется расчет
+BACKEND = f"numpy {np.__version__}"
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """
+    Версия кода для истории расчетов: CODE_VERSION из настроек, иначе
+    сокращенный хэш текущего коммита git.
+    """
+    if settings.CODE_VERSION:
+        return settings.CODE_VERSION
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=5,
+            check=True,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+    return result.stdout.strip() or "unknown"
+
+
+class RunRecorder:
+    """
+    Время этапов расчета (мс) и наибольший объем памяти процесса (RSS, КБ),
+    замеренный на границах этапов.
+    """
+
+    def __init__(self):
+        import psutil
+
+        self.process = psutil.Process(os.getpid())
+        self.memory_before = self.rss()
+        self.peak_memory = self.memory_before
+        self.phases = {}
+
+    def rss(self):
+        return self.process.memory_info().rss / 1024
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = (time.perf_counter() - started) * 1000
+            self.phases[name] = round(self.phases.get(name, 0) + duration, 4)
+            self.peak_memory = max(self.peak_memory, self.rss())
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
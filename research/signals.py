@@ -0,0 +1,27 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from research.cache import bump_version
+from research.catalog import invalidate_material_catalog
+from research.database import configure_connection
+from research.models import Experiment, MathModel, PolynomialTerm
+
+
+@receiver(post_save, sender=Experiment)
+@receiver(post_delete, sender=Experiment)
+def invalidate_experiment_list(sender, **kwargs):
+    bump_version("experiments")
+
+
+@receiver(post_save, sender=MathModel)
+@receiver(post_delete, sender=MathModel)
+@receiver(post_save, sender=PolynomialTerm)
+@receiver(post_delete, sender=PolynomialTerm)
+def invalidate_materials(sender, **kwargs):
+    invalidate_material_catalog()
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    configure_connection(connection)
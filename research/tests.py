@@ -1,3 +1,1265 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import zlib
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import (
+    Client,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from django.utils.formats import localize
+
+from research.batch import BatchError, parse_points, read_ndjson_chunks
+from research.cache import get_version, write_version
+from research.catalog import invalidate_material_catalog, material_catalog
+from research.charts import lttb_indices
+from research.compare import align, relative_change
+from research.database import is_lock_error, retry_on_lock
+from research.evaluation import (
+    DERIVATIVES,
+    PRIMARY_RESPONSE,
+    GridCache,
+    axis,
+    material_evaluator,
+    refine_axis,
+    round_significant,
+)
+from research.forms import (
+    MAX_SWEEP_EXPERIMENTS,
+    ExperimentCompareForm,
+    ExperimentForm,
+    ExperimentFilterForm,
+    SweepForm,
+    ValuesField,
+)
+from research import metrics, parallel
+from research.heatmap import (
+    COLORMAP,
+    HEATMAP_SIDES,
+    MISSING_COLOR,
+    colorize,
+    encode_png,
+    remove_superseded,
+    snap_side,
+)
+from research.models import (
+    Experiment,
+    MathModel,
+    PolynomialTerm,
+    RequestProfile,
+    Sweep,
+)
+from research.query_budget import (
+    COEFFICIENTS,
+    build_fixtures,
+    check_routes,
+    isolated_settings,
+    perform,
+    route_requests,
+)
+from research.residuals import MeasurementError, csv_chunks
+from users.models import User
+
+GRID = {
+    "t_min": 1300,
+    "t_max": 1500,
+    "delta_t": 10,
+    "tau_min": 0,
+    "tau_max": 60,
+    "delta_tau": 2,
+}
+
+
+def create_material(coefficients=COEFFICIENTS, name="Материал", response=None):
+    """Материал с членами {(степень t, степень τ): коэффициент}."""
+    material = MathModel.objects.create(name=name)
+    PolynomialTerm.objects.bulk_create(
+        [
+            PolynomialTerm(
+                material=material,
+                response=response or PRIMARY_RESPONSE,
+                t_power=t_power,
+                tau_power=tau_power,
+                coefficient=coefficient,
+            )
+            for (t_power, tau_power), coefficient in coefficients.items()
+        ]
+    )
+    # bulk_create не отправляет сигналы, сбрасывающие справочник материалов
+    invalidate_material_catalog()
+    return material
+
+
+def create_experiment(material, **fields):
+    experiment = Experiment.objects.create(**{**GRID, "material": material, **fields})
+    experiment.calculate()
+    return experiment
+
+
+class IsolatedFilesMixin:
+    """
+    Файлы тепловых карт, версий кэша и метрик во временном каталоге
+    класса тестов; кэши очищаются перед каждым тестом.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.isolated = override_settings(**isolated_settings(cls.directory))
+        cls.isolated.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.isolated.disable()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        for cache in caches.all():
+            cache.clear()
+
+
+class ResearchTestCase(IsolatedFilesMixin, TestCase):
+    """Тесты представлений от имени исследователя."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(
+            email="researcher@example.com", password="researcher", is_researcher=True
+        )
+        self.client.force_login(self.user)
+
+
+class LttbIndicesTests(SimpleTestCase):
+    def test_keeps_all_points_below_threshold(self):
+        x = np.arange(10, dtype=np.float64)
+        np.testing.assert_array_equal(lttb_indices(x, x**2, 20), np.arange(10))
+
+    def test_keeps_ends_and_returns_threshold_points(self):
+        x = np.linspace(0, 1, 1000)
+        indices = lttb_indices(x, np.sin(x * 20), 50)
+        self.assertEqual(len(indices), 50)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], 999)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_selects_peak(self):
+        x = np.arange(101, dtype=np.float64)
+        y = np.zeros(101)
+        y[37] = 10
+        self.assertIn(37, lttb_indices(x, y, 10))
+
+
+class ColorizeTests(SimpleTestCase):
+    def test_maps_range_to_colormap_ends(self):
+        pixels = colorize(np.array([[0.0, 0.5, 1.0]]))
+        self.assertEqual(pixels.shape, (1, 3, 3))
+        np.testing.assert_array_equal(pixels[0, 0], COLORMAP[0])
+        np.testing.assert_array_equal(pixels[0, 2], COLORMAP[-1])
+
+    def test_constant_surface(self):
+        pixels = colorize(np.full((2, 2), 7.0))
+        np.testing.assert_array_equal(pixels, np.broadcast_to(COLORMAP[0], (2, 2, 3)))
+
+    def test_masks_nan(self):
+        pixels = colorize(np.array([[0.0, np.nan, 1.0]]))
+        np.testing.assert_array_equal(pixels[0, 1], MISSING_COLOR)
+        np.testing.assert_array_equal(pixels[0, 2], COLORMAP[-1])
+        np.testing.assert_array_equal(
+            colorize(np.full((1, 2), np.nan)), np.full((1, 2, 3), MISSING_COLOR)
+        )
+
+
+class EncodePngTests(SimpleTestCase):
+    def test_chunks_and_pixels(self):
+        pixels = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+        content = encode_png(pixels)
+        self.assertTrue(content.startswith(b"\x89PNG\r\n\x1a\n"))
+
+        chunks, offset = {}, 8
+        while offset < len(content):
+            (length,) = struct.unpack(">I", content[offset : offset + 4])
+            chunk_type = content[offset + 4 : offset + 8]
+            data = content[offset + 8 : offset + 8 + length]
+            (crc,) = struct.unpack(
+                ">I", content[offset + 8 + length : offset + 12 + length]
+            )
+            self.assertEqual(crc, zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+            chunks[chunk_type] = data
+            offset += 12 + length
+
+        self.assertEqual(list(chunks), [b"IHDR", b"IDAT", b"IEND"])
+        width, height, depth, color_type = struct.unpack(">IIBB", chunks[b"IHDR"][:10])
+        self.assertEqual((width, height, depth, color_type), (3, 2, 8, 2))
+        rows = np.frombuffer(zlib.decompress(chunks[b"IDAT"]), dtype=np.uint8)
+        rows = rows.reshape(2, 3 * 3 + 1)
+        np.testing.assert_array_equal(rows[:, 0], 0)
+        np.testing.assert_array_equal(rows[:, 1:].reshape(2, 3, 3), pixels)
+
+
+class RemoveSupersededTests(SimpleTestCase):
+    def test_keeps_current_and_other_experiments(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            names = ["1-old-10x10.png", "1-new-10x10.png", "1-new-20x20.png"]
+            names.append("12-old-10x10.png")
+            for name in names:
+                open(os.path.join(cache_dir, name), "wb").close()
+            remove_superseded(cache_dir, SimpleNamespace(pk=1), "new")
+            self.assertEqual(
+                sorted(os.listdir(cache_dir)),
+                ["1-new-10x10.png", "1-new-20x20.png", "12-old-10x10.png"],
+            )
+
+
+class ParsePointsTests(SimpleTestCase):
+    def test_pairs_and_objects(self):
+        expected = np.array([[1300.0, 30.0], [1400.0, 45.5]])
+        np.testing.assert_array_equal(
+            parse_points([[1300, 30], [1400, 45.5]]), expected
+        )
+        np.testing.assert_array_equal(
+            parse_points([{"t": 1300, "tau": 30}, {"t": 1400, "tau": 45.5}]),
+            expected,
+        )
+        self.assertEqual(parse_points([]).shape, (0, 2))
+
+    def test_invalid_points(self):
+        for items in (
+            {"a": 1},
+            5,
+            "1300,30",
+            None,
+            [[1300]],
+            [[1300, 30, 1]],
+            [["a", 30]],
+            [{"t": 1300}],
+            [{"t": 1300, "tau": 30}, 5],
+        ):
+            with self.subTest(items=items), self.assertRaises(BatchError):
+                parse_points(items)
+
+    def test_ndjson_chunks(self):
+        lines = [b"[1300, 30]\n", b"\n", b"[1310, 31]\n", b"[1320, 32]\n"]
+        chunks = list(read_ndjson_chunks(iter(lines), chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 1])
+        with self.assertRaises(BatchError):
+            list(read_ndjson_chunks(iter([b"[1300, 30"])))
+
+
+class RefineAxisTests(SimpleTestCase):
+    def test_short_axis_is_uniform(self):
+        x, evaluated = refine_axis(0, 10, 2, 0.01, lambda x: np.array([x]))
+        np.testing.assert_array_equal(x, axis(0, 10, 2))
+        self.assertEqual(evaluated, 6)
+
+    def test_linear_curve_is_not_refined(self):
+        x, evaluated = refine_axis(0, 100, 0.1, 1e-6, lambda x: np.array([3 * x + 1]))
+        np.testing.assert_allclose(x, np.linspace(0, 100, 9))
+        # Начальные точки и одна проверка середины каждого интервала
+        self.assertEqual(evaluated, 9 + 8)
+
+    def test_refines_where_curvature_is_high(self):
+        def curves(x):
+            return np.array([np.exp(x / 10), np.zeros_like(x)])
+
+        tolerance = 0.01
+        x, evaluated = refine_axis(0, 100, 0.5, tolerance, curves)
+        self.assertEqual(x[0], 0)
+        self.assertEqual(x[-1], 100)
+        self.assertTrue(np.all(np.diff(x) >= 0.5))
+        self.assertLess(len(x), len(axis(0, 100, 0.5)))
+        steps = np.diff(x)
+        self.assertLess(steps[-1], steps[0])
+        # Между соседними точками линейная интерполяция укладывается в
+        # допуск, кроме интервалов минимальной длины
+        middle = (x[:-1] + x[1:]) / 2
+        error = np.abs(curves(middle)[0] - (curves(x)[0][:-1] + curves(x)[0][1:]) / 2)
+        self.assertTrue(np.all((error <= tolerance) | (steps < 1)))
+
+
+class CsvChunksTests(SimpleTestCase):
+    def test_semicolon_and_decimal_comma(self):
+        content = "время;t;y\n50;1400;1,5\n40;1300;2\n".encode()
+        (data,) = csv_chunks(io.BytesIO(content))
+        np.testing.assert_array_equal(data, [[1400, 50, 1.5], [1300, 40, 2]])
+
+    def test_non_utf8_file(self):
+        content = "t;время;пористость\n1400;50;1\n".encode("cp1251")
+        with self.assertRaises(MeasurementError):
+            list(csv_chunks(io.BytesIO(content)))
+
+
+class AlignTests(SimpleTestCase):
+    def test_merges_grids_on_common_range(self):
+        x, a, b = align(
+            np.array([0.0, 10.0, 20.0, 30.0]),
+            [np.array([0.0, 10.0, 20.0, 30.0])],
+            np.array([25.0, 5.0, 15.0]),
+            [np.array([2.5, 0.5, 1.5])],
+        )
+        np.testing.assert_array_equal(x, [5, 10, 15, 20, 25])
+        np.testing.assert_allclose(a[0], [5, 10, 15, 20, 25])
+        np.testing.assert_allclose(b[0], [0.5, 1.0, 1.5, 2.0, 2.5])
+
+    def test_disjoint_and_empty_series(self):
+        x, a, b = align(np.array([0.0, 1.0]), [np.zeros(2)], np.array([]), [])
+        self.assertEqual(len(x), 0)
+        x, a, b = align(
+            np.array([0.0, 1.0]), [np.zeros(2)], np.array([2.0, 3.0]), [np.zeros(2)]
+        )
+        self.assertEqual(len(x), 0)
+
+    def test_relative_change(self):
+        np.testing.assert_allclose(
+            relative_change(np.array([2.0, -4.0, 0.0]), np.array([3.0, -2.0, 1.0])),
+            [50.0, 50.0, np.nan],
+        )
+
+
+class QueryBudgetTests(IsolatedFilesMixin, TransactionTestCase):
+    """
+    Бюджеты запросов research.query_budget на небольших данных: число
+    запросов маршрутов не зависит от объема данных. Команда query_budget
+    проверяет те же бюджеты на данных рабочего объема. Запросы выполняются
+    вне транзакции теста, как на сервере: запись через retry_on_lock
+    открывает свою транзакцию.
+    """
+
+    def setUp(self):
+        self.fixtures = build_fixtures(materials=3, experiments=12, sweep_size=5)
+        super().setUp()
+        material_catalog()
+
+    def test_all_routes_have_budget(self):
+        self.assertEqual(check_routes(), [])
+
+    def test_routes(self):
+        client = Client()
+        for request in route_requests(self.fixtures):
+            with self.subTest(route=request["route"]):
+                client.force_login(self.fixtures["user"])
+                with self.assertNumQueries(request["budget"]):
+                    response = perform(client, request)
+                self.assertEqual(response.status_code, request["status"])
+
+
+@override_settings(SQLITE_LOCK_RETRIES=2, SQLITE_LOCK_BACKOFF=0)
+class RetryOnLockTests(TransactionTestCase):
+    """Вне транзакции теста: retry_on_lock открывает свою транзакцию."""
+
+    def failing_write(self, errors):
+        """write(), которая выбрасывает errors по порядку, затем возвращает "ok"."""
+        calls = []
+
+        def write():
+            calls.append(connection.in_atomic_block)
+            if len(calls) <= len(errors):
+                raise errors[len(calls) - 1]
+            return "ok"
+
+        return write, calls
+
+    def test_is_lock_error(self):
+        self.assertTrue(is_lock_error(OperationalError("database is locked")))
+        self.assertFalse(is_lock_error(OperationalError("no such table: x")))
+        self.assertFalse(is_lock_error(ValueError("database is locked")))
+
+    def test_retries_until_success(self):
+        write, calls = self.failing_write([OperationalError("database is locked")])
+        self.assertEqual(retry_on_lock(write, "test"), "ok")
+        self.assertEqual(calls, [True, True])
+
+    def test_reraises_after_retries(self):
+        write, calls = self.failing_write([OperationalError("database is locked")] * 3)
+        with self.assertRaisesMessage(OperationalError, "database is locked"):
+            retry_on_lock(write, "test")
+        self.assertEqual(len(calls), 3)
+
+    def test_other_errors_are_not_retried(self):
+        write, calls = self.failing_write([OperationalError("no such table: x")])
+        with self.assertRaises(OperationalError):
+            retry_on_lock(write, "test")
+        self.assertEqual(len(calls), 1)
+
+    def test_no_retry_inside_transaction(self):
+        write, calls = self.failing_write([OperationalError("database is locked")])
+        with self.assertRaises(OperationalError), transaction.atomic():
+            retry_on_lock(write, "test")
+        self.assertEqual(len(calls), 1)
+
+
+class ChartDataViewTests(ResearchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.experiment = create_experiment(create_material())
+
+    def get(self, etag=None, **params):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        url = reverse("research:experiment_chart_data", args=[self.experiment.pk])
+        return self.client.get(url, {"format": "f32", **params}, **headers)
+
+    def test_not_modified(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/octet-stream")
+        etag = response["ETag"]
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_etag_changes_after_recalculation(self):
+        etag = self.get()["ETag"]
+        self.experiment.calculate()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.get(response["ETag"]).status_code, 304)
+
+    def test_etag_depends_on_quantity(self):
+        etag = self.get()["ETag"]
+        response = self.get(etag, quantity="dt")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.get(response["ETag"], quantity="dt").status_code, 304)
+        self.assertEqual(self.get(response["ETag"], quantity="dtau").status_code, 200)
+
+
+class HeatmapViewTests(ResearchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.experiment = create_experiment(create_material())
+
+    def get(self, width, height):
+        url = reverse("research:experiment_heatmap", args=[self.experiment.pk])
+        response = self.client.get(url, {"width": width, "height": height})
+        content = b"".join(response.streaming_content)
+        response.close()
+        return response, content
+
+    def test_snap_side(self):
+        self.assertEqual(snap_side(1), HEATMAP_SIDES[0])
+        self.assertEqual(snap_side(480), 480)
+        self.assertEqual(snap_side(481), 640)
+        self.assertEqual(snap_side(HEATMAP_SIDES[-1]), HEATMAP_SIDES[-1])
+
+    def test_sizes_share_cached_image(self):
+        for width, height in ((300, 200), (310, 250), (320, 320)):
+            response, content = self.get(width, height)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(struct.unpack(">II", content[16:24]), (320, 320))
+        self.get(2000, 1)
+        sizes = [
+            name.rsplit("-", 1)[1]
+            for name in os.listdir(self.directory)
+            if name.endswith(".png")
+        ]
+        self.assertEqual(sorted(sizes), ["2000x160.png", "320x320.png"])
+
+
+class CacheVersionTests(ResearchTestCase):
+    """
+    Изменения в обход сигналов (queryset.update) не сбрасывают кэш, пока
+    метка поколения в CACHE_VERSION_DIR не сменится - так страницы видит
+    процесс, в котором метку сменил другой процесс.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.material = create_material(name="Исходный материал")
+        self.experiment = create_experiment(self.material)
+
+    def test_list_page(self):
+        url = reverse("research:experiment_list")
+        t_range = f"{localize(1250.0)} - {localize(1500.0)}"
+        self.assertContains(self.client.get(url), "Исходный материал")
+        Experiment.objects.filter(pk=self.experiment.pk).update(t_min=1250)
+        self.assertNotContains(self.client.get(url), t_range)
+        write_version("experiments")
+        self.assertContains(self.client.get(url), t_range)
+
+        MathModel.objects.filter(pk=self.material.pk).update(name="Новый материал")
+        self.assertNotContains(self.client.get(url), "Новый материал")
+        write_version("materials")
+        self.assertContains(self.client.get(url), "Новый материал")
+
+    def test_detail_page(self):
+        url = reverse("research:experiment_results", args=[self.experiment.pk])
+        self.assertContains(self.client.get(url), localize(64.0))
+        PolynomialTerm.objects.filter(
+            material=self.material, t_power=0, tau_power=0
+        ).update(coefficient=12345.5)
+        self.assertNotContains(self.client.get(url), localize(12345.5))
+        write_version("materials")
+        self.assertContains(self.client.get(url), localize(12345.5))
+
+    def test_save_changes_version(self):
+        version = get_version("experiments")
+        self.experiment.save()
+        self.assertNotEqual(get_version("experiments"), version)
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(self.directory, "versions", "experiments.version")
+            )
+        )
+
+
+# y = 0.001·(t - 1400)² + 0.01·(τ - 20)² + 2: минимум 2 при t = 1400, τ = 20
+PARABOLOID = {
+    (0, 0): 1966.0,
+    (1, 0): -2.8,
+    (2, 0): 1e-3,
+    (0, 1): -0.4,
+    (0, 2): 0.01,
+}
+
+
+def paraboloid(t, tau):
+    return 1e-3 * (t - 1400) ** 2 + 0.01 * (tau - 20) ** 2 + 2
+
+
+class PorositySummaryTests(ResearchTestCase):
+    def test_summary_columns(self):
+        experiment = create_experiment(create_material(PARABOLOID))
+        t_axis, tau_axis = axis(1300, 1500, 10), axis(0, 60, 2)
+        # Точки кривых при постоянной температуре и при постоянном времени
+        values = np.concatenate(
+            [paraboloid(t, tau_axis) for t in (1300, 1500, 1400)]
+            + [paraboloid(t_axis, tau) for tau in (0, 60, 30)]
+        )
+        self.assertAlmostEqual(experiment.porosity_min, 2, places=4)
+        self.assertEqual(experiment.porosity_min_t, 1400)
+        self.assertEqual(experiment.porosity_min_tau, 20)
+        self.assertAlmostEqual(experiment.porosity_max, values.max(), places=4)
+        self.assertAlmostEqual(experiment.porosity_mean, values.mean(), places=4)
+        self.assertAlmostEqual(experiment.porosity_at_avg, paraboloid(1400, 30), 4)
+
+    def test_list_filter(self):
+        low = create_experiment(create_material(PARABOLOID, name="Низкая"))
+        high = create_experiment(
+            create_material({**PARABOLOID, (0, 0): 1976.0}, name="Высокая")
+        )
+        self.assertAlmostEqual(high.porosity_min, 12, places=4)
+
+        form = ExperimentFilterForm({"porosity_min_below": 5})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(list(form.filter(Experiment.objects.all())), [low])
+        form = ExperimentFilterForm({"porosity_max_above": 30})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(list(form.filter(Experiment.objects.all())), [high])
+
+        url = reverse("research:experiment_list")
+        response = self.client.get(url, {"porosity_min_below": 5})
+        self.assertEqual(list(response.context["experiments"]), [low])
+        self.assertContains(response, "<td>Низкая</td>", html=True)
+        self.assertNotContains(response, "<td>Высокая</td>", html=True)
+
+
+class ExportViewTests(ResearchTestCase):
+    def setUp(self):
+        super().setUp()
+        material = create_material(PARABOLOID)
+        PolynomialTerm.objects.create(
+            material=material,
+            response="density",
+            t_power=0,
+            tau_power=0,
+            coefficient=7.5,
+        )
+        self.experiment = create_experiment(material)
+
+    def export(self, export_format, **params):
+        response = self.client.get(
+            reverse(
+                "research:experiment_export", args=[self.experiment.pk, export_format]
+            ),
+            params,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def curve_points(self):
+        t_axis, tau_axis = axis(1300, 1500, 10), axis(0, 60, 2)
+        points = [
+            np.column_stack([np.full_like(tau_axis, t), tau_axis])
+            for t in (1300, 1500, 1400)
+        ] + [
+            np.column_stack([t_axis, np.full_like(t_axis, tau)]) for tau in (0, 60, 30)
+        ]
+        return np.concatenate(points)
+
+    def test_curves_csv(self):
+        response, content = self.export("csv")
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn(
+            f'filename="experiment_{self.experiment.pk}_results.csv"',
+            response["Content-Disposition"],
+        )
+        header, *lines = content.decode().splitlines()
+        self.assertEqual(header, f"t,tau,{PRIMARY_RESPONSE}")
+        rows = np.array([line.split(",") for line in lines], dtype=np.float64)
+        points = self.curve_points()
+        np.testing.assert_array_equal(rows[:, :2], points)
+        np.testing.assert_allclose(rows[:, 2], paraboloid(*points.T), atol=1e-4)
+
+    def test_curves_ndjson(self):
+        response, content = self.export("ndjson")
+        self.assertEqual(
+            response["Content-Type"], "application/x-ndjson; charset=utf-8"
+        )
+        header, *lines = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(header, {"columns": ["t", "tau", PRIMARY_RESPONSE]})
+        rows = np.array(lines)
+        points = self.curve_points()
+        np.testing.assert_array_equal(rows[:, :2], points)
+        np.testing.assert_allclose(rows[:, 2], paraboloid(*points.T), atol=1e-4)
+
+    def test_surface(self):
+        response, content = self.export("ndjson", surface=1)
+        self.assertIn(
+            f'filename="experiment_{self.experiment.pk}_surface.ndjson"',
+            response["Content-Disposition"],
+        )
+        header, *lines = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(header, {"columns": ["t", "tau", PRIMARY_RESPONSE, "density"]})
+        rows = np.array(lines)
+        t, tau = np.meshgrid(axis(1300, 1500, 10), axis(0, 60, 2), indexing="ij")
+        np.testing.assert_array_equal(rows[:, 0], t.ravel())
+        np.testing.assert_array_equal(rows[:, 1], tau.ravel())
+        np.testing.assert_allclose(rows[:, 2], paraboloid(t, tau).ravel(), rtol=1e-12)
+        np.testing.assert_array_equal(rows[:, 3], 7.5)
+
+        _, content = self.export("csv", surface=1)
+        lines = content.decode().splitlines()
+        self.assertEqual(lines[0], f"t,tau,{PRIMARY_RESPONSE},density")
+        self.assertEqual(len(lines), 1 + t.size)
+
+    def test_gzip_decompresses_to_plain_output(self):
+        for export_format in ("csv", "ndjson"):
+            for params in ({}, {"surface": 1}):
+                with self.subTest(export_format=export_format, **params):
+                    _, plain = self.export(export_format, **params)
+                    response, compressed = self.export(export_format, gzip=1, **params)
+                    self.assertEqual(response["Content-Type"], "application/gzip")
+                    self.assertTrue(
+                        response["Content-Disposition"].endswith(
+                            f'.{export_format}.gz"'
+                        )
+                    )
+                    self.assertEqual(gzip.decompress(compressed), plain)
+
+    def test_unknown_format(self):
+        url = reverse("research:experiment_export", args=[self.experiment.pk, "xml"])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class CompareViewTests(ResearchTestCase):
+    def setUp(self):
+        super().setUp()
+        material = create_material(PARABOLOID)
+        self.a = create_experiment(material)
+        self.b = create_experiment(material, t_max=1550)
+
+    def test_form_does_not_list_experiments(self):
+        html = str(ExperimentCompareForm())
+        self.assertNotIn("<option", html)
+        self.assertInHTML(
+            '<input type="number" name="a" class="form-control" min="1" '
+            'required id="id_a">',
+            html,
+        )
+
+    def test_experiments_are_looked_up_by_number(self):
+        form = ExperimentCompareForm({"a": self.a.pk, "b": self.b.pk})
+        with self.assertNumQueries(2):
+            self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["a"], self.a)
+        self.assertEqual(form.cleaned_data["b"], self.b)
+
+        # Нерассчитанный эксперимент сравнить нельзя
+        pending = Experiment.objects.create(**GRID, material=self.a.material)
+        for value in (pending.pk, 0, "x"):
+            with self.subTest(value=value):
+                form = ExperimentCompareForm({"a": self.a.pk, "b": value})
+                self.assertFalse(form.is_valid())
+                self.assertEqual(
+                    form.errors["b"],
+                    [f"Рассчитанный эксперимент №{value} не найден."],
+                )
+
+    def test_view(self):
+        response = self.client.get(
+            reverse("research:experiment_compare"), {"a": self.a.pk, "b": self.b.pk}
+        )
+        self.assertEqual(response.context["experiment_a"], self.a)
+        self.assertEqual(response.context["experiment_b"], self.b)
+        self.assertContains(response, f"Эксперимент B: №{self.b.pk}, Материал")
+        self.assertNotContains(response, "<option")
+
+
+class RequestProfileStacksTests(TestCase):
+    def setUp(self):
+        self.profile = RequestProfile.objects.create(
+            path="/research/",
+            method="GET",
+            status_code=200,
+            duration=1500,
+            trigger="sample",
+            samples=2,
+            stacks="main;handle 2\n",
+        )
+        self.user = User.objects.create_user(
+            email="staff@example.com", password="staff", is_staff=True
+        )
+        self.client.force_login(self.user)
+        self.url = reverse(
+            "admin:research_requestprofile_stacks", args=[self.profile.pk]
+        )
+
+    def test_requires_view_permission(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_download(self):
+        self.user.user_permissions.add(
+            Permission.objects.get(codename="view_requestprofile")
+        )
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"main;handle 2\n")
+        self.assertIn(
+            f'filename="profile_{self.profile.pk}.collapsed"',
+            response["Content-Disposition"],
+        )
+
+
+class MetricsCollectTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        settings = override_settings(METRICS_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Значения текущего процесса в файлы не записываются
+        patcher = mock.patch.object(metrics, "flush")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        child = subprocess.Popen([sys.executable, "-c", ""])
+        child.wait()
+        self.dead_pid = child.pid
+
+    def write(self, name, pid, retries, in_progress, seconds):
+        buckets = [0] * (len(metrics.LATENCY_BUCKETS) + 1)
+        buckets[0] = 1
+        metrics.write_json(
+            os.path.join(self.directory, name),
+            metrics.serialize(
+                pid,
+                {
+                    metrics.DB_LOCK_RETRIES.name: {("save",): retries},
+                    metrics.CALCULATIONS_IN_PROGRESS.name: {("single",): in_progress},
+                    metrics.CALCULATION_SECONDS.name: {
+                        ("single",): buckets + [seconds]
+                    },
+                },
+            ),
+        )
+
+    def collected(self):
+        merged = metrics.collect()
+        return (
+            merged[metrics.DB_LOCK_RETRIES.name],
+            merged[metrics.CALCULATIONS_IN_PROGRESS.name],
+            merged[metrics.CALCULATION_SECONDS.name][("single",)][-1],
+        )
+
+    def test_merges_processes(self):
+        self.write("dead.json", self.dead_pid, retries=3, in_progress=2, seconds=0.5)
+        self.write("live.json", os.getpid(), retries=1, in_progress=1, seconds=0.25)
+
+        retries, in_progress, seconds = self.collected()
+        self.assertEqual(retries, {("save",): 4})
+        # Выполнявшиеся в завершившемся процессе расчеты не учитываются
+        self.assertEqual(in_progress, {("single",): 1})
+        self.assertEqual(seconds, 0.75)
+        self.assertEqual(
+            sorted(
+                name for name in os.listdir(self.directory) if name.endswith(".json")
+            ),
+            [metrics.ARCHIVE_FILE, "live.json"],
+        )
+        archive = metrics.read_json(os.path.join(self.directory, metrics.ARCHIVE_FILE))
+        self.assertNotIn(metrics.CALCULATIONS_IN_PROGRESS.name, archive["metrics"])
+
+        # Архив учитывается один раз при каждом сборе
+        self.assertEqual(self.collected(), (retries, in_progress, seconds))
+
+        self.write("dead-2.json", self.dead_pid, retries=2, in_progress=1, seconds=1.0)
+        self.assertEqual(self.collected(), ({("save",): 6}, {("single",): 1}, 1.75))
+
+
+class MaterialCatalogTests(ResearchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.material = create_material(PARABOLOID)
+        self.constant = self.material.terms.get(t_power=0, tau_power=0)
+
+    def minimum(self):
+        """Значение полинома в точке минимума параболоида (1400, 20)."""
+        evaluator = material_evaluator(self.material.pk)
+        return evaluator.values(np.array([1400.0]), np.array([20.0]))[0, 0]
+
+    def test_term_changes_invalidate_catalog(self):
+        catalog = material_catalog()
+        stamp = get_version("materials")
+        self.assertAlmostEqual(self.minimum(), 2)
+
+        self.constant.coefficient = 1969.0
+        self.constant.save()
+        self.assertNotEqual(get_version("materials"), stamp)
+        self.assertIsNot(material_catalog(), catalog)
+        self.assertAlmostEqual(self.minimum(), 5)
+        experiment = create_experiment(self.material)
+        self.assertAlmostEqual(experiment.porosity_min, 5, places=4)
+
+        stamp = get_version("materials")
+        self.constant.delete()
+        self.assertNotEqual(get_version("materials"), stamp)
+        self.assertAlmostEqual(self.minimum(), -1964)
+        experiment.calculate()
+        self.assertAlmostEqual(experiment.porosity_min, -1964, places=4)
+
+    def test_stamp_change_from_another_process(self):
+        catalog = material_catalog()
+        # Изменение, сделанное другим процессом: сигналы этого процесса
+        # не срабатывают, справочник устаревает до смены метки
+        PolynomialTerm.objects.filter(pk=self.constant.pk).update(coefficient=1969.0)
+        self.assertIs(material_catalog(), catalog)
+        self.assertAlmostEqual(self.minimum(), 2)
+
+        write_version("materials")
+        self.assertIsNot(material_catalog(), catalog)
+        self.assertAlmostEqual(self.minimum(), 5)
+        experiment = create_experiment(self.material)
+        self.assertAlmostEqual(experiment.porosity_min, 5, places=4)
+
+
+class ValuesFieldTests(SimpleTestCase):
+    def test_values(self):
+        field = ValuesField(required=False)
+        self.assertEqual(field.clean("1300, 1350,"), [1300, 1350])
+        self.assertEqual(field.clean("60:90:15"), [60, 75, 90])
+        self.assertEqual(field.clean("0.1:0.3:0.1"), [0.1, 0.2, 0.3])
+        self.assertEqual(field.clean("90:60:15"), [])
+
+    def test_invalid_values(self):
+        field = ValuesField()
+        for value in ("a, 1", "1:2", "1:2:0", f"0:{MAX_SWEEP_EXPERIMENTS}:1"):
+            with self.subTest(value=value), self.assertRaises(ValidationError):
+                field.clean(value)
+
+
+class SweepTests(ResearchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.materials = [
+            create_material(name="Материал 1"),
+            create_material(PARABOLOID, name="Материал 2"),
+        ]
+
+    def data(self, **fields):
+        return {
+            "materials": [material.pk for material in self.materials],
+            "t_min": "1300",
+            "t_max": "1450, 1550",
+            "delta_t": "10",
+            "tau_min": "30",
+            "tau_max": "60:90:30",
+            "delta_tau": "2",
+            **fields,
+        }
+
+    def test_experiment_limit(self):
+        # Материалы × значения t_max × значения τ_max
+        form = SweepForm(self.data(t_max="1400:1649:1"))
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(len(form.cleaned_data["grids"]) * 2, MAX_SWEEP_EXPERIMENTS)
+        form = SweepForm(self.data(t_max="1400:1650:1"))
+        self.assertFalse(form.is_valid())
+        self.assertIn("Серия содержит 1004 экспериментов", str(form.errors))
+
+    def test_create(self):
+        response = self.client.post(reverse("research:sweep_create"), self.data())
+        sweep = Sweep.objects.get()
+        self.assertRedirects(
+            response, reverse("research:sweep_detail", args=[sweep.pk])
+        )
+        experiments = sweep.experiments.order_by("material", "t_max", "tau_max")
+        self.assertEqual(experiments.count(), 2 * 2 * 2)
+        self.assertEqual(
+            {(e.material_id, e.t_max, e.tau_max) for e in experiments},
+            {
+                (material.pk, t_max, tau_max)
+                for material in self.materials
+                for t_max in (1450, 1550)
+                for tau_max in (60, 90)
+            },
+        )
+        self.assertTrue(all(experiment.has_results for experiment in experiments))
+
+    def test_batch_matches_single(self):
+        fields = [
+            {"material": material, **GRID, **extra}
+            for material in self.materials
+            for extra in ({}, {"tau_max": 90}, {"sampling": "adaptive"})
+        ]
+        batch = Experiment.objects.bulk_create([Experiment(**f) for f in fields])
+        Experiment.calculate_many(batch)
+        for f, experiment in zip(fields, batch):
+            single = create_experiment(**f)
+            single.refresh_from_db()
+            experiment.refresh_from_db()
+            with self.subTest(**{k: str(v) for k, v in f.items()}):
+                self.assertEqual(experiment.results, single.results)
+                self.assertEqual(experiment.derivatives, single.derivatives)
+                for field in Experiment.RESULT_FIELDS:
+                    if field.startswith("porosity"):
+                        self.assertEqual(
+                            getattr(experiment, field), getattr(single, field)
+                        )
+
+
+def polynomial(coefficients):
+    """y(t, τ) по членам {(степень t, степень τ): коэффициент}."""
+
+    def y(t, tau):
+        return sum(
+            coefficient * np.asarray(t, dtype=np.float64) ** i * tau**j
+            for (i, j), coefficient in coefficients.items()
+        )
+
+    return y
+
+
+class DerivativesTests(ResearchTestCase):
+    def test_round_significant(self):
+        values = np.array([5.9581234e-6, -0.0028164, 12345678.9, 0.0, np.nan])
+        self.assertEqual(
+            round_significant(values, 4)[:4].tolist(),
+            [5.958e-06, -0.002816, 12350000.0, 0.0],
+        )
+        self.assertTrue(np.isnan(round_significant(values)[4]))
+
+    def test_matches_finite_differences(self):
+        # ∂²y/∂t² = 5.958e-6: при округлении до 6 знаков после запятой
+        # оставалось бы 6e-06
+        coefficients = {**COEFFICIENTS, (2, 0): 2.979e-6}
+        y = polynomial(coefficients)
+        experiment = create_experiment(create_material(coefficients))
+        experiment.refresh_from_db()
+
+        h = 1.0
+        differences = {
+            "dt": lambda t, tau: (y(t + h, tau) - y(t - h, tau)) / (2 * h),
+            "dtau": lambda t, tau: (y(t, tau + h) - y(t, tau - h)) / (2 * h),
+            "dt2": lambda t, tau: (y(t + h, tau) - 2 * y(t, tau) + y(t - h, tau))
+            / h**2,
+            "dtau2": lambda t, tau: (y(t, tau + h) - 2 * y(t, tau) + y(t, tau - h))
+            / h**2,
+            "dt_dtau": lambda t, tau: (
+                y(t + h, tau + h)
+                - y(t + h, tau - h)
+                - y(t - h, tau + h)
+                + y(t - h, tau - h)
+            )
+            / (4 * h**2),
+        }
+        self.assertEqual(set(differences), set(DERIVATIVES))
+        t_axis, tau_axis = axis(1300, 1500, 10), axis(0, 60, 2)
+        for name, difference in differences.items():
+            with self.subTest(name=name):
+                np.testing.assert_allclose(
+                    experiment.derivatives["constant_temp"][name],
+                    [difference(t, tau_axis) for t in (1300, 1500, 1400)],
+                    rtol=1e-5,
+                    atol=1e-12,
+                )
+                np.testing.assert_allclose(
+                    experiment.derivatives["constant_time"][name],
+                    [difference(t_axis, tau) for tau in (0, 60, 30)],
+                    rtol=1e-5,
+                    atol=1e-12,
+                )
+        self.assertEqual(
+            set(np.ravel(experiment.derivatives["constant_temp"]["dt2"])), {5.958e-06}
+        )
+
+
+class PrimaryResponseTests(ResearchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.material = create_material(name="Плотность", response="density")
+
+    def test_experiment_without_primary_response_is_rejected(self):
+        experiment = Experiment(**GRID, material=self.material)
+        with self.assertRaises(ValidationError) as raised:
+            experiment.full_clean()
+        self.assertIn("material", raised.exception.message_dict)
+
+        form = ExperimentForm(
+            data={**GRID, "material": self.material.pk, "sampling": "uniform"}
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("material", form.errors)
+
+    def test_calculation_without_primary_response_is_rejected(self):
+        experiment = create_experiment(create_material())
+        # Члены основного отклика удалены после создания эксперимента
+        Experiment.objects.filter(pk=experiment.pk).update(material=self.material)
+        experiment.refresh_from_db()
+        with self.assertRaises(ValidationError):
+            experiment.calculate()
+        with self.assertRaises(ValidationError):
+            Experiment.calculate_many([experiment])
+
+        response = self.client.post(
+            reverse("research:experiment_recalculate", args=[experiment.pk]),
+            follow=True,
+        )
+        self.assertContains(response, "нет членов полинома")
+
+    def test_sweep_without_primary_response_is_rejected(self):
+        form = SweepForm(
+            data={
+                "materials": [self.material.pk],
+                "t_min": "1300",
+                "t_max": "1500",
+                "delta_t": "10",
+                "tau_min": "0",
+                "tau_max": "60",
+                "delta_tau": "2",
+            }
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("нет членов полинома", str(form.errors))
+
+
+# Коэффициенты a0..a8 прежнего полинома второй степени
+LEGACY_COEFFICIENTS = {
+    "a_0": 64.0,
+    "a_1": -0.08,
+    "a_2": -0.2,
+    "a_3": 1.5e-4,
+    "a_4": 2.5e-5,
+    "a_5": 1e-3,
+    "a_6": -3e-8,
+    "a_7": -4e-7,
+    "a_8": 1e-10,
+}
+
+
+def legacy_polynomial(t, tau):
+    """Полином в записи до перехода на члены PolynomialTerm."""
+    a = LEGACY_COEFFICIENTS
+    return (
+        a["a_0"]
+        + a["a_1"] * t
+        + a["a_2"] * tau
+        + a["a_3"] * t * tau
+        + a["a_4"] * t**2
+        + a["a_5"] * tau**2
+        + a["a_6"] * t**2 * tau
+        + a["a_7"] * t * tau**2
+        + a["a_8"] * t**2 * tau**2
+    )
+
+
+class LegacyCoefficientsMigrationTests(IsolatedFilesMixin, TransactionTestCase):
+    before = [("research", "0016_polynomialterm")]
+    after = [("research", "0017_polynomialterm_data")]
+
+    def setUp(self):
+        super().setUp()
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        apps.get_model("research", "MathModel").objects.create(
+            name="Материал", **LEGACY_COEFFICIENTS
+        )
+        executor.loader.build_graph()
+        executor.migrate(self.after)
+        self.apps = executor.loader.project_state(self.after).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        super().tearDown()
+
+    def test_coefficients_become_terms(self):
+        terms = self.apps.get_model("research", "PolynomialTerm").objects.all()
+        self.assertEqual(
+            {
+                (term.response, term.t_power, term.tau_power): term.coefficient
+                for term in terms
+            },
+            {
+                (PRIMARY_RESPONSE, 0, 0): 64.0,
+                (PRIMARY_RESPONSE, 1, 0): -0.08,
+                (PRIMARY_RESPONSE, 0, 1): -0.2,
+                (PRIMARY_RESPONSE, 1, 1): 1.5e-4,
+                (PRIMARY_RESPONSE, 2, 0): 2.5e-5,
+                (PRIMARY_RESPONSE, 0, 2): 1e-3,
+                (PRIMARY_RESPONSE, 2, 1): -3e-8,
+                (PRIMARY_RESPONSE, 1, 2): -4e-7,
+                (PRIMARY_RESPONSE, 2, 2): 1e-10,
+            },
+        )
+
+    def test_results_match_legacy_polynomial(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+        invalidate_material_catalog()
+        experiment = create_experiment(MathModel.objects.get())
+        experiment.refresh_from_db()
+
+        # Прежний расчет округлял значения на кривых до 4 знаков
+        curves = {
+            "result_t_const": (
+                lambda tau: {
+                    "tmin_const": legacy_polynomial(1300, tau),
+                    "tmax_const": legacy_polynomial(1500, tau),
+                    "tavg_const": legacy_polynomial(1400, tau),
+                },
+                axis(0, 60, 2),
+            ),
+            "result_tau_const": (
+                lambda t: {
+                    "taumin_const": legacy_polynomial(t, 0),
+                    "taumax_const": legacy_polynomial(t, 60),
+                    "tauavg_const": legacy_polynomial(t, 30),
+                },
+                axis(1300, 1500, 10),
+            ),
+        }
+        for key, (legacy, values) in curves.items():
+            results = experiment.results[key]
+            self.assertEqual([float(value) for value in results], values.tolist())
+            for value, row in zip(values.tolist(), results.values()):
+                for name, expected in legacy(value).items():
+                    self.assertAlmostEqual(row[name], expected, places=4)
+
+
+class GridCacheTests(SimpleTestCase):
+    def keys(self, count):
+        return [(1300, 1500 + i, 10, 0, 60, 2) for i in range(count)]
+
+    def test_reuses_grid_and_counts_designs(self):
+        cache = GridCache(2**20)
+        grid = cache.get(self.keys(1)[0])
+        self.assertIs(cache.get(self.keys(1)[0]), grid)
+        axes = grid.nbytes
+        self.assertEqual(cache.nbytes, axes)
+        grid.prepare(3, 3)
+        self.assertGreater(grid.nbytes, axes)
+        self.assertEqual(cache.nbytes, grid.nbytes)
+
+    def test_evicts_least_recently_used(self):
+        first, second, third = self.keys(3)
+        grid = GridCache(2**20).get(first)
+        grid.prepare(3, 3)
+        # Помещаются ровно две сетки с базисами
+        cache = GridCache(2 * grid.nbytes)
+        grids = {}
+        for key in (first, second):
+            grids[key] = cache.get(key)
+            grids[key].prepare(3, 3)
+        cache.get(first)
+        grids[third] = cache.get(third)
+        grids[third].prepare(3, 3)
+
+        self.assertEqual(list(cache.grids), [first, third])
+        self.assertLessEqual(cache.nbytes, cache.max_bytes)
+        self.assertEqual(
+            cache.nbytes, sum(grid.nbytes for grid in cache.grids.values())
+        )
+        # Вытесненная сетка строится заново
+        self.assertIsNot(cache.get(second), grids[second])
+
+    def test_keeps_last_grid_over_limit(self):
+        cache = GridCache(1)
+        keys = self.keys(2)
+        for key in keys:
+            cache.get(key).prepare(3, 3)
+        self.assertEqual(list(cache.grids), keys[1:])
+        self.assertEqual(cache.nbytes, cache.grids[keys[1]].nbytes)
+
+
+class EvaluateSurfaceTests(SimpleTestCase):
+    def setUp(self):
+        self.matrix = np.array([[64.0, -0.2, 1e-3], [-0.08, 1.5e-4, 0], [2.5e-5, 0, 0]])
+        self.t = np.linspace(1300, 1500, 37)
+        self.tau = np.linspace(0, 60, 23)
+        self.created = []
+        created = self.created
+
+        class RecordingSharedMemory(shared_memory.SharedMemory):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                if kwargs.get("create"):
+                    created.append(self.name)
+
+        patcher = mock.patch.object(
+            parallel.shared_memory, "SharedMemory", RecordingSharedMemory
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        if parallel._executor is not None:
+            parallel._executor.shutdown()
+            parallel._executor = None
+
+    def assertUnlinked(self, name):
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+    def test_pool_matches_in_process(self):
+        with parallel.evaluate_surface(
+            self.matrix, self.t, self.tau, workers=1
+        ) as surface:
+            expected = surface.copy()
+        self.assertEqual(self.created, [])
+        with parallel.evaluate_surface(
+            self.matrix, self.t, self.tau, workers=2, threshold=0
+        ) as surface:
+            np.testing.assert_allclose(surface, expected, rtol=1e-12)
+        self.assertEqual(len(self.created), 1)
+        self.assertUnlinked(self.created[0])
+
+    def test_unlinks_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with parallel.evaluate_surface(
+                self.matrix, self.t, self.tau, workers=2, threshold=0
+            ):
+                raise RuntimeError
+        self.assertUnlinked(self.created[0])
@@ -0,0 +1,135 @@
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger("research.slow_requests")
+
+# Описания фаз для заголовка Server-Timing (значения заголовков - только
+# latin-1)
+PHASES = {
+    "db": "SQL",
+    "template": "Templates",
+    "calculate": "Calculation",
+    "json": "Results parsing",
+    "excel": "Excel",
+}
+
+_timings = ContextVar("timings", default=None)
+
+
+class Timings:
+    """Суммарное время (мс) и число вхождений по фазам одного запроса."""
+
+    def __init__(self):
+        self.phases = {}
+
+    def add(self, name, duration):
+        total, count = self.phases.get(name, (0.0, 0))
+        self.phases[name] = (total + duration, count + 1)
+
+    def as_dict(self):
+        return {
+            name: {"ms": round(total, 2), "count": count}
+            for name, (total, count) in self.phases.items()
+        }
+
+
+@contextmanager
+def phase(name):
+    """
+    Учет времени блока в фазе name текущего запроса. Вне запроса (команды
+    управления, процессы пула) ничего не делает. Вложенные фазы считаются
+    независимо: например, SQL внутри расчета входит и в db, и в calculate.
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - started) * 1000)
+
+
+def db_wrapper(execute, sql, params, many, context):
+    with phase("db"):
+        return execute(sql, params, many, context)
+
+
+def server_timing(timings, total):
+    metrics = [
+        f'{name};dur={duration:.2f};desc="{PHASES.get(name, name)} ({count})"'
+        for name, (duration, count) in timings.phases.items()
+    ]
+    metrics.append(f"total;dur={total:.2f}")
+    return ", ".join(metrics)
+
+
+class ServerTimingMiddleware:
+    """
+    Время обработки запроса по фазам (SQL, шаблоны, расчет, разбор
+    результатов, Excel) в заголовке Server-Timing. Запросы дольше
+    SLOW_REQUEST_MS записываются в журнал research.slow_requests одной
+    JSON-строкой.
+
+    Время генерации тела потоковых ответов в заголовок не входит: он
+    отправляется раньше.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = settings.SLOW_REQUEST_MS
+
+    def __call__(self, request):
+        timings = Timings()
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        total = (time.perf_counter() - started) * 1000
+        response["Server-Timing"] = server_timing(timings, total)
+        if total >= self.slow_ms:
+            self.log(request, response, timings, total)
+        return response
+
+    def process_template_response(self, request, response):
+        # Ответы TemplateResponse отрисовываются после представления
+        timings = _timings.get()
+        started = time.perf_counter()
+
+        def rendered(response):
+            timings.add("template", (time.perf_counter() - started) * 1000)
+
+        if timings is not None:
+            response.add_post_render_callback(rendered)
+        return response
+
+    def log(self, request, response, timings, total):
+        match = getattr(request, "resolver_match", None)
+        logger.warning(
+            json.dumps(
+                {
+                    "time": timezone.now().isoformat(timespec="milliseconds"),
+                    "path": request.get_full_path(),
+                    "method": request.method,
+                    "view": match.view_name if match else None,
+                    "status": response.status_code,
+                    "user": request.user.pk if hasattr(request, "user") else None,
+                    "total_ms": round(total, 2),
+                    "phases": timings.as_dict(),
+                },
+                ensure_ascii=False,
+            )
+        )
@@ -6,8 +6,18 @@ from research.views import (
     IndexView,
     ExperimentCreateView,
     ExperimentResultsView,
+    ExperimentResultsTableView,
+    ExperimentChartDataView,
+    ExperimentHeatmapView,
+    ExperimentExportView,
     ExperimentListView,
+    ExperimentCompareView,
     ExperimentRecalculateView,
+    ResidualAnalysisCreateView,
+    MaterialEvaluateView,
+    MetricsView,
+    SweepCreateView,
+    SweepDetailView,
     export_experiment_to_excel,
 )
 
@@ -23,15 +33,49 @@ urlpatterns = [
         ExperimentResultsView.as_view(),
         name="experiment_results",
     ),
+    path(
+        "results/<int:pk>/table/<str:table>/",
+        ExperimentResultsTableView.as_view(),
+        name="experiment_results_table",
+    ),
+    path(
+        "results/<int:pk>/chart-data/",
+        ExperimentChartDataView.as_view(),
+        name="experiment_chart_data",
+    ),
+    path(
+        "results/<int:pk>/heatmap.png",
+        ExperimentHeatmapView.as_view(),
+        name="experiment_heatmap",
+    ),
     path("list/", ExperimentListView.as_view(), name="experiment_list"),
+    path("compare/", ExperimentCompareView.as_view(), name="experiment_compare"),
     path(
         "results/<int:pk>/recalculate/",
         ExperimentRecalculateView.as_view(),
         name="experiment_recalculate",
     ),
+    path(
+        "results/<int:pk>/residuals/",
+        ResidualAnalysisCreateView.as_view(),
+        name="experiment_residuals",
+    ),
     path(
         "results/<int:pk>/export-excel/",
         export_experiment_to_excel,
         name="experiment_export_excel",
     ),
+    path(
+        "results/<int:pk>/export.<str:export_format>",
+        ExperimentExportView.as_view(),
+        name="experiment_export",
+    ),
+    path(
+        "materials/<int:pk>/evaluate/",
+        MaterialEvaluateView.as_view(),
+        name="material_evaluate",
+    ),
+    path("metrics", MetricsView.as_view(), name="metrics"),
+    path("sweeps/create/", SweepCreateView.as_view(), name="sweep_create"),
+    path("sweeps/<int:pk>/", SweepDetailView.as_view(), name="sweep_detail"),
 ]
@@ -1,18 +1,92 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
 from django.contrib.auth.views import LoginView as BaseLoginView
 from django.contrib.auth.views import auth_logout
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import (
+    FileResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    HttpResponseForbidden,
+    HttpResponseRedirect,
+)
 from django.urls import reverse_lazy, reverse
 from django.shortcuts import redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.core.paginator import Paginator
 from django.views import generic
+from django.utils.crypto import constant_time_compare
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import never_cache
+from django.views.decorators.cache import never_cache, cache_control
+from django.views.decorators.http import condition
 from django.contrib import messages
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-
-
-from research.forms import AuthForm, ExperimentForm
-from research.models import Experiment
+from django.core.exceptions import RequestDataTooBig, ValidationError
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Min, Sum
+
+
+from research.batch import (
+    MAX_POINTS,
+    BatchError,
+    evaluate_chunk,
+    parse_points,
+    read_ndjson_chunks,
+    stream_ndjson,
+    throughput,
+)
+from research.cache import bump_version, cached, get_version
+from research.charts import (
+    CHART_FORMATS,
+    DEFAULT_CHART_POINTS,
+    MAX_CHART_POINTS,
+    MIN_CHART_POINTS,
+    chart_payload,
+    stored_series,
+)
+from research.forms import (
+    AuthForm,
+    ExperimentCompareForm,
+    ExperimentFilterForm,
+    ExperimentForm,
+    ResidualUploadForm,
+    SweepForm,
+)
+from research.compare import compare_experiments, comparison_to_json
+from research.export import (
+    EXPORT_FORMATS,
+    curve_rows,
+    export_lines,
+    gzip_stream,
+    surface_rows,
+)
+from research.heatmap import DEFAULT_HEATMAP_SIZE, MAX_HEATMAP_SIDE, heatmap_path
+from research.evaluation import (
+    DERIVATIVE_LABELS,
+    DERIVATIVES,
+    PRIMARY_RESPONSE,
+    material_evaluator,
+)
+from research.models import (
+    Experiment,
+    MathModel,
+    PolynomialTerm,
+    ResidualAnalysis,
+    Sweep,
+)
+from research.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    EXPORT_BYTES,
+    EXPORT_SECONDS,
+    count_bytes,
+    render as render_metrics,
+)
+from research.residuals import MeasurementError, analyze, measurement_chunks
+from research.timing import phase
 from users.decorators import user_has_access
 
 
@@ -56,95 +130,301 @@ class ExperimentCreateView(generic.FormView):
             return self.form_invalid(form)
 
 
+@method_decorator(user_has_access, "dispatch")
+@method_decorator(never_cache, "dispatch")
+class SweepCreateView(generic.FormView):
+    template_name = "sweep_form.html"
+    form_class = SweepForm
+
+    def form_valid(self, form):
+        materials = form.cleaned_data["materials"]
+        with transaction.atomic():
+            sweep = Sweep.objects.create()
+            experiments = Experiment.objects.bulk_create(
+                [
+                    Experiment(sweep=sweep, material=material, **grid)
+                    for material in materials
+                    for grid in form.cleaned_data["grids"]
+                ],
+                batch_size=500,
+            )
+            start_time = time.perf_counter()
+            Experiment.calculate_many(experiments)
+            sweep.calculation_time = round((time.perf_counter() - start_time) * 1000, 2)
+            sweep.save()
+        # bulk_create и bulk_update не отправляют сигналы сохранения
+        bump_version("experiments")
+        return redirect("research:sweep_detail", pk=sweep.id)
+
+
+@method_decorator(user_has_access, "dispatch")
+@method_decorator(never_cache, "dispatch")
+class SweepDetailView(generic.DetailView):
+    model = Sweep
+    template_name = "sweep_detail.html"
+    context_object_name = "sweep"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        experiments = self.object.experiments.select_related("material").defer(
+            "results"
+        )
+        context["summary"] = experiments.aggregate(
+            count=Count("id"),
+            porosity_min=Min("porosity_min"),
+            porosity_max=Max("porosity_max"),
+            porosity_mean=Avg("porosity_mean"),
+            calculation_time=Sum("calculation_time"),
+        )
+        context["best_experiment"] = experiments.order_by("porosity_min").first()
+        context["experiments"] = experiments.order_by("porosity_min")
+        return context
+
+
+# Таблицы результатов: серия графика, заголовок оси и подписи столбцов.
+# Столбцы идут в порядке минимум, среднее, максимум
+RESULTS_TABLES = {
+    "constant_temp": {
+        "title": "При постоянной температуре",
+        "axis": "Время (мин)",
+        "column": "Остаточная пористость при температуре {}°C",
+        "fields": ("t_min", "t_avg", "t_max"),
+    },
+    "constant_time": {
+        "title": "При постоянном времени изометрической выдержки",
+        "axis": "Температура (°C)",
+        "column": "Остаточная пористость при τ = {} мин",
+        "fields": ("tau_min", "tau_avg", "tau_max"),
+    },
+}
+RESULTS_PAGE_SIZE = 50
+
+# Число последних запусков расчета на графике истории эксперимента
+RUN_HISTORY_SIZE = 50
+
+
 @method_decorator(user_has_access, "dispatch")
 @method_decorator(never_cache, "dispatch")
 class ExperimentResultsView(generic.DetailView):
     model = Experiment
     template_name = "experiment_detail.html"
     context_object_name = "experiment"
+    queryset = Experiment.objects.select_related("material").defer("results")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        experiment = self.get_object()
-        if experiment.results:
-            context["chart_data"] = self.prepare_chart_data(experiment.results)
+        context["chart_points"] = DEFAULT_CHART_POINTS
+        context["results_tables"] = RESULTS_TABLES
+        context["materials_version"] = get_version("materials")
+        context["derivative_labels"] = DERIVATIVE_LABELS
+        # Анализы остатков не меняют результатов эксперимента, поэтому
+        # выводятся вне кэшированного фрагмента страницы
+        context["residual_analysis"] = self.object.residual_analyses.first()
+        context["residual_form"] = ResidualUploadForm()
+        context["run_history"] = [
+            {
+                "created_at": created_at.isoformat(),
+                "engine": engine,
+                "code_version": code_version,
+                "calculation_time": calculation_time,
+            }
+            for created_at, engine, code_version, calculation_time in reversed(
+                self.object.runs.values_list(
+                    "created_at", "engine", "code_version", "calculation_time"
+                )[:RUN_HISTORY_SIZE]
+            )
+        ]
         return context
 
-    def prepare_chart_data(self, results):
-        chart_data = {}
-        if "result_t_const" in results:
-            chart_data["constant_temp"] = {
-                "labels": list(results["result_t_const"].keys()),
-            }
-            data_tmin = []
-            data_tmax = []
-            data_tavg = []
-            for obj in results["result_t_const"].values():
-                data_tmin.append(obj["tmin_const"])
-                data_tmax.append(obj["tmax_const"])
-                data_tavg.append(obj["tavg_const"])
-
-            chart_data["constant_temp"]["datasets"] = [
-                {
-                    "label": f"Tемпература = {self.object.t_min}°C",
-                    "data": data_tmin,
-                    "borderColor": "#ff6384",
-                    "backgroundColor": "rgba(255, 99, 132, 0.1)",
-                    "tension": 0.4,
-                },
-                {
-                    "label": f"Tемпература = {self.object.t_max}°C",
-                    "data": data_tmax,
-                    "borderColor": "#36a2eb",
-                    "backgroundColor": "rgba(54, 162, 235, 0.1)",
-                    "tension": 0.4,
-                },
-                {
-                    "label": f"Tемпература = {(self.object.t_min + self.object.t_max) / 2}°C",
-                    "data": data_tavg,
-                    "borderColor": "#4bc0c0",
-                    "backgroundColor": "rgba(75, 192, 192, 0.1)",
-                    "tension": 0.4,
-                },
-            ]
 
-        if "result_tau_const" in results:
-            chart_data["constant_time"] = {
-                "labels": list(results["result_tau_const"].keys())
-            }
-            data_taumin = []
-            data_taumax = []
-            data_tauavg = []
-            for obj in results["result_tau_const"].values():
-                data_taumin.append(obj["taumin_const"])
-                data_taumax.append(obj["taumax_const"])
-                data_tauavg.append(obj["tauavg_const"])
-
-            chart_data["constant_time"]["datasets"] = [
-                {
-                    "label": f"Время = {self.object.tau_min} мин",
-                    "data": data_taumin,
-                    "borderColor": "#ff9f40",
-                    "backgroundColor": "rgba(255, 159, 64, 0.1)",
-                    "tension": 0.4,
-                },
-                {
-                    "label": f"Время = {self.object.tau_max} мин",
-                    "data": data_taumax,
-                    "borderColor": "#9966ff",
-                    "backgroundColor": "rgba(153, 102, 255, 0.1)",
-                    "tension": 0.4,
-                },
-                {
-                    "label": f"Время = {(self.object.tau_min + self.object.tau_max) / 2} мин",
-                    "data": data_tauavg,
-                    "borderColor": "#ffcd56",
-                    "backgroundColor": "rgba(255, 205, 86, 0.1)",
-                    "tension": 0.4,
-                },
-            ]
+@method_decorator(user_has_access, "dispatch")
+@method_decorator(never_cache, "dispatch")
+class ExperimentResultsTableView(generic.View):
+    template_name = "experiment_results_table.html"
+
+    def get(self, request, pk, table):
+        if table not in RESULTS_TABLES:
+            raise Http404("Неизвестная таблица результатов")
+        experiment = get_object_or_404(Experiment.objects.defer("results"), pk=pk)
+        x, values = stored_series(experiment)[table]
+        # Номер страницы приводится к существующему, чтобы произвольные
+        # значения ?page= не создавали новых записей в кэше
+        page = Paginator(range(len(x)), RESULTS_PAGE_SIZE).get_page(
+            request.GET.get("page")
+        )
+        key = (
+            f"results-table:{experiment.pk}:{experiment.results_version}:"
+            f"{table}:{page.number}"
+        )
+        content = cached(
+            key, lambda: self.render_table(experiment, table, x, values, page)
+        )
+        return HttpResponse(content)
+
+    def render_table(self, experiment, table, x, values, page):
+        spec = RESULTS_TABLES[table]
+        data_min, data_max, data_avg = values
+        rows = slice(page.start_index() - 1, page.end_index())
+        context = {
+            "experiment": experiment,
+            "table": table,
+            "axis": spec["axis"],
+            "columns": [
+                spec["column"].format(getattr(experiment, field))
+                for field in spec["fields"]
+            ],
+            "rows": zip(
+                x[rows].tolist(),
+                data_min[rows].tolist(),
+                data_avg[rows].tolist(),
+                data_max[rows].tolist(),
+            ),
+            "page": page,
+        }
+        with phase("template"):
+            return render_to_string(self.template_name, context, request=self.request)
+
+
+def chart_data_etag(request, pk):
+    results_version = (
+        Experiment.objects.filter(pk=pk)
+        .values_list("results_version", flat=True)
+        .first()
+    )
+    if results_version is None:
+        return None
+    data_format = request.GET.get("format", "json")
+    points = request.GET.get("points", "full")
+    quantity = request.GET.get("quantity", "values")
+    return f"{pk}-{results_version}-{data_format}-{points}-{quantity}"
+
+
+@method_decorator(user_has_access, "dispatch")
+@method_decorator(cache_control(private=True, no_cache=True), "dispatch")
+@method_decorator(condition(etag_func=chart_data_etag), "get")
+class ExperimentChartDataView(generic.View):
+    def get(self, request, pk):
+        data_format = request.GET.get("format", "json")
+        if data_format != "json" and data_format not in CHART_FORMATS:
+            return HttpResponseBadRequest(f"Неизвестный формат: {data_format}")
+
+        points = request.GET.get("points")
+        if points is not None:
+            try:
+                points = int(points)
+            except ValueError:
+                return HttpResponseBadRequest("Число точек должно быть целым числом")
+            if not MIN_CHART_POINTS <= points <= MAX_CHART_POINTS:
+                return HttpResponseBadRequest(
+                    f"Число точек должно быть от {MIN_CHART_POINTS} до {MAX_CHART_POINTS}"
+                )
+
+        quantity = request.GET.get("quantity")
+        if quantity is not None and quantity not in DERIVATIVES:
+            return HttpResponseBadRequest(f"Неизвестная величина: {quantity}")
+
+        experiment = get_object_or_404(
+            Experiment.objects.only("results_version"), pk=pk
+        )
+        if (
+            quantity
+            and not Experiment.objects.filter(pk=pk, derivatives__isnull=False).exists()
+        ):
+            raise Http404("Производные не рассчитаны, пересчитайте эксперимент")
+        payload = chart_payload(experiment, data_format, points, quantity)
+        if data_format == "json":
+            return HttpResponse(payload, content_type="application/json")
+        return HttpResponse(payload, content_type="application/octet-stream")
 
-        return chart_data
+
+@method_decorator(user_has_access, "dispatch")
+@method_decorator(cache_control(private=True, no_cache=True), "dispatch")
+class ExperimentHeatmapView(generic.View):
+    def get(self, request, pk):
+        try:
+            width = int(request.GET.get("width", DEFAULT_HEATMAP_SIZE[0]))
+            height = int(request.GET.get("height", DEFAULT_HEATMAP_SIZE[1]))
+        except ValueError:
+            return HttpResponseBadRequest("Размеры изображения должны быть целыми")
+        if not (0 < width <= MAX_HEATMAP_SIDE and 0 < height <= MAX_HEATMAP_SIDE):
+            return HttpResponseBadRequest(
+                f"Размеры изображения должны быть от 1 до {MAX_HEATMAP_SIDE}"
+            )
+
+        experiment = get_object_or_404(
+            Experiment.objects.select_related("material").defer("results"), pk=pk
+        )
+        if experiment.material is None:
+            raise Http404("Для эксперимента не указан материал")
+        path = heatmap_path(experiment, width, height)
+        return FileResponse(open(path, "rb"), content_type="image/png")
+
+
+@method_decorator(user_has_access, "dispatch")
+@method_decorator(never_cache, "dispatch")
+class ExperimentExportView(generic.View):
+    """
+    Потоковая выгрузка результатов в CSV или NDJSON. По умолчанию -
+    точки сохраненных кривых, с ?surface=1 - полная поверхность на сетке
+    эксперимента, вычисляемая по мере передачи. ?gzip=1 сжимает поток.
+    """
+
+    def get(self, request, pk, export_format):
+        if export_format not in EXPORT_FORMATS:
+            raise Http404("Неизвестный формат выгрузки")
+        experiment = get_object_or_404(
+            Experiment.objects.select_related("material"), pk=pk
+        )
+        surface = request.GET.get("surface") in ("1", "true")
+        if surface:
+            if experiment.material is None:
+                raise Http404("Для эксперимента не указан материал")
+            columns, chunks = surface_rows(experiment)
+        else:
+            if not experiment.has_results:
+                raise Http404("Результаты эксперимента еще не рассчитаны")
+            columns, chunks = curve_rows(experiment)
+
+        started = time.perf_counter()
+        content = export_lines(columns, chunks, export_format)
+        filename = f"experiment_{experiment.id}_{'surface' if surface else 'results'}.{export_format}"
+        if request.GET.get("gzip") in ("1", "true"):
+            response = StreamingHttpResponse(
+                count_bytes(gzip_stream(content), f"{export_format}.gz", started),
+                content_type="application/gzip",
+            )
+            filename += ".gz"
+        else:
+            response = StreamingHttpResponse(
+                count_bytes(content, export_format, started),
+                content_type=f"{EXPORT_FORMATS[export_format]}; charset=utf-8",
+            )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+@method_decorator(user_has_access, "dispatch")
+@method_decorator(never_cache, "dispatch")
+class ExperimentCompareView(generic.TemplateView):
+    template_name = "experiment_compare.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = ExperimentCompareForm(self.request.GET or None)
+        context["form"] = form
+        if form.is_valid():
+            experiment_a = form.cleaned_data["a"]
+            experiment_b = form.cleaned_data["b"]
+            comparison = compare_experiments(
+                experiment_a, experiment_b, DEFAULT_CHART_POINTS
+            )
+            context["experiment_a"] = experiment_a
+            context["experiment_b"] = experiment_b
+            context["summaries"] = {
+                chart: data["summary"] for chart, data in comparison.items()
+            }
+            context["comparison"] = comparison_to_json(comparison)
+        return context
 
 
 @method_decorator(user_has_access, "dispatch")
@@ -153,9 +433,36 @@ class ExperimentListView(generic.ListView):
     model = Experiment
     template_name = "experiment_list.html"
     context_object_name = "experiments"
+    queryset = Experiment.objects.select_related("material").defer("results")
     ordering = ["-created_at"]
     paginate_by = 10
 
+    def get(self, request, *args, **kwargs):
+        query = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+        key = (
+            f"experiment-list:{get_version('experiments')}:"
+            f"{get_version('materials')}:{query}"
+        )
+        content = cached(key, lambda: self.render_page(request, *args, **kwargs))
+        return HttpResponse(content)
+
+    def render_page(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        with phase("template"):
+            return response.render().content
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        self.filter_form = ExperimentFilterForm(self.request.GET or None)
+        if self.filter_form.is_valid():
+            queryset = self.filter_form.filter(queryset)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["filter_form"] = self.filter_form
+        return context
+
 
 @method_decorator(user_has_access, "dispatch")
 @method_decorator(never_cache, "dispatch")
@@ -165,15 +472,188 @@ class ExperimentRecalculateView(generic.View):
 
         try:
             experiment.calculate()
-            experiment.save()
+        except ValidationError as e:
+            messages.error(request, f"Ошибка при пересчете: {' '.join(e.messages)}")
         except Exception as e:
             messages.error(request, f"Ошибка при пересчете: {str(e)}")
 
         return redirect("research:experiment_results", pk=experiment.id)
 
 
+@method_decorator(user_has_access, "dispatch")
+class ResidualAnalysisCreateView(generic.View):
+    def post(self, request, pk):
+        experiment = get_object_or_404(
+            Experiment.objects.select_related("material").defer("results"), pk=pk
+        )
+        form = ResidualUploadForm(request.POST, request.FILES)
+        if not form.is_valid():
+            for errors in form.errors.values():
+                messages.error(request, " ".join(errors))
+            return redirect("research:experiment_results", pk=experiment.id)
+
+        if experiment.material is None:
+            messages.error(request, "Для эксперимента не указан материал")
+            return redirect("research:experiment_results", pk=experiment.id)
+
+        response = form.cleaned_data["response"]
+        if not experiment.material.terms.filter(response=response).exists():
+            messages.error(
+                request,
+                f"У материала нет модели отклика «{dict(PolynomialTerm.RESPONSE_CHOICES)[response]}»",
+            )
+            return redirect("research:experiment_results", pk=experiment.id)
+
+        upload = form.cleaned_data["file"]
+        try:
+            stats = analyze(
+                material_evaluator(experiment.material_id, [response]),
+                measurement_chunks(upload),
+                form.cleaned_data["threshold"],
+            )
+        except MeasurementError as error:
+            messages.error(request, f"Ошибка при обработке измерений: {error}")
+            return redirect("research:experiment_results", pk=experiment.id)
+
+        ResidualAnalysis.objects.create(
+            experiment=experiment,
+            file_name=upload.name,
+            response=response,
+            threshold=form.cleaned_data["threshold"],
+            **stats,
+        )
+        messages.success(
+            request,
+            f"Обработано измерений: {stats['measurements']}, RMSE = {stats['rmse']:.4g}",
+        )
+        return redirect("research:experiment_results", pk=experiment.id)
+
+
+@method_decorator(user_has_access, "dispatch")
+@method_decorator(never_cache, "dispatch")
+class MaterialEvaluateView(generic.View):
+    """
+    Значения полиномов откликов материала в произвольных точках. Отклики
+    задаются параметром ?responses=porosity,density (по умолчанию
+    остаточная пористость). Запрос выполняется в сессии пользователя и,
+    как любой POST, должен содержать заголовок X-CSRFToken со значением
+    cookie csrftoken.
+
+    application/json: {"points": [[t, tau], ...], "derivatives": false};
+    в ответе values (dt, dtau) - списки значений по каждому отклику. Тело
+    запроса ограничено DATA_UPLOAD_MAX_MEMORY_SIZE (около 100 тысяч точек).
+    application/x-ndjson - для больших объемов: по точке [t, tau] в
+    строке, тело читается порциями без ограничения размера (до MAX_POINTS
+    точек), ответ - поток строк [t, tau, y, ...] (с производными при
+    ?derivatives=1) и итоговая строка summary.
+    """
+
+    def post(self, request, pk):
+        responses = request.GET.get("responses", PRIMARY_RESPONSE).split(",")
+        known = {name for name, _ in PolynomialTerm.RESPONSE_CHOICES}
+        if not set(responses) <= known:
+            return JsonResponse(
+                {
+                    "error": f"Неизвестный отклик, допустимые: {', '.join(sorted(known))}"
+                },
+                status=400,
+            )
+        try:
+            evaluator = material_evaluator(pk, responses)
+        except MathModel.DoesNotExist:
+            raise Http404("Материал не найден")
+
+        if request.content_type == "application/x-ndjson":
+            derivatives = request.GET.get("derivatives") in ("1", "true")
+            return StreamingHttpResponse(
+                stream_ndjson(evaluator, read_ndjson_chunks(request), derivatives),
+                content_type="application/x-ndjson",
+            )
+
+        started = time.perf_counter()
+        try:
+            body = request.body
+        except RequestDataTooBig:
+            return JsonResponse(
+                {
+                    "error": "Слишком большой запрос JSON, передайте точки в "
+                    "формате application/x-ndjson"
+                },
+                status=413,
+            )
+        try:
+            payload = json.loads(body)
+            points = parse_points(payload.get("points", []))
+        except (ValueError, AttributeError) as error:
+            message = (
+                str(error) if isinstance(error, BatchError) else "Некорректный JSON"
+            )
+            return JsonResponse({"error": message}, status=400)
+        if len(points) > MAX_POINTS:
+            return JsonResponse(
+                {"error": f"Превышено максимальное число точек: {MAX_POINTS}"},
+                status=400,
+            )
+        derivatives = bool(payload.get("derivatives"))
+        rows = evaluate_chunk(evaluator, points, derivatives)
+        keys = ["values", "dt", "dtau"] if derivatives else ["values"]
+        response = {key: {} for key in keys}
+        for i, name in enumerate(evaluator.responses):
+            for j, key in enumerate(keys):
+                response[key][name] = rows[:, 2 + i * len(keys) + j].tolist()
+        response["summary"] = throughput(len(points), started)
+        return JsonResponse(response)
+
+
+@method_decorator(never_cache, "dispatch")
+class MetricsView(generic.View):
+    """
+    Метрики всех процессов сервера в формате Prometheus. Доступны
+    сотрудникам (is_staff) и, если задан METRICS_TOKEN, запросам с
+    заголовком Authorization: Bearer <токен>.
+    """
+
+    def get(self, request):
+        token = settings.METRICS_TOKEN
+        authorized = request.user.is_staff or (
+            token
+            and constant_time_compare(
+                request.headers.get("Authorization", ""), f"Bearer {token}"
+            )
+        )
+        if not authorized:
+            return HttpResponseForbidden()
+        return HttpResponse(render_metrics(), content_type=METRICS_CONTENT_TYPE)
+
+
 def export_experiment_to_excel(request, pk):
-    experiment = get_object_or_404(Experiment, pk=pk)
+    experiment = get_object_or_404(
+        Experiment.objects.select_related("material").prefetch_related(
+            "material__terms"
+        ),
+        pk=pk,
+    )
+
+    # Создаем HTTP response с файлом Excel
+    response = HttpResponse(
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="experiment_{experiment.id}_results.xlsx"'
+    )
+
+    with EXPORT_SECONDS.time(format="xlsx"), phase("excel"):
+        wb = experiment_workbook(experiment)
+        wb.save(response)
+    EXPORT_BYTES.observe(len(response.content), format="xlsx")
+    return response
+
+
+def experiment_workbook(experiment):
+    # openpyxl загружается при первой выгрузке, а не при запуске процесса
+    import openpyxl
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+    from openpyxl.utils import get_column_letter
 
     wb = openpyxl.Workbook()
 
@@ -226,30 +706,20 @@ def export_experiment_to_excel(request, pk):
     ws_main["A12"] = "Коэффициенты математической модели:"
     ws_main["A12"].font = Font(size=12, bold=True)
 
-    coefficients = [
-        ("a0", experiment.material.a_0),
-        ("a1", experiment.material.a_1),
-        ("a2", experiment.material.a_2),
-        ("a3", experiment.material.a_3),
-        ("a4", experiment.material.a_4),
-        ("a5", experiment.material.a_5),
-        ("a6", experiment.material.a_6),
-        ("a7", experiment.material.a_7),
-        ("a8", experiment.material.a_8),
-    ]
-
-    for i, (coef_name, coef_value) in enumerate(coefficients, start=13):
-        ws_main[f"A{i}"] = f"{coef_name}:"
+    material = experiment.material
+    terms = material.terms.all() if material else []
+    for i, term in enumerate(terms, start=13):
+        ws_main[f"A{i}"] = f"{term.get_response_display()}, {term.monomial}:"
         ws_main[f"A{i}"].font = subheader_font
-        ws_main[f"B{i}"] = coef_value
+        ws_main[f"B{i}"] = term.coefficient
         ws_main[f"B{i}"].font = normal_font
 
-    ws_main[f"A{i + 1}"] = "Формула расчета"
-    ws_main[f"A{i + 1}"].font = Font(size=12, bold=True)
-    ws_main[f"A{i + 2}"] = (
-        "y = a₀ + a₁·t + a₂·τ + a₃·t·τ + a₄·t² + a₅·τ² + a₆·t²·τ + a₇·t·τ² + a₈·t²·τ²"
-    )
-    ws_main[f"A{i + 2}"].font = Font(size=12, bold=True)
+    row = 13 + len(terms)
+    ws_main[f"A{row}"] = "Формула расчета"
+    ws_main[f"A{row}"].font = Font(size=12, bold=True)
+    if material:
+        ws_main[f"A{row + 1}"] = material.formula()
+        ws_main[f"A{row + 1}"].font = Font(size=12, bold=True)
 
     if experiment.results and "result_t_const" in experiment.results:
         ws_temp = wb.create_sheet("При постоянной температуре")
@@ -275,7 +745,7 @@ def export_experiment_to_excel(request, pk):
 
         row = 3
         result_t_const = experiment.results["result_t_const"]
-        sorted_times = sorted(result_t_const.keys())
+        sorted_times = sorted(result_t_const.keys(), key=float)
 
         for time in sorted_times:
             data = result_t_const[time]
@@ -323,7 +793,7 @@ def export_experiment_to_excel(request, pk):
 
         row = 3
         result_tau_const = experiment.results["result_tau_const"]
-        sorted_temps = sorted(result_tau_const.keys())
+        sorted_temps = sorted(result_tau_const.keys(), key=float)
 
         for temp in sorted_temps:
             data = result_tau_const[temp]
@@ -345,6 +815,61 @@ def export_experiment_to_excel(request, pk):
         ws_time[f"A{row}"].font = Font(bold=True)
         ws_time.merge_cells(f"A{row}:D{row}")
 
+    if experiment.results and experiment.derivatives:
+        derivative_sheets = [
+            (
+                "Производные при T = const",
+                "Время (мин)",
+                sorted_times,
+                [
+                    f"T = {t}°C"
+                    for t in (experiment.t_min, experiment.t_max, experiment.t_avg)
+                ],
+                experiment.derivatives["constant_temp"],
+            ),
+            (
+                "Производные при τ = const",
+                "Температура (°C)",
+                sorted_temps,
+                [
+                    f"τ = {tau} мин"
+                    for tau in (
+                        experiment.tau_min,
+                        experiment.tau_max,
+                        experiment.tau_avg,
+                    )
+                ],
+                experiment.derivatives["constant_time"],
+            ),
+        ]
+        for title, axis_title, axis_values, levels, curves in derivative_sheets:
+            ws_derivative = wb.create_sheet(title)
+            # Столбцы: ось, затем для каждой кривой все производные подряд
+            headers = [axis_title] + [
+                f"{DERIVATIVE_LABELS[name]}, {level}"
+                for level in levels
+                for name in DERIVATIVES
+            ]
+            for col, header in enumerate(headers, start=1):
+                cell = ws_derivative.cell(row=1, column=col, value=header)
+                cell.font = subheader_font
+                cell.alignment = Alignment(horizontal="center")
+                cell.fill = subheader_fill
+                cell.border = border
+            for index, value in enumerate(axis_values):
+                row = [float(value)] + [
+                    curves[name][level][index]
+                    for level in range(len(levels))
+                    for name in DERIVATIVES
+                ]
+                for col, value in enumerate(row, start=1):
+                    cell = ws_derivative.cell(row=index + 2, column=col, value=value)
+                    cell.font = normal_font
+                    cell.border = border
+            ws_derivative.column_dimensions["A"].width = 20
+            for col in range(2, len(headers) + 1):
+                ws_derivative.column_dimensions[get_column_letter(col)].width = 22
+
     # Настройка ширины колонок для всех листов
     for ws in wb.worksheets:
         if ws.title == "Информация об эксперименте":
@@ -360,13 +885,4 @@ def export_experiment_to_excel(request, pk):
         elif ws.title == "Формула расчета":
             ws.column_dimensions["A"].width = 50
 
-    # Создаем HTTP response с файлом Excel
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = (
-        f'attachment; filename="experiment_{experiment.id}_results.xlsx"'
-    )
-
-    wb.save(response)
-    return response
+    return wb
@@ -0,0 +1,105 @@
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import Max
+from django.template import engines
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+from research.catalog import material_catalog
+from research.evaluation import uniform_grid
+from research.models import Experiment
+
+logger = logging.getLogger(__name__)
+
+# Сколько равномерных сеток последних экспериментов подготавливать. Кэш
+# uniform_grid ограничен объемом (GRID_CACHE_BYTES), поэтому сетки
+# подготавливаются от старых к новым: при вытеснении остаются новые
+WARMUP_GRIDS = 256
+
+
+def load_urls():
+    resolver = get_resolver()
+    # reverse_dict заполняется при первом обращении, а с ним и вложенные
+    # пространства имен
+    resolver.reverse_dict
+    return len(resolver.url_patterns)
+
+
+def load_templates():
+    """Шаблоны проекта (без шаблонов Django) в кэш загрузчика шаблонов."""
+    names = set()
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            directory = str(directory)
+            if not directory.startswith(str(settings.BASE_DIR)):
+                continue
+            for root, _, files in os.walk(directory):
+                for file in files:
+                    if file.endswith(".html"):
+                        path = os.path.join(root, file)
+                        names.add(os.path.relpath(path, directory))
+    for name in names:
+        get_template(name)
+    return len(names)
+
+
+def load_materials(shapes):
+    """Справочник материалов; размеры их матриц добавляются в shapes."""
+    catalog = material_catalog()
+    shapes.update(map(tuple, catalog.shapes.tolist()))
+    return len(catalog)
+
+
+def load_grids(shapes):
+    """Сетки последних экспериментов с базисами для матриц размеров shapes."""
+    fields = ("t_min", "t_max", "delta_t", "tau_min", "tau_max", "delta_tau")
+    keys = (
+        Experiment.objects.exclude(sampling="adaptive")
+        .values_list(*fields)
+        .annotate(last=Max("created_at"))
+        .order_by("-last")[:WARMUP_GRIDS]
+    )
+    keys = list(keys)
+    for *key, _ in reversed(keys):
+        grid = uniform_grid(*key)
+        for p, q in shapes:
+            grid.prepare(p, q)
+    return len(keys)
+
+
+def warmup():
+    """
+    Подготовка процесса к запросам: маршруты, шаблоны, справочник
+    материалов и равномерные сетки последних экспериментов с базисами.
+    Возвращает список (этап, число объектов, время в секундах).
+
+    Этап, на котором база данных недоступна (не выполнены миграции, сбой
+    сервера базы), пропускается с записью в журнал, а его число объектов
+    равно None: запуск процесса не должен зависеть от подготовки кэшей.
+
+    Соединения с базой данных после подготовки закрываются: при запуске
+    сервера с предварительной загрузкой приложения (gunicorn --preload)
+    они не должны наследоваться рабочими процессами.
+    """
+    steps = []
+
+    def step(name, load):
+        started = time.perf_counter()
+        try:
+            count = load()
+        except DatabaseError as error:
+            logger.warning("Подготовка «%s» пропущена: %s", name, error)
+            count = None
+        steps.append((name, count, time.perf_counter() - started))
+
+    shapes = set()
+    step("Маршруты", load_urls)
+    step("Шаблоны", load_templates)
+    step("Справочник материалов", lambda: load_materials(shapes))
+    step("Сетки", lambda: load_grids(shapes))
+    connections.close_all()
+    return steps